@@ -0,0 +1,43 @@
+"""add pg_trgm indexes on books title / author
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+    # Trigram GIN indexes serve ILIKE '%...%', similarity (%) and word
+    # similarity (%>) lookups on these columns.
+    op.create_index(
+        "ix_books_title_trgm",
+        "books",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_books_author_trgm",
+        "books",
+        ["author"],
+        postgresql_using="gin",
+        postgresql_ops={"author": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_author_trgm", table_name="books")
+    op.drop_index("ix_books_title_trgm", table_name="books")
+    # The pg_trgm extension is left installed; other objects may depend on it.
@@ -0,0 +1,77 @@
+"""add composite / partial / expression indexes matching list keysets
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ── books ─────────────────────────────────────────────────────────────────
+    # createdAt:desc / createdAt:asc  →  ORDER BY created_at, id (either direction)
+    op.create_index("ix_books_created_at_id", "books", ["created_at", "id"])
+    # title:asc  →  ORDER BY lower(title), id
+    op.create_index(
+        "ix_books_title_lower_id",
+        "books",
+        [sa.text("lower(title)"), "id"],
+    )
+
+    # ── loans ─────────────────────────────────────────────────────────────────
+    # Every loan listing orders by (borrowed_at DESC, id DESC); each filter gets
+    # an index whose trailing columns match that order.
+    op.create_index(
+        "ix_loans_borrowed_at_id",
+        "loans",
+        [sa.text("borrowed_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_loans_borrower_borrowed_at_id",
+        "loans",
+        ["borrower_user_id", sa.text("borrowed_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_loans_book_borrowed_at_id",
+        "loans",
+        ["book_id", sa.text("borrowed_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_loans_status_borrowed_at_id",
+        "loans",
+        ["status", sa.text("borrowed_at DESC"), sa.text("id DESC")],
+    )
+    # Active loans are a small slice of history: keep a dedicated partial index.
+    op.create_index(
+        "ix_loans_active_borrowed_at_id",
+        "loans",
+        [sa.text("borrowed_at DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("status = 'borrowed'"),
+    )
+    # Analytics: returned loans in window.
+    op.create_index(
+        "ix_loans_returned_at",
+        "loans",
+        ["returned_at"],
+        postgresql_where=sa.text("status = 'returned'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_loans_returned_at", table_name="loans")
+    op.drop_index("ix_loans_active_borrowed_at_id", table_name="loans")
+    op.drop_index("ix_loans_status_borrowed_at_id", table_name="loans")
+    op.drop_index("ix_loans_book_borrowed_at_id", table_name="loans")
+    op.drop_index("ix_loans_borrower_borrowed_at_id", table_name="loans")
+    op.drop_index("ix_loans_borrowed_at_id", table_name="loans")
+    op.drop_index("ix_books_title_lower_id", table_name="books")
+    op.drop_index("ix_books_created_at_id", table_name="books")
@@ -0,0 +1,62 @@
+"""create book_copies (one row per physical copy)
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "book_copies",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("book_id", postgresql.UUID(as_uuid=True), nullable=False),
+        # Active loan holding this copy; NULL when the copy is on the shelf.
+        sa.Column("loan_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["book_id"], ["books.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Free copies of a book — what checkout scans with FOR UPDATE SKIP LOCKED.
+    op.create_index(
+        "ix_book_copies_free",
+        "book_copies",
+        ["book_id"],
+        postgresql_where=sa.text("loan_id IS NULL"),
+    )
+    op.create_index("ix_book_copies_loan_id", "book_copies", ["loan_id"], unique=True)
+
+    # Backfill: one free copy per available copy, one held copy per active loan.
+    op.execute(sa.text("""
+        INSERT INTO book_copies (id, book_id)
+        SELECT gen_random_uuid(), b.id
+          FROM books b, generate_series(1, b.available_copies)
+    """))
+    op.execute(sa.text("""
+        INSERT INTO book_copies (id, book_id, loan_id)
+        SELECT gen_random_uuid(), l.book_id, l.id
+          FROM loans l
+         WHERE l.status = 'borrowed'
+    """))
+
+
+def downgrade() -> None:
+    op.drop_index("ix_book_copies_loan_id", table_name="book_copies")
+    op.drop_index("ix_book_copies_free", table_name="book_copies")
+    op.drop_table("book_copies")
@@ -0,0 +1,43 @@
+"""create loan_daily_book_stats rollup
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per (book, UTC day) with loans borrowed / returned that day.
+    # Filled by analytics_repo.advance_daily_stats (daily_stats_service, or
+    # scripts/backfill_loan_daily_stats.py for existing history) for finished
+    # days up to the watermark added in migration 013; kept out of the
+    # migration so a large loans table does not hold the deploy.
+    op.create_table(
+        "loan_daily_book_stats",
+        sa.Column("book_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("borrows", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("returns", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["book_id"], ["books.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("book_id", "day"),
+    )
+    # Analytics windows: WHERE day > :cutoff_day
+    op.create_index(
+        "ix_loan_daily_book_stats_day", "loan_daily_book_stats", ["day"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_loan_daily_book_stats_day", table_name="loan_daily_book_stats")
+    op.drop_table("loan_daily_book_stats")
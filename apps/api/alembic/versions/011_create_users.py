@@ -0,0 +1,56 @@
+"""create users (local mirror of the Clerk user directory)
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(length=255), nullable=False),
+        sa.Column("display_name", sa.String(length=255), nullable=False),
+        sa.Column("email", sa.String(length=320), nullable=True),
+        sa.Column("clerk_updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "synced_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_clerk_updated_at", "users", ["clerk_updated_at"])
+    # Listing / keyset order: ORDER BY lower(display_name), id
+    op.create_index(
+        "ix_users_display_name_lower_id",
+        "users",
+        [sa.text("lower(display_name)"), "id"],
+    )
+    # Search: lower(col) LIKE '%term%' on name and email (pg_trgm from migration 007).
+    op.execute(sa.text(
+        "CREATE INDEX ix_users_display_name_trgm ON users "
+        "USING gin (lower(display_name) gin_trgm_ops)"
+    ))
+    op.execute(sa.text(
+        "CREATE INDEX ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)"
+    ))
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_trgm", table_name="users")
+    op.drop_index("ix_users_display_name_trgm", table_name="users")
+    op.drop_index("ix_users_display_name_lower_id", table_name="users")
+    op.drop_index("ix_users_clerk_updated_at", table_name="users")
+    op.drop_table("users")
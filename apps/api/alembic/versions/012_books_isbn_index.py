@@ -0,0 +1,30 @@
+"""index books by normalised ISBN (POST /v1/books:batchGet)
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same expression as books_repo.ISBN_KEY: ISBNs are stored as entered
+    # (hyphens, spaces, lower-case x); lookups compare digits and X only.
+    op.create_index(
+        "ix_books_isbn_normalized",
+        "books",
+        [sa.text("regexp_replace(upper(isbn), '[^0-9X]', '', 'g')")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_isbn_normalized", table_name="books")
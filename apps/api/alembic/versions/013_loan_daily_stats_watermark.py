@@ -0,0 +1,34 @@
+"""derive loan_daily_book_stats in the background, behind a watermark
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[Sequence[str], None] = None
+depends_on: Union[Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Checkout / return no longer upsert loan_daily_book_stats; the API's
+    # daily_stats_service rebuilds finished days from loans and records here
+    # how far the rollup is complete. No row yet: the service starts from the
+    # oldest loan, and until it catches up analytics reads loans.
+    op.create_table(
+        "loan_daily_stats_watermark",
+        sa.Column("id", sa.SmallInteger(), nullable=False),
+        sa.Column("complete_before", sa.Date(), nullable=False),
+        sa.CheckConstraint("id = 1", name="ck_loan_daily_stats_watermark_single_row"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("loan_daily_stats_watermark")
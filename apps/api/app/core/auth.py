@@ -4,18 +4,23 @@ from __future__ import annotations
 JWT verification using Clerk's JWKS endpoint.
 
 Flow:
+  0. Return cached claims if this exact token was verified recently.
   1. Decode the JWT header (unverified) to extract `kid`.
-  2. Fetch JWKS from Clerk (cached for JWKS_TTL seconds).
-  3. Locate the matching key by `kid`.
+  2-3. Look up the parsed public key by `kid` in the JWKS key store
+       (refreshed from Clerk in the background; see _JwksKeyStore).
   4. Verify the token: signature, expiry, issuer (if configured), audience (if configured).
-  5. Return the verified claims dict.
+  5. Cache and return the verified claims (a read-only mapping).
 
 Public interface:
   - require_auth: FastAPI dependency that extracts + verifies the Bearer token.
 """
 
+import asyncio
+import hashlib
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
 
 import httpx
 import jwt
@@ -27,45 +32,233 @@ from app.core.config import settings
 from app.core.logging import logger
 from app.lib.errors import ApiException, auth_expired, auth_invalid, auth_missing
 
-# ── JWKS in-memory cache ──────────────────────────────────────────────────────
+# ── JWKS key store ────────────────────────────────────────────────────────────
 
-_JWKS_TTL = 600  # seconds — re-fetch every 10 minutes
-_jwks_cache: Optional[Dict[str, Any]] = None
-_jwks_cached_at: float = 0.0
+_JWKS_TTL = 600  # seconds — keys are considered fresh for 10 minutes
+_JWKS_REFRESH_AHEAD = 60  # seconds — refresh in the background this long before expiry
+_JWKS_UNKNOWN_KID_COOLDOWN = 30  # seconds — min gap between refreshes forced by unknown kids
+_JWKS_RETRY_BACKOFF = 30  # seconds — wait after a failed refresh before the next background one
 
 
-async def _get_jwks() -> Dict[str, Any]:
-    """Fetch and cache JWKS from Clerk. Thread-safe enough for single-process uvicorn."""
-    global _jwks_cache, _jwks_cached_at
-
-    now = time.monotonic()
-    if _jwks_cache is not None and (now - _jwks_cached_at) < _JWKS_TTL:
-        return _jwks_cache
+class _JwksKeyStore:
+    """
+    Parsed JWKS public keys indexed by `kid`.
+
+    - All refreshes go through a single in-flight task that every waiter shares.
+    - Near expiry the refresh runs in the background; callers keep using the
+      current keys. Only an empty or fully expired store blocks callers.
+    - An unknown `kid` forces at most one refresh per cooldown window, so a
+      flood of bad tokens cannot turn into a flood of JWKS fetches.
+    - A failed refresh keeps serving the previous keys, even past the TTL, and
+      the next attempt runs in the background retry_backoff seconds later, so
+      a JWKS outage never makes requests wait on the fetch timeout.
+    """
 
-    if not settings.CLERK_JWKS_URL:
-        raise ApiException(
-            code="CONFIG_ERROR",
-            message="CLERK_JWKS_URL is not configured.",
-            status_code=500,
-        )
+    def __init__(
+        self,
+        ttl: float,
+        refresh_ahead: float,
+        unknown_kid_cooldown: float,
+        retry_backoff: float = _JWKS_RETRY_BACKOFF,
+    ) -> None:
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.unknown_kid_cooldown = unknown_kid_cooldown
+        self.retry_backoff = retry_backoff
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at: float = 0.0
+        self._last_forced_at: float = float("-inf")
+        self._inflight: Optional[asyncio.Task[None]] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.fetches = 0
+
+    async def get_key(self, kid: str) -> Optional[Any]:
+        age = time.monotonic() - self._fetched_at
+        if not self._keys or age >= self.ttl:
+            await self._refresh()
+        elif age >= self.ttl - self.refresh_ahead:
+            self._start_refresh()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # The key may have been rotated; refresh once, unless one is already
+        # running (share it) or the cooldown since the last forced refresh is active.
+        now = time.monotonic()
+        if self._inflight is None and now - self._last_forced_at < self.unknown_kid_cooldown:
+            return None
+        self._last_forced_at = now
+        await self._refresh()
+        return self._keys.get(kid)
+
+    def _start_refresh(self) -> asyncio.Task[None]:
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(self._log_failure)
+        return self._inflight
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task[None]) -> None:
+        # Retrieves the exception even when no caller awaited the task (a
+        # background refresh, or every waiter cancelled).
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("JWKS refresh failed: %s", task.exception())
+
+    async def _refresh(self) -> None:
+        # shield: a cancelled waiter must not cancel the fetch other waiters share.
+        await asyncio.shield(self._start_refresh())
+
+    async def _fetch(self) -> None:
+        try:
+            if not settings.CLERK_JWKS_URL:
+                raise ApiException(
+                    code="CONFIG_ERROR",
+                    message="CLERK_JWKS_URL is not configured.",
+                    status_code=500,
+                )
+
+            logger.info("Fetching JWKS from %s", settings.CLERK_JWKS_URL)
+            if self._client is None:
+                self._client = httpx.AsyncClient(timeout=10)
+            self.fetches += 1
+            try:
+                resp = await self._client.get(settings.CLERK_JWKS_URL)
+                resp.raise_for_status()
+                keys = self._parse(resp.json())
+            except (httpx.HTTPError, ValueError) as exc:
+                if not self._keys:
+                    raise
+                logger.warning("JWKS refresh failed, keeping previous keys: %s", exc)
+                # Back into the refresh-ahead window once the backoff is over:
+                # the retry runs in the background and nobody blocks on it.
+                self._fetched_at = (
+                    time.monotonic() + self.retry_backoff - (self.ttl - self.refresh_ahead)
+                )
+                return
+
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            _token_cache.retain_kids(keys)
+        finally:
+            self._inflight = None
+
+    @staticmethod
+    def _parse(jwks: Dict[str, Any]) -> Dict[str, Any]:
+        keys: Dict[str, Any] = {}
+        for key_data in jwks.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid:
+                continue
+            try:
+                keys[kid] = RSAAlgorithm.from_jwk(key_data)
+            except (jwt.exceptions.InvalidKeyError, KeyError, ValueError) as exc:
+                logger.warning("Skipping unusable JWKS key %s: %s", kid, exc)
+        return keys
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_jwks_store = _JwksKeyStore(_JWKS_TTL, _JWKS_REFRESH_AHEAD, _JWKS_UNKNOWN_KID_COOLDOWN)
+
+
+async def close_jwks_client() -> None:
+    """Close the pooled JWKS HTTP client (called on app shutdown)."""
+    await _jwks_store.aclose()
+
+
+# ── Verified-token cache ──────────────────────────────────────────────────────
+
+_TOKEN_CACHE_MAX_ENTRIES = 2048
+_TOKEN_CACHE_MAX_TTL = 300  # seconds — upper bound even for long-lived tokens
+
+
+class _VerifiedTokenCache:
+    """
+    Bounded LRU of verified claims, keyed by the SHA-256 digest of the token.
 
-    logger.info("Fetching JWKS from %s", settings.CLERK_JWKS_URL)
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.get(settings.CLERK_JWKS_URL)
-        resp.raise_for_status()
+    Each entry expires at the token's `exp` (capped at _TOKEN_CACHE_MAX_TTL)
+    and is dropped when its signing `kid` disappears from the JWKS. Claims are
+    stored read-only (see _freeze) because every hit hands out the same object.
+    """
 
-    _jwks_cache = resp.json()
-    _jwks_cached_at = now
-    return _jwks_cache  # type: ignore[return-value]
+    def __init__(self, max_entries: int, max_ttl: float) -> None:
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        # digest -> (expires_at_epoch_seconds, kid, claims)
+        self._entries: "OrderedDict[str, Tuple[float, str, Mapping[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, digest: str) -> Optional[Mapping[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is None or time.time() >= entry[0]:
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, digest: str, kid: str, claims: Mapping[str, Any]) -> None:
+        expires_at = time.time() + self.max_ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        self._entries[digest] = (expires_at, kid, claims)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def retain_kids(self, kids: Iterable[Optional[str]]) -> None:
+        """Drop entries signed by keys that are no longer published."""
+        live = set(kids)
+        stale = [d for d, (_, kid, _) in self._entries.items() if kid not in live]
+        for d in stale:
+            del self._entries[d]
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_token_cache = _VerifiedTokenCache(_TOKEN_CACHE_MAX_ENTRIES, _TOKEN_CACHE_MAX_TTL)
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only copy of decoded JSON: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def token_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters and current size of the verified-token cache."""
+    return _token_cache.stats()
 
 
 # ── Token verification ────────────────────────────────────────────────────────
 
-async def verify_token(token: str) -> Dict[str, Any]:
+async def verify_token(token: str) -> Mapping[str, Any]:
     """
     Verify a Clerk-issued JWT.
-    Returns the verified claims dict on success; raises ApiException on failure.
+    Returns the verified claims as a read-only mapping, shared with every
+    other caller presenting the same token; raises ApiException on failure.
     """
+    digest = _token_cache.digest(token)
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        return cached
+
     # Decode header without verification to find the signing key.
     try:
         header = jwt.get_unverified_header(token)
@@ -76,20 +269,10 @@ async def verify_token(token: str) -> Dict[str, Any]:
     if not kid:
         raise auth_invalid("Token header is missing `kid`.")
 
-    jwks = await _get_jwks()
-    key_data = next((k for k in jwks.get("keys", []) if k.get("kid") == kid), None)
-    if key_data is None:
-        # The key may have been rotated; invalidate cache and retry once.
-        global _jwks_cache
-        _jwks_cache = None
-        jwks = await _get_jwks()
-        key_data = next((k for k in jwks.get("keys", []) if k.get("kid") == kid), None)
-
-    if key_data is None:
+    public_key = await _jwks_store.get_key(kid)
+    if public_key is None:
         raise auth_invalid("Token signing key not found in JWKS.")
 
-    public_key = RSAAlgorithm.from_jwk(key_data)
-
     decode_kwargs: Dict[str, Any] = {
         "algorithms": ["RS256"],
         "options": {"verify_exp": True},
@@ -100,7 +283,7 @@ async def verify_token(token: str) -> Dict[str, Any]:
         decode_kwargs["audience"] = settings.CLERK_AUDIENCE
 
     try:
-        claims: Dict[str, Any] = jwt.decode(token, public_key, **decode_kwargs)
+        decoded: Dict[str, Any] = jwt.decode(token, public_key, **decode_kwargs)
     except jwt.ExpiredSignatureError as exc:
         raise auth_expired() from exc
     except jwt.InvalidIssuerError as exc:
@@ -110,6 +293,8 @@ async def verify_token(token: str) -> Dict[str, Any]:
     except jwt.InvalidTokenError as exc:
         raise auth_invalid(f"Token validation failed: {exc}") from exc
 
+    claims: Mapping[str, Any] = _freeze(decoded)
+    _token_cache.set(digest, kid, claims)
     return claims
 
 
@@ -120,13 +305,13 @@ _bearer = HTTPBearer(auto_error=False)
 
 async def require_auth(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
-) -> Dict[str, Any]:
+) -> Mapping[str, Any]:
     """
     FastAPI dependency for protected endpoints.
 
     Usage:
         @router.get("/protected")
-        async def protected(claims: dict = Depends(require_auth)):
+        async def protected(claims: Mapping[str, Any] = Depends(require_auth)):
             ...
 
     Raises ApiException (→ 401) when the header is missing or the token is invalid.
@@ -11,7 +11,7 @@ Single source of truth for:
   - FastAPI dependency factory  (require_permission)
 """
 
-from typing import Any, Dict, Set
+from typing import Any, Dict, Mapping, Set
 
 from fastapi import Depends
 
@@ -55,7 +55,7 @@ ROLE_PERMISSIONS: Dict[str, Set[str]] = {
 
 # ── Claim helpers ──────────────────────────────────────────────────────────────
 
-def get_role(claims: Dict[str, Any]) -> str:
+def get_role(claims: Mapping[str, Any]) -> str:
     """
     Extract the user's role from verified JWT claims.
     Falls back to Roles.USER when the claim is absent.
@@ -64,12 +64,12 @@ def get_role(claims: Dict[str, Any]) -> str:
     return claims.get(settings.ADMIN_ROLE_CLAIM_KEY, Roles.USER)
 
 
-def get_permissions(claims: Dict[str, Any]) -> Set[str]:
+def get_permissions(claims: Mapping[str, Any]) -> Set[str]:
     """Return the full permission set for the role encoded in the claims."""
     return ROLE_PERMISSIONS.get(get_role(claims), set())
 
 
-def has_permission(claims: Dict[str, Any], permission: str) -> bool:
+def has_permission(claims: Mapping[str, Any], permission: str) -> bool:
     """Return True when the claims grant the requested permission."""
     return permission in get_permissions(claims)
 
@@ -83,15 +83,15 @@ def require_permission(permission: str):
     Usage:
         @router.post("/books")
         async def create_book(
-            claims: dict = Depends(require_permission(Permissions.MANAGE_BOOKS))
+            claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS))
         ):
             ...
 
     Raises 403 when the caller's role does not include the permission.
     """
     async def _dependency(
-        claims: Dict[str, Any] = Depends(require_auth),
-    ) -> Dict[str, Any]:
+        claims: Mapping[str, Any] = Depends(require_auth),
+    ) -> Mapping[str, Any]:
         if not has_permission(claims, permission):
             raise ApiException(
                 code="FORBIDDEN",
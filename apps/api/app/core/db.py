@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from typing import Generator
+from typing import AsyncGenerator
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.core.config import settings
 
+# Sync engine — used by Alembic and the offline scripts in scripts/.
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
@@ -14,15 +16,27 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine — used by every request handler. psycopg 3 serves both from the
+# same `postgresql+psycopg://` URL, so no separate setting is needed.
+async_engine = create_async_engine(
+    settings.DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
+
+# expire_on_commit=False: attributes must stay readable after commit, since an
+# AsyncSession cannot lazy-load them implicitly.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 class Base(DeclarativeBase):
     """Shared declarative base — all ORM models inherit from this."""
 
 
-def get_db() -> Generator[Session, None, None]:
-    """FastAPI dependency: yields a DB session and ensures it is closed."""
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency: yields an async DB session and ensures it is closed."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    CheckConstraint,
+    Computed,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.db import Base
@@ -35,11 +46,53 @@ class Book(Base):
         onupdate=func.now(),
         nullable=False,
     )
+    # Weighted full-text document (title A, author B, description C), generated
+    # by Postgres. Deferred so regular book reads don't fetch it.
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+        deferred=True,
+    )
 
     def __repr__(self) -> str:
         return f"<Book id={self.id} title={self.title!r}>"
 
 
+class BookCopy(Base):
+    """
+    One physical copy of a book. Checkout claims a free copy (loan_id IS NULL)
+    with FOR UPDATE SKIP LOCKED, so concurrent checkouts of one title do not
+    queue on a single row. Kept in sync under both circulation models.
+    """
+
+    __tablename__ = "book_copies"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    book_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("books.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # Active loan holding this copy; NULL when the copy is on the shelf.
+    loan_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True, unique=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<BookCopy id={self.id} book_id={self.book_id}>"
+
+
 class Loan(Base):
     __tablename__ = "loans"
 
@@ -69,7 +122,7 @@ class Loan(Base):
         DateTime(timezone=True), nullable=True
     )
 
-    # Relationship — loaded explicitly via joinedload after writes.
+    # Relationship — listings select the book columns they need instead (loans_repo).
     book: Mapped["Book"] = relationship("Book", lazy="select")
 
     # Convenience properties for Pydantic serialisation (from_attributes reads these).
@@ -87,3 +140,70 @@ class Loan(Base):
 
     def __repr__(self) -> str:
         return f"<Loan id={self.id} status={self.status!r}>"
+
+
+class LoanDailyBookStat(Base):
+    """
+    Per-book, per-day (UTC) loan counts, derived from loans once a day is over
+    (see daily_stats_service). Checkout and return never write here. Only days
+    before LoanDailyStatsWatermark.complete_before are complete; analytics
+    reads those from here and everything after from loans.
+    """
+
+    __tablename__ = "loan_daily_book_stats"
+
+    book_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("books.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    # Loans borrowed / returned on this day.
+    borrows: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    returns: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
+    def __repr__(self) -> str:
+        return f"<LoanDailyBookStat book_id={self.book_id} day={self.day}>"
+
+
+class LoanDailyStatsWatermark(Base):
+    """Single row: loan_daily_book_stats is complete for days before complete_before."""
+
+    __tablename__ = "loan_daily_stats_watermark"
+    __table_args__ = (CheckConstraint("id = 1", name="ck_loan_daily_stats_watermark_single_row"),)
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=1)
+    complete_before: Mapped[date] = mapped_column(Date, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<LoanDailyStatsWatermark complete_before={self.complete_before}>"
+
+
+class User(Base):
+    """
+    Local mirror of the Clerk user directory, kept in sync by users_service
+    (periodic paginated sync + Clerk webhooks). Borrower search reads this
+    table instead of calling Clerk.
+    """
+
+    __tablename__ = "users"
+
+    # Clerk user id (user_...).
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    display_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    email: Mapped[Optional[str]] = mapped_column(String(320), nullable=True)
+    # Clerk's updated_at for the user — the incremental sync watermark.
+    clerk_updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+    # Last time a sync or webhook wrote this row; a full sync drops rows it did not see.
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<User id={self.id} display_name={self.display_name!r}>"
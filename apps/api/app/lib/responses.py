@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+"""
+Fast JSON responses for list endpoints.
+
+A route that returns a response model has FastAPI validate it again against
+response_model and then encode it with the json module. The list routes
+instead project their DB rows onto the item model's camelCase aliases once
+and return a PageResponse, which encodes with orjson. Rows come from our own
+typed queries, so they are not validated again.
+
+The bytes are the ones JSONResponse sends for the equivalent model: compact,
+raw UTF-8, UUIDs as strings and datetimes as pydantic writes them (a zero UTC
+offset as "Z").
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+@lru_cache(maxsize=None)
+def _aliases(model: Type[BaseModel]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((name, field.alias or name) for name, field in model.model_fields.items())
+
+
+def to_camel_dicts(model: Type[BaseModel], rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """`model`-shaped camelCase dicts from ORM objects, Rows or mappings."""
+    aliases = _aliases(model)
+    return [
+        {alias: row[name] for name, alias in aliases}
+        if isinstance(row, Mapping)
+        else {alias: getattr(row, name) for name, alias in aliases}
+        for row in rows
+    ]
+
+
+class PageResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def page_response(
+    model: Type[BaseModel], rows: Iterable[Any], next_cursor: Optional[str]
+) -> PageResponse:
+    """The {"items", "nextCursor"} body of a *ListOut, built from rows of `model`."""
+    return PageResponse({"items": to_camel_dicts(model, rows), "nextCursor": next_cursor})
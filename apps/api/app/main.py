@@ -3,14 +3,23 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.core.auth import close_jwks_client
 from app.core.config import settings
+from app.core.db import async_engine
 from app.core.logging import configure_logging, logger
 from app.lib.errors import ApiException
+from app.services import (
+    ai_insights_service,
+    availability_service,
+    daily_stats_service,
+    users_service,
+)
 from app.v1.routes.analytics import router as analytics_router
 from app.v1.routes.books import router as books_router
 from app.v1.routes.loans import router as loans_router
 from app.v1.routes.ping import router as ping_router
 from app.v1.routes.users import router as users_router
+from app.v1.routes.webhooks import router as webhooks_router
 from app.v1.routes.whoami import router as whoami_router
 
 configure_logging()
@@ -75,6 +84,7 @@ app.include_router(books_router, prefix="/v1")
 app.include_router(loans_router, prefix="/v1")
 app.include_router(users_router, prefix="/v1")
 app.include_router(analytics_router, prefix="/v1")
+app.include_router(webhooks_router, prefix="/v1")
 
 
 # ── Health (public) ───────────────────────────────────────────────────────────
@@ -85,9 +95,23 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
-# ── Startup ───────────────────────────────────────────────────────────────────
+# ── Startup / shutdown ────────────────────────────────────────────────────────
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
     logger.info("Starting Library API | ENV=%s PORT=%s", settings.ENV, settings.PORT)
+    availability_service.start()
+    daily_stats_service.start()
+    ai_insights_service.start()
+    users_service.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await availability_service.stop()
+    await daily_stats_service.stop()
+    await ai_insights_service.stop()
+    await users_service.stop()
+    await close_jwks_client()
+    await async_engine.dispose()
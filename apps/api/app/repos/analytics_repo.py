@@ -6,13 +6,39 @@ All queries run against the DB — no in-memory filtering.
 """
 
 import uuid
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List
-
-from sqlalchemy import and_, case, func, or_
-from sqlalchemy.orm import Session
-
-from app.domain.models import Book, Loan
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    BigInteger,
+    CTE,
+    CompoundSelect,
+    Date,
+    DateTime,
+    Integer,
+    Select,
+    String,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.domain.models import Book, Loan, LoanDailyBookStat, LoanDailyStatsWatermark
+
+
+_daily = LoanDailyBookStat.__table__
+_watermark = LoanDailyStatsWatermark.__table__
 
 
 def _now_utc() -> datetime:
@@ -22,43 +48,43 @@ def _now_utc() -> datetime:
 # ── Individual metric queries ──────────────────────────────────────────────────
 
 
-def total_books(db: Session) -> int:
-    return db.query(func.count(Book.id)).scalar() or 0
+async def total_books(db: AsyncSession) -> int:
+    return (await db.scalar(select(func.count(Book.id)))) or 0
 
 
-def total_available_copies(db: Session) -> int:
-    return db.query(func.sum(Book.available_copies)).scalar() or 0
+async def total_available_copies(db: AsyncSession) -> int:
+    return (await db.scalar(select(func.sum(Book.available_copies)))) or 0
 
 
-def active_loans_count(db: Session) -> int:
+async def active_loans_count(db: AsyncSession) -> int:
     """All currently borrowed (unreturned) loans."""
-    return db.query(func.count(Loan.id)).filter(Loan.status == "borrowed").scalar() or 0
+    return (
+        await db.scalar(select(func.count(Loan.id)).where(Loan.status == "borrowed"))
+    ) or 0
 
 
-def loans_in_window(db: Session, cutoff: datetime) -> int:
+async def loans_in_window(db: AsyncSession, cutoff: datetime) -> int:
     """Loans created within the analytics window."""
     return (
-        db.query(func.count(Loan.id))
-        .filter(Loan.borrowed_at >= cutoff)
-        .scalar()
-        or 0
-    )
+        await db.scalar(select(func.count(Loan.id)).where(Loan.borrowed_at >= cutoff))
+    ) or 0
 
 
-def returned_loans_in_window(db: Session, cutoff: datetime) -> int:
+async def returned_loans_in_window(db: AsyncSession, cutoff: datetime) -> int:
     """Loans returned within the analytics window."""
     return (
-        db.query(func.count(Loan.id))
-        .filter(Loan.status == "returned", Loan.returned_at >= cutoff)
-        .scalar()
-        or 0
-    )
+        await db.scalar(
+            select(func.count(Loan.id)).where(
+                Loan.status == "returned", Loan.returned_at >= cutoff
+            )
+        )
+    ) or 0
 
 
 # ── Trending books ─────────────────────────────────────────────────────────────
 
 
-def trending_books(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict[str, Any]]:
+async def trending_books(db: AsyncSession, cutoff: datetime, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Top books by number of loans borrowed_at within the window.
     Returns dicts with bookId, title, author, borrowCount, availableCopies.
@@ -67,8 +93,8 @@ def trending_books(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict[s
         case((Loan.borrowed_at >= cutoff, Loan.id), else_=None)
     )
 
-    rows = (
-        db.query(
+    result = await db.execute(
+        select(
             Book.id,
             Book.title,
             Book.author,
@@ -79,8 +105,8 @@ def trending_books(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict[s
         .group_by(Book.id, Book.title, Book.author, Book.available_copies)
         .order_by(borrow_count_expr.desc())
         .limit(limit)
-        .all()
     )
+    rows = result.all()
 
     return [
         {
@@ -97,7 +123,7 @@ def trending_books(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict[s
 # ── Low stock alerts ───────────────────────────────────────────────────────────
 
 
-def low_stock_alerts(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict[str, Any]]:
+async def low_stock_alerts(db: AsyncSession, cutoff: datetime, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Books where available_copies <= 1
     OR (available_copies <= 2 AND borrow_count_in_window >= 3).
@@ -107,8 +133,8 @@ def low_stock_alerts(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict
         case((Loan.borrowed_at >= cutoff, Loan.id), else_=None)
     )
 
-    rows = (
-        db.query(
+    result = await db.execute(
+        select(
             Book.id,
             Book.title,
             Book.author,
@@ -125,8 +151,8 @@ def low_stock_alerts(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict
         )
         .order_by(Book.available_copies.asc(), borrow_count_expr.desc())
         .limit(limit)
-        .all()
     )
+    rows = result.all()
 
     return [
         {
@@ -143,7 +169,7 @@ def low_stock_alerts(db: Session, cutoff: datetime, limit: int = 5) -> List[Dict
 # ── Dormant books ──────────────────────────────────────────────────────────────
 
 
-def dormant_books(db: Session, dormant_days: int = 90, limit: int = 5) -> List[Dict[str, Any]]:
+async def dormant_books(db: AsyncSession, dormant_days: int = 90, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Books with no loans in the last `dormant_days` days (or never borrowed).
     Ordered by last_borrowed_at ASC (nulls first).
@@ -151,8 +177,8 @@ def dormant_books(db: Session, dormant_days: int = 90, limit: int = 5) -> List[D
     dormant_cutoff = _now_utc() - timedelta(days=dormant_days)
     last_borrowed_expr = func.max(Loan.borrowed_at)
 
-    rows = (
-        db.query(
+    result = await db.execute(
+        select(
             Book.id,
             Book.title,
             Book.author,
@@ -168,8 +194,8 @@ def dormant_books(db: Session, dormant_days: int = 90, limit: int = 5) -> List[D
         )
         .order_by(last_borrowed_expr.asc().nullsfirst())
         .limit(limit)
-        .all()
     )
+    rows = result.all()
 
     return [
         {
@@ -182,19 +208,352 @@ def dormant_books(db: Session, dormant_days: int = 90, limit: int = 5) -> List[D
     ]
 
 
-# ── Aggregate entry point ──────────────────────────────────────────────────────
+# ── Aggregate entry points ─────────────────────────────────────────────────────
 
 
-def compute_metrics(db: Session, window_days: int) -> Dict[str, Any]:
+async def compute_metrics_per_query(db: AsyncSession, window_days: int) -> Dict[str, Any]:
+    """
+    Reference implementation: one query per metric (eight round trips, three
+    full books ⟕ loans aggregations). Kept to cross-check compute_metrics.
+    """
     cutoff = _now_utc() - timedelta(days=window_days)
 
     return {
-        "totalBooks": total_books(db),
-        "totalLoans": loans_in_window(db, cutoff),
-        "activeLoans": active_loans_count(db),
-        "returnedLoans": returned_loans_in_window(db, cutoff),
-        "totalAvailableCopies": total_available_copies(db),
-        "trendingBooks": trending_books(db, cutoff),
-        "lowStockAlerts": low_stock_alerts(db, cutoff),
-        "dormantBooks": dormant_books(db),
+        "totalBooks": await total_books(db),
+        "totalLoans": await loans_in_window(db, cutoff),
+        "activeLoans": await active_loans_count(db),
+        "returnedLoans": await returned_loans_in_window(db, cutoff),
+        "totalAvailableCopies": await total_available_copies(db),
+        "trendingBooks": await trending_books(db, cutoff),
+        "lowStockAlerts": await low_stock_alerts(db, cutoff),
+        "dormantBooks": await dormant_books(db),
     }
+
+
+def _loans_per_book(cutoff: datetime) -> CTE:
+    """
+    Per-book window counts from one pass over loans:
+
+        SELECT book_id, count(*) FILTER (...), ..., max(borrowed_at) FROM loans GROUP BY book_id
+    """
+    return (
+        select(
+            Loan.book_id,
+            func.count().filter(Loan.borrowed_at >= cutoff).label("window_borrows"),
+            func.count().filter(Loan.status == "borrowed").label("active"),
+            func.count()
+            .filter(and_(Loan.status == "returned", Loan.returned_at >= cutoff))
+            .label("window_returns"),
+            func.max(Loan.borrowed_at).label("last_borrowed_at"),
+        )
+        .group_by(Loan.book_id)
+        .cte("per_book")
+    )
+
+
+def _rollup_per_book(cutoff: datetime) -> CTE:
+    """
+    Per-book window counts without touching loan history:
+
+      - whole UTC days after the cutoff's day and before the watermark come
+        from loan_daily_book_stats,
+      - the rest of the cutoff's day and everything from the watermark on come
+        from loans (ix_loans_borrowed_at_id / ix_loans_returned_at range scans
+        bounded to those spans; normally one partial day each),
+      - active loans come from loans via the partial ix_loans_active_borrowed_at_id.
+
+    With no watermark yet (or one before the cutoff) the rollup contributes
+    nothing and the window is read from loans. Cost is O(books × days) plus
+    about two days of loans, and matches _loans_per_book exactly.
+    """
+    cutoff_day = cutoff.astimezone(timezone.utc).date()
+    next_midnight = datetime.combine(cutoff_day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    complete_before = select(_watermark.c.complete_before).scalar_subquery()
+    # greatest() ignores NULL: without a watermark, loans are read from next_midnight on.
+    loans_from = func.greatest(
+        literal(next_midnight, DateTime(timezone=True)),
+        func.timezone(literal_column("'UTC'"), cast(complete_before, DateTime)),
+    )
+    one, zero = literal(1, Integer), literal(0, Integer)
+    rows = union_all(
+        select(_daily.c.book_id, _daily.c.borrows, _daily.c.returns, zero.label("active")).where(
+            _daily.c.day > cutoff_day, _daily.c.day < complete_before
+        ),
+        select(Loan.book_id, one, zero, zero).where(
+            Loan.borrowed_at >= cutoff, Loan.borrowed_at < next_midnight
+        ),
+        select(Loan.book_id, one, zero, zero).where(Loan.borrowed_at >= loans_from),
+        select(Loan.book_id, zero, one, zero).where(
+            Loan.status == "returned", Loan.returned_at >= cutoff, Loan.returned_at < next_midnight
+        ),
+        select(Loan.book_id, zero, one, zero).where(
+            Loan.status == "returned", Loan.returned_at >= loans_from
+        ),
+        select(Loan.book_id, zero, zero, one).where(Loan.status == "borrowed"),
+    ).subquery("window_rows")
+    return (
+        select(
+            rows.c.book_id,
+            func.sum(rows.c.borrows).label("window_borrows"),
+            func.sum(rows.c.active).label("active"),
+            func.sum(rows.c.returns).label("window_returns"),
+        )
+        .group_by(rows.c.book_id)
+        .cte("per_book")
+    )
+
+
+def _metrics_stmt(
+    per_book: CTE, last_borrowed_at: Any, dormant_cutoff: datetime, limit: int
+) -> CompoundSelect:
+    """
+    One statement for every metric. Totals and the three top-N lists are
+    derived from the per-book window counts:
+
+        WITH per_book AS (...),
+             stats    AS (SELECT books.*, per_book.* FROM books LEFT JOIN per_book ...)
+        SELECT 'totals' ... FROM stats
+        UNION ALL SELECT 'trending' ... FROM stats ORDER BY ... LIMIT n
+        UNION ALL SELECT 'low_stock' ...
+        UNION ALL SELECT 'dormant' ...
+
+    Rows are (kind, pos, book columns..., totals columns...); columns that do
+    not apply to a row's kind are NULL.
+    """
+    stats = (
+        select(
+            Book.id,
+            Book.title,
+            Book.author,
+            Book.available_copies,
+            func.coalesce(per_book.c.window_borrows, 0).label("borrow_count"),
+            func.coalesce(per_book.c.active, 0).label("active"),
+            func.coalesce(per_book.c.window_returns, 0).label("window_returns"),
+            last_borrowed_at.label("last_borrowed_at"),
+        )
+        .outerjoin(per_book, per_book.c.book_id == Book.id)
+        .cte("stats")
+    )
+
+    no_int = literal(None, BigInteger)
+    totals = select(
+        literal("totals").label("kind"),
+        literal(0, BigInteger).label("pos"),
+        literal(None, Book.id.type).label("book_id"),
+        literal(None, String).label("title"),
+        literal(None, String).label("author"),
+        literal(None, Integer).label("available_copies"),
+        no_int.label("borrow_count"),
+        literal(None, stats.c.last_borrowed_at.type).label("last_borrowed_at"),
+        func.count().label("total_books"),
+        cast(func.coalesce(func.sum(stats.c.borrow_count), 0), BigInteger).label("total_loans"),
+        cast(func.coalesce(func.sum(stats.c.active), 0), BigInteger).label("active_loans"),
+        cast(func.coalesce(func.sum(stats.c.window_returns), 0), BigInteger).label("returned_loans"),
+        cast(func.coalesce(func.sum(stats.c.available_copies), 0), BigInteger).label(
+            "total_available_copies"
+        ),
+    ).select_from(stats)
+
+    def _top(kind: str, order_by: List[Any], *where: Any) -> Select:
+        return (
+            select(
+                literal(kind).label("kind"),
+                func.row_number().over(order_by=order_by).label("pos"),
+                stats.c.id,
+                stats.c.title,
+                stats.c.author,
+                stats.c.available_copies,
+                stats.c.borrow_count,
+                stats.c.last_borrowed_at,
+                no_int,
+                no_int,
+                no_int,
+                no_int,
+                no_int,
+            )
+            .where(*where)
+            .order_by(*order_by)
+            .limit(limit)
+        )
+
+    trending = _top("trending", [stats.c.borrow_count.desc()])
+    low_stock = _top(
+        "low_stock",
+        [stats.c.available_copies.asc(), stats.c.borrow_count.desc()],
+        or_(
+            stats.c.available_copies <= 1,
+            and_(stats.c.available_copies <= 2, stats.c.borrow_count >= 3),
+        ),
+    )
+    dormant = _top(
+        "dormant",
+        [stats.c.last_borrowed_at.asc().nullsfirst()],
+        or_(stats.c.last_borrowed_at.is_(None), stats.c.last_borrowed_at < dormant_cutoff),
+    )
+    return union_all(totals, trending, low_stock, dormant)
+
+
+async def compute_metrics(
+    db: AsyncSession,
+    window_days: int,
+    *,
+    dormant_days: int = 90,
+    limit: int = 5,
+    use_rollup: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    All analytics metrics in one round trip. Window counts come from one pass
+    over loans, or from the loan_daily_book_stats rollup when use_rollup (default
+    settings.ANALYTICS_USE_ROLLUP) is set. Returns the same shape as
+    compute_metrics_per_query.
+    """
+    if use_rollup is None:
+        use_rollup = settings.ANALYTICS_USE_ROLLUP
+    now = _now_utc()
+    cutoff = now - timedelta(days=window_days)
+    if use_rollup:
+        per_book = _rollup_per_book(cutoff)
+        # max() per book is a single probe of ix_loans_book_borrowed_at_id.
+        last_borrowed_at = (
+            select(func.max(Loan.borrowed_at)).where(Loan.book_id == Book.id).scalar_subquery()
+        )
+    else:
+        per_book = _loans_per_book(cutoff)
+        last_borrowed_at = per_book.c.last_borrowed_at
+    result = await db.execute(
+        _metrics_stmt(per_book, last_borrowed_at, now - timedelta(days=dormant_days), limit)
+    )
+
+    totals: Any = None
+    lists: Dict[str, List[Any]] = {"trending": [], "low_stock": [], "dormant": []}
+    for row in result.all():
+        if row.kind == "totals":
+            totals = row
+        else:
+            lists[row.kind].append(row)
+    for rows in lists.values():
+        rows.sort(key=lambda r: r.pos)
+
+    return {
+        "totalBooks": totals.total_books or 0,
+        "totalLoans": totals.total_loans or 0,
+        "activeLoans": totals.active_loans or 0,
+        "returnedLoans": totals.returned_loans or 0,
+        "totalAvailableCopies": totals.total_available_copies or 0,
+        "trendingBooks": [
+            {
+                "bookId": str(r.book_id),
+                "title": r.title,
+                "author": r.author,
+                "borrowCount": r.borrow_count or 0,
+                "availableCopies": r.available_copies,
+            }
+            for r in lists["trending"]
+        ],
+        "lowStockAlerts": [
+            {
+                "bookId": str(r.book_id),
+                "title": r.title,
+                "author": r.author,
+                "availableCopies": r.available_copies,
+                "borrowCount": r.borrow_count or 0,
+            }
+            for r in lists["low_stock"]
+        ],
+        "dormantBooks": [
+            {
+                "bookId": str(r.book_id),
+                "title": r.title,
+                "author": r.author,
+                "lastBorrowedAt": r.last_borrowed_at.isoformat() if r.last_borrowed_at else None,
+            }
+            for r in lists["dormant"]
+        ],
+    }
+
+
+# ── Daily rollup maintenance ───────────────────────────────────────────────────
+
+
+def _utc_day(column: Any) -> Any:
+    return cast(func.timezone(literal_column("'UTC'"), column), Date)
+
+
+async def rebuild_daily_stats(db: AsyncSession, start: date, end: date) -> int:
+    """
+    Recompute loan_daily_book_stats for UTC days in [start, end) from loans.
+
+    Takes a SHARE ROW EXCLUSIVE lock on the rollup first, so concurrent
+    rebuilds (the background job in every process, the backfill script) run
+    one at a time; readers are not blocked. Returns the number of rows
+    written. Does not commit.
+    """
+    await db.execute(text("LOCK TABLE loan_daily_book_stats IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(delete(_daily).where(_daily.c.day >= start, _daily.c.day < end))
+
+    lo = datetime.combine(start, time.min, tzinfo=timezone.utc)
+    hi = datetime.combine(end, time.min, tzinfo=timezone.utc)
+    one, zero = literal(1, Integer), literal(0, Integer)
+    events = union_all(
+        select(Loan.book_id, _utc_day(Loan.borrowed_at).label("day"), one.label("b"), zero.label("r"))
+        .where(Loan.borrowed_at >= lo, Loan.borrowed_at < hi),
+        select(Loan.book_id, _utc_day(Loan.returned_at), zero, one)
+        .where(Loan.status == "returned", Loan.returned_at >= lo, Loan.returned_at < hi),
+    ).subquery("events")
+    result = await db.execute(
+        pg_insert(_daily)
+        .from_select(
+            ["book_id", "day", "borrows", "returns"],
+            select(
+                events.c.book_id,
+                events.c.day,
+                func.sum(events.c.b),
+                func.sum(events.c.r),
+            ).group_by(events.c.book_id, events.c.day),
+        )
+        .returning(_daily.c.book_id)
+    )
+    return len(result.all())
+
+
+async def daily_stats_watermark(db: AsyncSession) -> Optional[date]:
+    """First day loan_daily_book_stats is not complete for, or None before the first run."""
+    return await db.scalar(select(_watermark.c.complete_before))
+
+
+async def advance_daily_stats(
+    db: AsyncSession, complete_before: date, max_days: int
+) -> Optional[Tuple[date, date]]:
+    """
+    Roll up the next finished days: rebuild [watermark, min(watermark +
+    max_days, complete_before)) from loans and move the watermark to the end
+    of that range. Starts from the oldest loan when there is no watermark yet.
+
+    Returns the range rebuilt, or None when the rollup is already complete up
+    to complete_before. The rollup lock is taken before the watermark is read,
+    so concurrent callers do not rebuild the same days. Does not commit.
+    """
+    await db.execute(text("LOCK TABLE loan_daily_book_stats IN SHARE ROW EXCLUSIVE MODE"))
+    start = await daily_stats_watermark(db) or await first_loan_day(db)
+    if start is None or start >= complete_before:
+        return None
+    end = min(start + timedelta(days=max_days), complete_before)
+    await rebuild_daily_stats(db, start, end)
+    await _set_watermark(db, end)
+    return start, end
+
+
+async def _set_watermark(db: AsyncSession, complete_before: date) -> None:
+    stmt = pg_insert(_watermark).values(id=1, complete_before=complete_before)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[_watermark.c.id],
+            set_={"complete_before": stmt.excluded.complete_before},
+        )
+    )
+
+
+async def first_loan_day(db: AsyncSession) -> Optional[date]:
+    """UTC day of the oldest loan, or None when there are no loans."""
+    first = await db.scalar(select(func.min(Loan.borrowed_at)))
+    return first.astimezone(timezone.utc).date() if first else None
@@ -1,25 +1,155 @@
 from __future__ import annotations
 
+import re
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy import func, or_, and_, select
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Integer,
+    MetaData,
+    Row,
+    Select,
+    String,
+    Table,
+    Text,
+    and_,
+    any_,
+    bindparam,
+    case,
+    cast,
+    column,
+    exists,
+    false,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    true,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, REGCONFIG, UUID
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 
-from app.domain.models import Book
+from app.domain.models import Book, BookCopy
 
+# Text-search configuration used by books.search_vector (see migration 006).
+_TS_CONFIG = cast("simple", REGCONFIG)
 
-def create(db: Session, data: dict) -> Book:
+# Minimum pg_trgm similarity on both title and author for an existing book to be
+# reported as a duplicate candidate. Exact (case-insensitive) matches score 1.0.
+DUPLICATE_SIMILARITY = 0.7
+
+# Normalised ISBN (digits and X only), indexed by ix_books_isbn_normalized
+# (migration 012). The arguments are inlined so the expression matches the index.
+ISBN_KEY = func.regexp_replace(
+    func.upper(Book.isbn),
+    literal_column("'[^0-9X]'"),
+    literal_column("''"),
+    literal_column("'g'"),
+)
+
+# Key for pg_advisory_xact_lock: bulk imports run one at a time, so two imports
+# of the same file cannot both find a title missing and both insert it.
+IMPORT_LOCK_KEY = 0x696D7074  # "impt"
+
+# Per-transaction staging table for bulk imports, filled with COPY.
+_import = Table(
+    "book_import",
+    MetaData(),
+    Column("line", Integer, primary_key=True, autoincrement=False),
+    Column("title", Text, nullable=False),
+    Column("author", Text, nullable=False),
+    Column("description", Text),
+    Column("isbn", Text),
+    Column("isbn_key", Text),  # normalize_isbn(isbn), NULL without an ISBN
+    Column("published_year", Integer),
+    Column("available_copies", Integer, nullable=False),
+    Column("cover_image_url", Text),
+    Column("duplicate", Boolean, nullable=False, server_default=false()),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+IMPORT_COLUMNS = [c.name for c in _import.c if c.name != "duplicate"]
+
+
+def normalize_isbn(isbn: str) -> str:
+    """Python twin of ISBN_KEY: "978-0-306-40615-7" -> "9780306406157"."""
+    return re.sub(r"[^0-9X]", "", isbn.upper())
+
+
+async def create(db: AsyncSession, data: dict) -> Book:
     book = Book(**data)
     db.add(book)
-    db.commit()
-    db.refresh(book)
+    await db.flush()
+    # One book_copies row per available copy (see BookCopy).
+    await db.execute(
+        insert(BookCopy).from_select(
+            ["id", "book_id"],
+            select(func.gen_random_uuid(), literal(book.id, BookCopy.book_id.type)).select_from(
+                func.generate_series(1, book.available_copies)
+            ),
+        )
+    )
+    await db.commit()
+    await db.refresh(book)
     return book
 
 
-def list_paginated(
-    db: Session,
+def _prefix_tsquery(text: str) -> Optional[str]:
+    """
+    Turn free text into a tsquery string where every word must match as a prefix,
+    e.g. "harry pot" → "harry:* & pot:*". Returns None when there are no words.
+    """
+    words = re.findall(r"[^\W_]+", text.lower())
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def _select_books(columns: Optional[Sequence[str]], *extra: Any) -> Select:
+    """select(Book, *extra), or only the named books columns when `columns` is given."""
+    if columns is None:
+        return select(Book, *extra)
+    return select(*(Book.__table__.c[name] for name in columns), *extra)
+
+
+def _apply_filters(
+    stmt: Select,
+    *,
+    query: Optional[str],
+    author: Optional[str],
+    available_only: bool,
+) -> Select:
+    if query:
+        tsquery = _prefix_tsquery(query)
+        if tsquery is None:
+            stmt = stmt.where(false())
+        else:
+            stmt = stmt.where(
+                Book.search_vector.bool_op("@@")(func.to_tsquery(_TS_CONFIG, tsquery))
+            )
+    if author:
+        # Substring match, or a word in `author` similar enough to tolerate typos
+        # (`%>` is word similarity). Both sides are served by ix_books_author_trgm.
+        stmt = stmt.where(
+            or_(Book.author.ilike(f"%{author}%"), Book.author.op("%>")(author))
+        )
+    if available_only:
+        stmt = stmt.where(Book.available_copies > 0)
+    return stmt
+
+
+async def list_paginated(
+    db: AsyncSession,
     *,
     query: Optional[str] = None,
     author: Optional[str] = None,
@@ -27,37 +157,36 @@ def list_paginated(
     sort: str = "createdAt:desc",
     limit: int = 21,
     cursor_data: Optional[Dict[str, Any]] = None,
-) -> List[Book]:
+    columns: Optional[Sequence[str]] = None,
+) -> List[Union[Book, Row]]:
     """
     Filtered, sorted, cursor-paginated book list.
     Caller should request limit+1 rows to detect whether a next page exists.
 
+    With `columns` (books column names) only those are selected and plain rows
+    are returned instead of Book objects; they must include the cursor fields
+    of `sort`.
+
+    `query` matches title/author/description through the full-text index; each
+    word matches as a prefix. `author` matches as a substring or fuzzily.
+
+    Keyset predicates are row comparisons so they become index range bounds on
+    ix_books_created_at_id / ix_books_title_lower_id (migration 008).
+
     Cursor shape per sort:
       createdAt:desc / createdAt:asc  →  {"ts": "<ISO datetime>", "id": "<uuid>"}
       title:asc                       →  {"title": "<lower-case title>", "id": "<uuid>"}
     """
-    stmt = select(Book)
-
-    # ── Filters ────────────────────────────────────────────────────────────────
-    if query:
-        pattern = f"%{query}%"
-        stmt = stmt.where(or_(Book.title.ilike(pattern), Book.author.ilike(pattern)))
-    if author:
-        stmt = stmt.where(Book.author.ilike(f"%{author}%"))
-    if available_only:
-        stmt = stmt.where(Book.available_copies > 0)
+    stmt = _apply_filters(
+        _select_books(columns), query=query, author=author, available_only=available_only
+    )
 
     # ── Sort + cursor ──────────────────────────────────────────────────────────
     if sort == "createdAt:asc":
         if cursor_data:
             ts = datetime.fromisoformat(cursor_data["ts"])
             cid = uuid.UUID(cursor_data["id"])
-            stmt = stmt.where(
-                or_(
-                    Book.created_at > ts,
-                    and_(Book.created_at == ts, Book.id > cid),
-                )
-            )
+            stmt = stmt.where(tuple_(Book.created_at, Book.id) > tuple_(ts, cid))
         stmt = stmt.order_by(Book.created_at.asc(), Book.id.asc())
 
     elif sort == "title:asc":
@@ -65,10 +194,7 @@ def list_paginated(
             title_lc = cursor_data["title"]  # stored pre-lowercased
             cid = uuid.UUID(cursor_data["id"])
             stmt = stmt.where(
-                or_(
-                    func.lower(Book.title) > title_lc,
-                    and_(func.lower(Book.title) == title_lc, Book.id > cid),
-                )
+                tuple_(func.lower(Book.title), Book.id) > tuple_(title_lc, cid)
             )
         stmt = stmt.order_by(func.lower(Book.title).asc(), Book.id.asc())
 
@@ -76,34 +202,397 @@ def list_paginated(
         if cursor_data:
             ts = datetime.fromisoformat(cursor_data["ts"])
             cid = uuid.UUID(cursor_data["id"])
-            stmt = stmt.where(
-                or_(
-                    Book.created_at < ts,
-                    and_(Book.created_at == ts, Book.id < cid),
-                )
-            )
+            stmt = stmt.where(tuple_(Book.created_at, Book.id) < tuple_(ts, cid))
         stmt = stmt.order_by(Book.created_at.desc(), Book.id.desc())
 
     stmt = stmt.limit(limit)
-    return list(db.execute(stmt).scalars().all())
+    result = await db.execute(stmt)
+    return list(result.scalars().all() if columns is None else result.all())
+
+
+async def search_ranked(
+    db: AsyncSession,
+    *,
+    query: Optional[str] = None,
+    author: Optional[str] = None,
+    available_only: bool = False,
+    limit: int = 21,
+    cursor_data: Optional[Dict[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> List[Tuple[Union[Book, Row], float]]:
+    """
+    Search ordered by relevance (rank DESC, id DESC).
+    Rank is the full-text rank for `query` plus the author word similarity for
+    `author`; at least one of them must be given.
+    Returns (book, rank) pairs so the caller can build the next cursor; with
+    `columns`, each book is a row of just those columns (id must be one).
 
+    Cursor shape: {"rank": <float>, "id": "<uuid>"}
+    """
+    rank_terms = []
+    if query:
+        tsquery = _prefix_tsquery(query)
+        if tsquery is None:
+            return []
+        rank_terms.append(
+            func.ts_rank_cd(Book.search_vector, func.to_tsquery(_TS_CONFIG, tsquery))
+        )
+    if author:
+        rank_terms.append(func.word_similarity(author, Book.author))
+    if not rank_terms:
+        return []
+
+    rank = rank_terms[0] if len(rank_terms) == 1 else rank_terms[0] + rank_terms[1]
+    stmt = _apply_filters(
+        _select_books(columns, rank.label("rank")),
+        query=query,
+        author=author,
+        available_only=available_only,
+    )
+
+    if cursor_data:
+        last_rank = float(cursor_data["rank"])
+        cid = uuid.UUID(cursor_data["id"])
+        stmt = stmt.where(
+            or_(
+                rank < last_rank,
+                and_(rank == last_rank, Book.id < cid),
+            )
+        )
 
-def get_by_id(db: Session, book_id: uuid.UUID) -> Optional[Book]:
-    return db.query(Book).filter(Book.id == book_id).first()
+    stmt = stmt.order_by(rank.desc(), Book.id.desc()).limit(limit)
+    result = await db.execute(stmt)
+    if columns is None:
+        return [(book, book_rank) for book, book_rank in result.all()]
+    return [(row, row.rank) for row in result.all()]
 
 
-def get_for_update(db: Session, book_id: uuid.UUID) -> Optional[Book]:
-    """Fetch a book row with SELECT FOR UPDATE for use inside a transaction."""
+def duplicate_candidates_stmt(items: Sequence[Tuple[str, str]]) -> Select:
+    """
+    One query that finds existing books resembling any of the given
+    (title, author) pairs. Rows are (idx, id, title, author) where idx is the
+    position of the pair in `items`.
+
+    `%` prefilters through the trigram indexes; the similarity() recheck
+    applies the stricter DUPLICATE_SIMILARITY threshold.
+    """
+    candidates = values(
+        column("idx", Integer),
+        column("title", String),
+        column("author", String),
+        name="candidates",
+    ).data([(i, title, author) for i, (title, author) in enumerate(items)])
+
     return (
-        db.execute(select(Book).where(Book.id == book_id).with_for_update())
-        .scalar_one_or_none()
+        select(candidates.c.idx, Book.id, Book.title, Book.author)
+        .select_from(candidates)
+        .join(
+            Book,
+            and_(
+                Book.title.op("%")(candidates.c.title),
+                Book.author.op("%")(candidates.c.author),
+                func.similarity(Book.title, candidates.c.title) >= DUPLICATE_SIMILARITY,
+                func.similarity(Book.author, candidates.c.author) >= DUPLICATE_SIMILARITY,
+            ),
+        )
+        .order_by(candidates.c.idx)
+    )
+
+
+async def find_duplicate_candidates(
+    db: AsyncSession, items: Sequence[Tuple[str, str]]
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Map each index in `items` to the existing books that look like duplicates,
+    as {"id", "title", "author"} dicts. Indexes without candidates are omitted.
+    """
+    if not items:
+        return {}
+    result = await db.execute(duplicate_candidates_stmt(items))
+    found: Dict[int, List[Dict[str, Any]]] = {}
+    for idx, book_id, title, author in result.all():
+        found.setdefault(idx, []).append({"id": str(book_id), "title": title, "author": author})
+    return found
+
+
+async def get_by_id(
+    db: AsyncSession, book_id: uuid.UUID, *, columns: Optional[Sequence[str]] = None
+) -> Optional[Union[Book, Row]]:
+    """The book, or (with `columns`) a row of just those books columns."""
+    result = await db.execute(_select_books(columns).where(Book.id == book_id))
+    return result.scalar_one_or_none() if columns is None else result.one_or_none()
+
+
+async def get_many(
+    db: AsyncSession,
+    *,
+    ids: Sequence[uuid.UUID] = (),
+    isbns: Sequence[str] = (),
+) -> List[Book]:
+    """
+    Books whose id is in `ids` or whose normalised ISBN is in `isbns` (already
+    normalised), in one `= ANY(:array)` query, oldest first.
+    """
+    if not ids and not isbns:
+        return []
+    conditions = []
+    if ids:
+        conditions.append(
+            Book.id == any_(bindparam("ids", list(ids), type_=ARRAY(UUID(as_uuid=True))))
+        )
+    if isbns:
+        conditions.append(ISBN_KEY == any_(bindparam("isbns", list(isbns), type_=ARRAY(Text))))
+    stmt = select(Book).where(or_(*conditions)).order_by(Book.created_at, Book.id)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def stream_all(db: AsyncSession, *, batch_size: int) -> AsyncResult:
+    """
+    Every book (BookOut columns) in created_at, id order, through a server-side
+    cursor that fetches `batch_size` rows at a time; iterate result.partitions().
+    """
+    stmt = (
+        select(
+            Book.id,
+            Book.title,
+            Book.author,
+            Book.description,
+            Book.isbn,
+            Book.published_year,
+            Book.available_copies,
+            Book.cover_image_url,
+            Book.created_at,
+            Book.updated_at,
+        )
+        .order_by(Book.created_at, Book.id)
+        .execution_options(yield_per=batch_size)
+    )
+    return await db.stream(stmt)
+
+
+async def begin_import(db: AsyncSession) -> None:
+    """Take the import lock and create the staging table (both end with the transaction)."""
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": IMPORT_LOCK_KEY})
+    await db.execute(CreateTable(_import))
+
+
+async def copy_import_rows(db: AsyncSession, rows: AsyncIterator[Sequence[Any]]) -> int:
+    """
+    COPY rows (tuples in IMPORT_COLUMNS order) into the staging table over the
+    session's own connection and transaction. Returns the number of rows.
+    """
+    conn = await db.connection()
+    raw = (await conn.get_raw_connection()).driver_connection
+    copied = 0
+    async with raw.cursor() as cur:
+        async with cur.copy(
+            f"COPY {_import.name} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN"
+        ) as copy:
+            async for row in rows:
+                await copy.write_row(row)
+                copied += 1
+    return copied
+
+
+async def merge_import(db: AsyncSession, *, report_limit: int) -> Tuple[int, int, List[int]]:
+    """
+    Insert the staged books that are not duplicates, with their book_copies.
+
+    A staged row is a duplicate when an existing book (or an earlier line)
+    has the same normalised ISBN or, for rows without an ISBN, the same
+    case-insensitive title and author. The lookups use ix_books_isbn_normalized
+    and ix_books_title_lower_id. Rows with the same title and author but
+    different ISBNs are editions and are imported.
+
+    Returns (inserted, duplicates, first `report_limit` duplicate line numbers).
+    Does not commit.
+    """
+    s = _import
+    no_isbn = s.c.isbn_key.is_(None)
+    ranked = select(
+        s.c.line,
+        func.row_number()
+        .over(
+            partition_by=[
+                s.c.isbn_key,
+                case((no_isbn, func.lower(s.c.title))),
+                case((no_isbn, func.lower(s.c.author))),
+            ],
+            order_by=s.c.line,
+        )
+        .label("rn"),
+    ).subquery("ranked")
+    existing = or_(
+        and_(~no_isbn, exists().where(ISBN_KEY == s.c.isbn_key)),
+        and_(
+            no_isbn,
+            exists().where(
+                func.lower(Book.title) == func.lower(s.c.title),
+                func.lower(Book.author) == func.lower(s.c.author),
+            ),
+        ),
+    )
+    await db.execute(text(f"ANALYZE {s.name}"))
+    await db.execute(
+        update(s)
+        .where(s.c.line == ranked.c.line, or_(ranked.c.rn > 1, existing))
+        .values(duplicate=True)
+    )
+
+    book_columns = [
+        "title",
+        "author",
+        "description",
+        "isbn",
+        "published_year",
+        "available_copies",
+        "cover_image_url",
+    ]
+    inserted = (
+        insert(Book)
+        .from_select(
+            ["id", *book_columns],
+            select(func.gen_random_uuid(), *(s.c[name] for name in book_columns))
+            .where(~s.c.duplicate)
+            .order_by(s.c.line),
+        )
+        .returning(Book.id, Book.available_copies)
+        .cte("inserted")
+    )
+    # One book_copies row per available copy, as create() does.
+    copies = (
+        insert(BookCopy)
+        .from_select(
+            ["id", "book_id"],
+            select(func.gen_random_uuid(), inserted.c.id)
+            .select_from(inserted)
+            .join(func.generate_series(1, inserted.c.available_copies).alias("n"), true()),
+        )
+        .cte("copies")
+    )
+    count = await db.scalar(select(func.count()).select_from(inserted).add_cte(copies))
+
+    duplicates = await db.scalar(select(func.count()).where(s.c.duplicate)) or 0
+    lines = await db.scalars(
+        select(s.c.line).where(s.c.duplicate).order_by(s.c.line).limit(report_limit)
+    )
+    return count or 0, duplicates, list(lines)
+
+
+async def exists_by_id(db: AsyncSession, book_id: uuid.UUID) -> bool:
+    return bool(await db.scalar(select(exists().where(Book.id == book_id))))
+
+
+async def get_many_for_checkout(
+    db: AsyncSession, book_ids: Sequence[uuid.UUID], *, lock: bool
+) -> Dict[uuid.UUID, Row]:
+    """
+    Fetch (id, title, author, cover_image_url, available_copies) for many books in
+    one query. With lock=True the rows are locked FOR UPDATE in id order, so
+    concurrent batches acquire them in a consistent order.
+    """
+    if not book_ids:
+        return {}
+    stmt = (
+        select(Book.id, Book.title, Book.author, Book.cover_image_url, Book.available_copies)
+        .where(Book.id.in_(book_ids))
+        .order_by(Book.id)
+    )
+    if lock:
+        stmt = stmt.with_for_update()
+    result = await db.execute(stmt)
+    return {row.id: row for row in result.all()}
+
+
+async def adjust_available_copies(db: AsyncSession, deltas: Dict[uuid.UUID, int]) -> None:
+    """
+    UPDATE books SET available_copies = available_copies + v.delta
+    FROM (VALUES ...) v WHERE books.id = v.id — one statement for many books.
+    Does not commit.
+    """
+    if not deltas:
+        return
+    v = values(
+        column("id", UUID(as_uuid=True)), column("delta", Integer), name="v"
+    ).data(sorted(deltas.items()))
+    await db.execute(
+        update(Book)
+        .where(Book.id == v.c.id)
+        .values(available_copies=Book.available_copies + v.c.delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_free_copies(
+    db: AsyncSession, wanted: Dict[uuid.UUID, int]
+) -> Dict[uuid.UUID, List[uuid.UUID]]:
+    """
+    Lock up to `wanted[book_id]` free copies of each book (FOR UPDATE SKIP LOCKED)
+    in one LATERAL query. Returns book_id -> locked free copy ids; a book may
+    get fewer than requested. Assign them with assign_copies().
+    """
+    if not wanted:
+        return {}
+    w = values(
+        column("book_id", UUID(as_uuid=True)), column("n", Integer), name="wanted"
+    ).data(sorted(wanted.items()))
+    free = (
+        select(BookCopy.id, BookCopy.book_id)
+        .where(BookCopy.book_id == w.c.book_id, BookCopy.loan_id.is_(None))
+        .limit(w.c.n)
+        .with_for_update(skip_locked=True)
+        .lateral("free")
+    )
+    result = await db.execute(select(free.c.id, free.c.book_id).select_from(w).join(free, true()))
+    claimed: Dict[uuid.UUID, List[uuid.UUID]] = {}
+    for copy_id, book_id in result.all():
+        claimed.setdefault(book_id, []).append(copy_id)
+    return claimed
+
+
+async def assign_copies(db: AsyncSession, assignments: Sequence[Tuple[uuid.UUID, uuid.UUID]]) -> None:
+    """
+    UPDATE book_copies SET loan_id = v.loan_id FROM (VALUES (copy_id, loan_id), ...) v
+    for copies previously locked by claim_free_copies(). Does not commit.
+    """
+    if not assignments:
+        return
+    v = values(
+        column("copy_id", UUID(as_uuid=True)),
+        column("loan_id", UUID(as_uuid=True)),
+        name="v",
+    ).data(list(assignments))
+    await db.execute(
+        update(BookCopy)
+        .where(BookCopy.id == v.c.copy_id)
+        .values(loan_id=v.c.loan_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def refresh_available_copies(db: AsyncSession, book_ids: Sequence[uuid.UUID]) -> None:
+    """
+    Recount books.available_copies from free book_copies rows (copies model).
+    Does not commit.
+    """
+    free = (
+        select(func.count())
+        .where(BookCopy.book_id == Book.id, BookCopy.loan_id.is_(None))
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Book)
+        .where(Book.id.in_(book_ids))
+        .values(available_copies=free)
+        .execution_options(synchronize_session=False)
     )
 
 
-def delete(db: Session, book_id: uuid.UUID) -> bool:
-    book = get_by_id(db, book_id)
+async def delete(db: AsyncSession, book_id: uuid.UUID) -> bool:
+    book = await get_by_id(db, book_id)
     if not book:
         return False
-    db.delete(book)
-    db.commit()
+    await db.delete(book)
+    await db.commit()
     return True
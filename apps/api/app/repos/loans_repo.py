@@ -2,64 +2,405 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 
-from sqlalchemy import or_, and_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import (
+    CTE,
+    Row,
+    String,
+    Table,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 
-from app.domain.models import Loan
+from app.domain.models import Book, BookCopy, Loan
 
 
-def find_active_loan_for_user(
-    db: Session, borrower_user_id: str, book_id: uuid.UUID
-) -> Optional[Loan]:
-    """Return a registered user's active (status=borrowed) loan for a book, if any."""
+_loans = Loan.__table__
+_books = Book.__table__
+_copies = BookCopy.__table__
+
+# Partial unique index from migration 005: one active loan per registered user per book.
+ACTIVE_LOAN_UNIQUE_INDEX = "ix_loans_active_user_unique"
+
+
+def _loan_out_columns(loan: CTE, book: Union[CTE, Table]) -> List[Any]:
+    """Columns of a LoanOut-shaped row (attribute names match LoanOut fields)."""
+    return [
+        loan.c.id,
+        loan.c.book_id,
+        loan.c.borrower_user_id,
+        loan.c.borrower_name,
+        loan.c.processed_by_admin_id,
+        loan.c.status,
+        loan.c.borrowed_at,
+        loan.c.returned_at,
+        book.c.title.label("book_title"),
+        book.c.author.label("book_author"),
+        book.c.cover_image_url.label("book_cover_image_url"),
+    ]
+
+
+def _claim_copy(book_id: uuid.UUID, loan_id: uuid.UUID, *, after: Optional[CTE] = None) -> CTE:
+    """
+    UPDATE book_copies SET loan_id = :loan_id WHERE id = (one free copy of the book,
+    FOR UPDATE SKIP LOCKED). Concurrent checkouts each claim a different copy
+    instead of waiting on one another. With `after`, only runs when that CTE
+    produced a row.
+    """
+    free = select(_copies.c.id).where(
+        _copies.c.book_id == book_id, _copies.c.loan_id.is_(None)
+    )
+    if after is not None:
+        free = free.where(exists(select(after.c.id)))
+    free = free.limit(1).with_for_update(skip_locked=True)
     return (
-        db.query(Loan)
-        .filter(
-            Loan.borrower_user_id == borrower_user_id,
-            Loan.book_id == book_id,
+        update(_copies)
+        .where(_copies.c.id == free.scalar_subquery())
+        .values(loan_id=loan_id)
+        .returning(_copies.c.id, _copies.c.book_id)
+        .cte("copy")
+    )
+
+
+def _insert_loan(
+    source: CTE,
+    loan_id: uuid.UUID,
+    borrower_user_id: Optional[str],
+    borrower_name: Optional[str],
+    processed_by_admin_id: str,
+) -> CTE:
+    """INSERT INTO loans ... SELECT ... FROM source (inserts nothing if source is empty)."""
+    return (
+        insert(_loans)
+        .from_select(
+            ["id", "book_id", "borrower_user_id", "borrower_name", "processed_by_admin_id", "status"],
+            select(
+                literal(loan_id, _loans.c.id.type),
+                source.c.book_id,
+                literal(borrower_user_id, String),
+                literal(borrower_name, String),
+                literal(processed_by_admin_id, String),
+                literal("borrowed", String),
+            ),
+        )
+        .returning(*_loans.c)
+        .cte("loan")
+    )
+
+
+async def checkout(
+    db: AsyncSession,
+    *,
+    book_id: uuid.UUID,
+    borrower_user_id: Optional[str],
+    borrower_name: Optional[str],
+    processed_by_admin_id: str,
+) -> Optional[Row]:
+    """
+    Counter model: take one copy and insert the loan in a single statement:
+
+        WITH book AS (UPDATE books ... WHERE id = :book_id AND available_copies > 0 RETURNING ...),
+             copy AS (UPDATE book_copies ... one free copy, if book matched ...),
+             loan AS (INSERT INTO loans ... SELECT ... FROM book RETURNING ...)
+        SELECT ... FROM loan JOIN book
+
+    Returns the LoanOut-shaped row, or None when the book does not exist or has
+    no available copies. A duplicate active loan raises IntegrityError on
+    ACTIVE_LOAN_UNIQUE_INDEX. Does not commit.
+    """
+    loan_id = uuid.uuid4()
+    book = (
+        update(_books)
+        .where(_books.c.id == book_id, _books.c.available_copies > 0)
+        .values(available_copies=_books.c.available_copies - 1)
+        .returning(
+            _books.c.id,
+            _books.c.id.label("book_id"),
+            _books.c.title,
+            _books.c.author,
+            _books.c.cover_image_url,
+        )
+        .cte("book")
+    )
+    copy = _claim_copy(book_id, loan_id, after=book)
+    loan = _insert_loan(book, loan_id, borrower_user_id, borrower_name, processed_by_admin_id)
+    stmt = (
+        select(*_loan_out_columns(loan, book))
+        .select_from(loan.join(book, book.c.id == loan.c.book_id))
+        .add_cte(copy)
+    )
+    result = await db.execute(stmt)
+    return result.first()
+
+
+async def checkout_copy(
+    db: AsyncSession,
+    *,
+    book_id: uuid.UUID,
+    borrower_user_id: Optional[str],
+    borrower_name: Optional[str],
+    processed_by_admin_id: str,
+) -> Optional[Row]:
+    """
+    Copies model: claim a free copy and insert the loan in a single statement,
+    without locking the books row:
+
+        WITH copy AS (UPDATE book_copies ... FOR UPDATE SKIP LOCKED ... RETURNING book_id),
+             loan AS (INSERT INTO loans ... SELECT ... FROM copy RETURNING ...)
+        SELECT ... FROM loan JOIN books
+
+    books.available_copies is not touched; the caller schedules a recount.
+    Same return / error contract as checkout(). Does not commit.
+    """
+    loan_id = uuid.uuid4()
+    copy = _claim_copy(book_id, loan_id)
+    loan = _insert_loan(copy, loan_id, borrower_user_id, borrower_name, processed_by_admin_id)
+    stmt = select(*_loan_out_columns(loan, _books)).select_from(
+        loan.join(_books, _books.c.id == loan.c.book_id)
+    )
+    result = await db.execute(stmt)
+    return result.first()
+
+
+async def mark_returned(db: AsyncSession, loan_id: uuid.UUID) -> Optional[Row]:
+    """
+    Counter model: return an active loan and put its copy back in a single statement:
+
+        WITH loan AS (UPDATE loans ... WHERE id = :loan_id AND status = 'borrowed' RETURNING ...),
+             copy AS (UPDATE book_copies SET loan_id = NULL ... FROM loan ...),
+             book AS (UPDATE books ... FROM loan WHERE books.id = loan.book_id RETURNING ...)
+        SELECT ... FROM loan JOIN book
+
+    Returns the LoanOut-shaped row, or None when the loan does not exist or was
+    already returned. Does not commit.
+    """
+    return await _mark_returned(db, loan_id, update_counter=True)
+
+
+async def mark_returned_copy(db: AsyncSession, loan_id: uuid.UUID) -> Optional[Row]:
+    """Copies-model variant of mark_returned(): leaves books.available_copies alone."""
+    return await _mark_returned(db, loan_id, update_counter=False)
+
+
+async def _mark_returned(
+    db: AsyncSession, loan_id: uuid.UUID, *, update_counter: bool
+) -> Optional[Row]:
+    loan = (
+        update(_loans)
+        .where(_loans.c.id == loan_id, _loans.c.status == "borrowed")
+        .values(status="returned", returned_at=func.now())
+        .returning(*_loans.c)
+        .cte("loan")
+    )
+    copy = (
+        update(_copies)
+        .where(_copies.c.loan_id == loan.c.id)
+        .values(loan_id=None)
+        .returning(_copies.c.id)
+        .cte("copy")
+    )
+    if update_counter:
+        book = (
+            update(_books)
+            .where(_books.c.id == loan.c.book_id)
+            .values(available_copies=_books.c.available_copies + 1)
+            .returning(_books.c.id, _books.c.title, _books.c.author, _books.c.cover_image_url)
+            .cte("book")
+        )
+    else:
+        book = _books
+    stmt = (
+        select(*_loan_out_columns(loan, book))
+        .select_from(loan.join(book, book.c.id == loan.c.book_id))
+        .add_cte(copy)
+    )
+    result = await db.execute(stmt)
+    return result.first()
+
+
+async def get_status(db: AsyncSession, loan_id: uuid.UUID) -> Optional[str]:
+    """Return a loan's status, or None when it does not exist."""
+    return await db.scalar(select(Loan.status).where(Loan.id == loan_id))
+
+
+async def get_statuses(db: AsyncSession, loan_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, str]:
+    """Return {loan_id: status} for the loans that exist, in one query."""
+    if not loan_ids:
+        return {}
+    result = await db.execute(select(Loan.id, Loan.status).where(Loan.id.in_(loan_ids)))
+    return {loan_id: status for loan_id, status in result.all()}
+
+
+async def find_active_pairs(
+    db: AsyncSession, pairs: Sequence[Tuple[str, uuid.UUID]]
+) -> Set[Tuple[str, uuid.UUID]]:
+    """Return the (borrower_user_id, book_id) pairs that already have an active loan."""
+    if not pairs:
+        return set()
+    result = await db.execute(
+        select(Loan.borrower_user_id, Loan.book_id).where(
             Loan.status == "borrowed",
+            tuple_(Loan.borrower_user_id, Loan.book_id).in_(list(set(pairs))),
+        )
+    )
+    return {(uid, book_id) for uid, book_id in result.all()}
+
+
+async def insert_many(db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> Dict[uuid.UUID, Row]:
+    """
+    Multi-row INSERT INTO loans ... ON CONFLICT DO NOTHING RETURNING ...
+
+    Rows that would duplicate an active loan (ACTIVE_LOAN_UNIQUE_INDEX) are
+    skipped instead of aborting the batch; they are absent from the result,
+    which maps loan id -> inserted row. Does not commit.
+    """
+    if not rows:
+        return {}
+    stmt = (
+        pg_insert(_loans)
+        .values(list(rows))
+        .on_conflict_do_nothing(
+            index_elements=["borrower_user_id", "book_id"],
+            index_where=text("status = 'borrowed' AND borrower_user_id IS NOT NULL"),
+        )
+        .returning(*_loans.c)
+    )
+    result = await db.execute(stmt)
+    return {row.id: row for row in result.all()}
+
+
+async def mark_returned_many(
+    db: AsyncSession, loan_ids: Sequence[uuid.UUID], *, update_counter: bool
+) -> List[Row]:
+    """
+    Return many active loans. Under the counter model the books rows are first
+    locked in id order (SELECT ... ORDER BY id FOR UPDATE); then one statement:
+
+        WITH loan AS (UPDATE loans ... WHERE id = ANY(:ids) AND status = 'borrowed' RETURNING ...),
+             copy AS (UPDATE book_copies SET loan_id = NULL ... FROM loan ...),
+             counts AS (SELECT book_id, count(*) FROM loan GROUP BY book_id),
+             book AS (UPDATE books ... + counts.n FROM counts ... RETURNING ...)
+        SELECT ... FROM loan JOIN book
+
+    With update_counter=False (copies model) the books rows are only read.
+    Returns LoanOut-shaped rows for the loans that were returned; ids that were
+    missing or already returned are absent. Does not commit.
+    """
+    if not loan_ids:
+        return []
+    if update_counter:
+        # Lock the affected books rows in id order first, the order
+        # checkout_batch locks them in (books_repo.get_many_for_checkout). The
+        # UPDATE books ... FROM counts below locks in join order, which could
+        # deadlock against a concurrent batch checkout.
+        await db.execute(
+            select(_books.c.id)
+            .where(
+                _books.c.id.in_(
+                    select(_loans.c.book_id).where(
+                        _loans.c.id.in_(loan_ids), _loans.c.status == "borrowed"
+                    )
+                )
+            )
+            .order_by(_books.c.id)
+            .with_for_update()
+        )
+    loan = (
+        update(_loans)
+        .where(_loans.c.id.in_(loan_ids), _loans.c.status == "borrowed")
+        .values(status="returned", returned_at=func.now())
+        .returning(*_loans.c)
+        .cte("loan")
+    )
+    copy = (
+        update(_copies)
+        .where(_copies.c.loan_id == loan.c.id)
+        .values(loan_id=None)
+        .returning(_copies.c.id)
+        .cte("copy")
+    )
+    if update_counter:
+        counts = (
+            select(loan.c.book_id, func.count().label("n"))
+            .group_by(loan.c.book_id)
+            .cte("counts")
         )
-        .first()
+        book = (
+            update(_books)
+            .where(_books.c.id == counts.c.book_id)
+            .values(available_copies=_books.c.available_copies + counts.c.n)
+            .returning(_books.c.id, _books.c.title, _books.c.author, _books.c.cover_image_url)
+            .cte("book")
+        )
+    else:
+        book = _books
+    stmt = (
+        select(*_loan_out_columns(loan, book))
+        .select_from(loan.join(book, book.c.id == loan.c.book_id))
+        .add_cte(copy)
     )
+    result = await db.execute(stmt)
+    return list(result.all())
 
 
-def list_paginated(
-    db: Session,
+async def list_paginated(
+    db: AsyncSession,
     *,
     borrower_user_id: Optional[str] = None,
     book_id: Optional[uuid.UUID] = None,
     status: Optional[str] = None,
     limit: int = 21,
     cursor_data: Optional[Dict[str, Any]] = None,
-) -> List[Loan]:
+) -> List[Row]:
     """
     Filtered, cursor-paginated loan list sorted by borrowed_at DESC, id DESC.
     Pass borrower_user_id=None to list all loans (admin/librarian use).
+    Each filter has a matching (filter, borrowed_at DESC, id DESC) index (migration 008).
     Cursor shape: {"ts": "<ISO datetime>", "id": "<uuid>"}
+
+    Returns plain LoanOut-shaped rows: only the three book columns LoanOut
+    shows are joined in (not the full Book, description included), and no ORM
+    objects are built.
     """
-    query = db.query(Loan).options(joinedload(Loan.book))
+    stmt = select(*_loan_out_columns(_loans, _books)).join_from(
+        _loans, _books, _loans.c.book_id == _books.c.id
+    )
 
     if borrower_user_id is not None:
-        query = query.filter(Loan.borrower_user_id == borrower_user_id)
+        stmt = stmt.where(Loan.borrower_user_id == borrower_user_id)
     if book_id is not None:
-        query = query.filter(Loan.book_id == book_id)
+        stmt = stmt.where(Loan.book_id == book_id)
     if status is not None:
-        query = query.filter(Loan.status == status)
+        stmt = stmt.where(Loan.status == status)
 
     if cursor_data:
         ts = datetime.fromisoformat(cursor_data["ts"])
         cid = uuid.UUID(cursor_data["id"])
-        query = query.filter(
-            or_(
-                Loan.borrowed_at < ts,
-                and_(Loan.borrowed_at == ts, Loan.id < cid),
-            )
-        )
+        stmt = stmt.where(tuple_(Loan.borrowed_at, Loan.id) < tuple_(ts, cid))
 
-    return (
-        query.order_by(Loan.borrowed_at.desc(), Loan.id.desc())
-        .limit(limit)
-        .all()
+    stmt = stmt.order_by(Loan.borrowed_at.desc(), Loan.id.desc()).limit(limit)
+    result = await db.execute(stmt)
+    return list(result.all())
+
+
+async def stream_all(db: AsyncSession, *, batch_size: int) -> AsyncResult:
+    """
+    Every loan (LoanOut columns) in borrowed_at, id order, through a server-side
+    cursor that fetches `batch_size` rows at a time; iterate result.partitions().
+    """
+    stmt = (
+        select(*_loan_out_columns(_loans, _books))
+        .join_from(_loans, _books, _loans.c.book_id == _books.c.id)
+        .order_by(_loans.c.borrowed_at, _loans.c.id)
+        .execution_options(yield_per=batch_size)
     )
+    return await db.stream(stmt)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import case, delete, func, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.domain.models import User
+
+
+_users = User.__table__
+
+# Key for pg_try_advisory_lock: one directory sync at a time across workers.
+SYNC_LOCK_KEY = 0x75736572  # "user"
+
+
+async def search(
+    db: AsyncSession,
+    *,
+    query: Optional[str] = None,
+    limit: int = 21,
+    cursor_data: Optional[Dict[str, Any]] = None,
+) -> List[User]:
+    """
+    Users whose display name or email contains `query` (case-insensitive; served
+    by the trigram indexes of migration 011), ordered by lower(display_name), id.
+    Cursor shape: {"name": "<lower display name>", "id": "<clerk id>"}
+    """
+    name_key = func.lower(User.display_name)
+    stmt = select(User)
+
+    term = (query or "").strip().lower()
+    if term:
+        stmt = stmt.where(
+            or_(
+                name_key.contains(term, autoescape=True),
+                func.lower(User.email).contains(term, autoescape=True),
+            )
+        )
+
+    if cursor_data:
+        stmt = stmt.where(
+            tuple_(name_key, User.id) > tuple_(cursor_data["name"], cursor_data["id"])
+        )
+
+    stmt = stmt.order_by(name_key.asc(), User.id.asc()).limit(limit)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def get_display_names(db: AsyncSession, ids: Sequence[str]) -> Dict[str, str]:
+    """{id: display_name} for the given Clerk ids that are mirrored, in one query."""
+    if not ids:
+        return {}
+    result = await db.execute(select(User.id, User.display_name).where(User.id.in_(ids)))
+    return {user_id: name for user_id, name in result.all()}
+
+
+async def try_lock_sync(conn: AsyncConnection) -> bool:
+    """
+    Take the session-level directory-sync lock on `conn`; False if another sync
+    holds it. Outlives the transaction: release with unlock_sync (or by closing
+    the connection).
+    """
+    return bool(
+        await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": SYNC_LOCK_KEY})
+    )
+
+
+async def unlock_sync(conn: AsyncConnection) -> None:
+    """Release the lock try_lock_sync took on `conn`."""
+    await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SYNC_LOCK_KEY})
+
+
+async def latest_clerk_update(db: AsyncSession) -> Optional[datetime]:
+    """Newest Clerk updated_at mirrored so far (the incremental sync watermark)."""
+    return await db.scalar(select(func.max(User.clerk_updated_at)))
+
+
+async def upsert_many(db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> int:
+    """
+    INSERT ... ON CONFLICT (id) DO UPDATE. Profile fields are only replaced by
+    data at least as new as what is stored (a late webhook must not undo a
+    newer sync); synced_at always advances, since the user still exists. Rows
+    carry id, display_name, email, clerk_updated_at and synced_at. Does not commit.
+    """
+    if not rows:
+        return 0
+    stmt = pg_insert(_users).values(list(rows))
+    newer = _users.c.clerk_updated_at <= stmt.excluded.clerk_updated_at
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_users.c.id],
+        set_={
+            col: case((newer, stmt.excluded[col]), else_=_users.c[col])
+            for col in ("display_name", "email", "clerk_updated_at")
+        }
+        | {"synced_at": func.greatest(_users.c.synced_at, stmt.excluded.synced_at)},
+    )
+    result = await db.execute(stmt)
+    return result.rowcount or 0
+
+
+async def delete_many(db: AsyncSession, ids: Sequence[str]) -> int:
+    """Delete users by Clerk id. Does not commit."""
+    if not ids:
+        return 0
+    result = await db.execute(delete(User).where(User.id.in_(ids)))
+    return result.rowcount or 0
+
+
+async def ids_not_synced_since(db: AsyncSession, since: datetime) -> List[str]:
+    """Ids of users a full sync started at `since` did not see."""
+    result = await db.execute(select(User.id).where(User.synced_at < since))
+    return list(result.scalars().all())
+
+
+async def delete_not_synced_since(db: AsyncSession, since: datetime, ids: Sequence[str]) -> int:
+    """
+    Delete these users unless something (a webhook, a later sync) wrote them
+    after `since`. Does not commit.
+    """
+    if not ids:
+        return 0
+    result = await db.execute(delete(User).where(User.id.in_(ids), User.synced_at < since))
+    return result.rowcount or 0
@@ -6,7 +6,8 @@ import json
 import logging
 import random
 import time
-from typing import Any, Dict, Tuple
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
 
 import httpx
 
@@ -20,6 +21,15 @@ _FALLBACK: Dict[str, Any] = {
     "recommendedActions": [],
 }
 
+# Returned (and cached briefly) when generation fails; reported as status "failed".
+_UNAVAILABLE: Dict[str, Any] = {
+    "summary": "AI insights are temporarily unavailable.",
+    "insights": [],
+    "recommendedActions": [],
+}
+
+_PENDING: Dict[str, Any] = {"summary": "", "insights": [], "recommendedActions": []}
+
 _SYSTEM_PROMPT = """You are a library analytics assistant.
 Your job is to interpret the provided library metrics and return a concise analysis.
 
@@ -39,13 +49,17 @@ Do not include any markdown, explanation, or text outside the JSON object."""
 
 
 # -------------------------
-# Simple in-memory TTL cache
+# Bounded in-memory LRU + TTL cache
 # -------------------------
-# key -> (expires_at_epoch_seconds, value)
-_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# key -> (expires_at_monotonic_seconds, value), least recently used first.
+# Capped at AI_INSIGHTS_CACHE_MAX_ENTRIES; expired entries are dropped when
+# read or when they reach the LRU end.
+_CACHE: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+_DEFAULT_TTL_SECONDS = settings.AI_INSIGHTS_TTL_SECONDS
 
-# default 10 minutes; override via env if you add it to settings
-_DEFAULT_TTL_SECONDS = getattr(settings, "AI_INSIGHTS_TTL_SECONDS", 600)
+# Upstream calls made, and calls saved by the cache or by joining an in-flight call.
+_STATS: Dict[str, int] = {"upstreamCalls": 0, "cacheHits": 0, "coalesced": 0}
 
 
 def _metrics_cache_key(window_days: int, metrics: Dict[str, Any]) -> str:
@@ -60,14 +74,195 @@ def _cache_get(key: str) -> Dict[str, Any] | None:
     if not hit:
         return None
     expires_at, value = hit
-    if time.time() >= expires_at:
+    if time.monotonic() >= expires_at:
         _CACHE.pop(key, None)
         return None
+    _CACHE.move_to_end(key)
     return value
 
 
-def _cache_set(key: str, value: Dict[str, Any], ttl_seconds: int = _DEFAULT_TTL_SECONDS) -> None:
-    _CACHE[key] = (time.time() + ttl_seconds, value)
+def _cache_set(key: str, value: Dict[str, Any], ttl_seconds: float = _DEFAULT_TTL_SECONDS) -> None:
+    _CACHE[key] = (time.monotonic() + ttl_seconds, value)
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > settings.AI_INSIGHTS_CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+
+
+def cache_stats() -> Dict[str, int]:
+    """Upstream calls made vs. saved (cache hits + callers that joined an in-flight call)."""
+    return {
+        **_STATS,
+        "savedCalls": _STATS["cacheHits"] + _STATS["coalesced"],
+        "entries": len(_CACHE),
+        "inflight": len(_JOBS),
+    }
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+class _CircuitBreaker:
+    """
+    Stops calling OpenAI while it is failing.
+
+    - closed: calls go through; outcomes (errors, timeouts and 429s count as
+      failures) are kept for the last `window` seconds. Once there are at least
+      `min_calls` of them and the failure ratio reaches `failure_ratio`, opens.
+    - open: every call is refused at once (callers use the fallback) for
+      `open_seconds`.
+    - half_open: one probe call is let through; success closes the breaker,
+      failure re-opens it. A probe that never reports back is replaced after
+      `open_seconds`.
+
+    allow() hands each call the current generation, which every state change
+    (and every new probe) advances. record() ignores results whose generation
+    is not current, so a slow call started before the breaker opened cannot
+    close it as if it were the probe, and a replaced probe cannot either.
+
+    State is per process.
+    """
+
+    def __init__(
+        self, failure_ratio: float, min_calls: int, window: float, open_seconds: float
+    ) -> None:
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (monotonic time, failed)
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._generation = 0
+        self.opens = 0
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _failure_ratio(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(failed for _, failed in self._outcomes) / len(self._outcomes)
+
+    def rejecting(self) -> bool:
+        """True while allow() would refuse; does not change state."""
+        now = time.monotonic()
+        if self.state == "open":
+            return now - self._opened_at < self.open_seconds
+        if self.state == "half_open":
+            return (
+                self._probe_started_at is not None
+                and now - self._probe_started_at < self.open_seconds
+            )
+        return False
+
+    def short_circuit(self) -> bool:
+        """rejecting(), counted as a refused call when True."""
+        if self.rejecting():
+            self.rejected += 1
+            return True
+        return False
+
+    def allow(self) -> Optional[int]:
+        """
+        None when no upstream call may be made now; otherwise the ticket to
+        pass to record() (claims the probe when half-open).
+        """
+        if self.rejecting():
+            self.rejected += 1
+            return None
+        if self.state != "closed":
+            self.state = "half_open"
+            self._probe_started_at = time.monotonic()
+            self._generation += 1
+        return self._generation
+
+    def record(self, ticket: int, success: bool) -> None:
+        """Report the outcome of the call allow() returned `ticket` for."""
+        if ticket != self._generation:
+            return  # started before the last state change
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._probe_started_at = None
+            if success:
+                self.state = "closed"
+                self._generation += 1
+                self._outcomes.clear()
+            else:
+                self._open(now)
+            return
+
+        self._outcomes.append((now, not success))
+        self._trim(now)
+        if (
+            self.state == "closed"
+            and len(self._outcomes) >= self.min_calls
+            and self._failure_ratio() >= self.failure_ratio
+        ):
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        logger.warning("OpenAI circuit breaker opened for %.0fs", self.open_seconds)
+        self.state = "open"
+        self._opened_at = now
+        self._generation += 1
+        self.opens += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._trim(now)
+        return {
+            "state": self.state,
+            "recentCalls": len(self._outcomes),
+            "failureRatio": round(self._failure_ratio(), 3),
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "openForSeconds": (
+                max(0.0, round(self.open_seconds - (now - self._opened_at), 1))
+                if self.state == "open"
+                else 0.0
+            ),
+        }
+
+
+_breaker = _CircuitBreaker(
+    failure_ratio=settings.AI_BREAKER_FAILURE_RATIO,
+    min_calls=settings.AI_BREAKER_MIN_CALLS,
+    window=settings.AI_BREAKER_WINDOW_SECONDS,
+    open_seconds=settings.AI_BREAKER_OPEN_SECONDS,
+)
+
+
+def breaker_stats() -> Dict[str, Any]:
+    """Circuit breaker state and counters."""
+    return _breaker.stats()
+
+
+# -------------------------
+# Pooled HTTP client
+# -------------------------
+# One keep-alive client per process: created at startup, closed at shutdown, so
+# attempts reuse TLS connections instead of handshaking every time.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def start() -> None:
+    """Create the pooled OpenAI client (called on app startup)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=15.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+
+
+def _get_client() -> httpx.AsyncClient:
+    if _client is None:
+        start()  # scripts / tests that skip app startup
+    assert _client is not None
+    return _client
 
 
 def _build_user_message(window_days: int, metrics: Dict[str, Any]) -> str:
@@ -102,16 +297,16 @@ async def _call_openai(window_days: int, metrics: Dict[str, Any]) -> Dict[str, A
         "temperature": 0.3,
     }
 
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
-        resp.raise_for_status()
+    _STATS["upstreamCalls"] += 1
+    resp = await _get_client().post(
+        f"{settings.OPENAI_BASE_URL.rstrip('/')}/chat/completions",
+        headers={
+            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json=payload,
+    )
+    resp.raise_for_status()
 
     content: str = resp.json()["choices"][0]["message"]["content"]
     return _normalize_llm_output(json.loads(content))
@@ -120,7 +315,8 @@ async def _call_openai(window_days: int, metrics: Dict[str, Any]) -> Dict[str, A
 async def generate_insights(window_days: int, metrics: Dict[str, Any]) -> Dict[str, Any]:
     """
     Call OpenAI and return {summary, insights, recommendedActions}.
-    Adds TTL caching + rate-limit safe retries.
+    Adds TTL caching + rate-limit safe retries; concurrent callers with the
+    same metrics share one upstream call.
     Falls back to safe output if anything fails.
     """
     if not settings.OPENAI_API_KEY:
@@ -128,22 +324,37 @@ async def generate_insights(window_days: int, metrics: Dict[str, Any]) -> Dict[s
 
     cache_key = _metrics_cache_key(window_days, metrics)
     cached = _cache_get(cache_key)
-    if cached:
+    if cached is not None:
+        _STATS["cacheHits"] += 1
         return cached
+    if _breaker.short_circuit():
+        return _UNAVAILABLE
 
+    # shield: a cancelled caller must not cancel the call other callers share.
+    return await asyncio.shield(_job(cache_key, window_days, metrics))
+
+
+async def _generate(cache_key: str, window_days: int, metrics: Dict[str, Any]) -> Dict[str, Any]:
     # Retry policy: a few tries with exponential backoff.
     # OpenAI recommends exponential backoff for 429s. :contentReference[oaicite:2]{index=2}
     max_attempts = 4
     base_delay = 1.0
 
     for attempt in range(1, max_attempts + 1):
+        ticket = _breaker.allow()
+        if ticket is None:
+            # Open circuit: give up now and don't cache, so insights return as
+            # soon as the breaker closes.
+            return _UNAVAILABLE
         try:
             result = await _call_openai(window_days, metrics)
+            _breaker.record(ticket, True)
             # cache successful result
             _cache_set(cache_key, result)
             return result
 
         except httpx.HTTPStatusError as exc:
+            _breaker.record(ticket, False)
             status = exc.response.status_code
 
             # Handle rate limiting
@@ -169,14 +380,83 @@ async def generate_insights(window_days: int, metrics: Dict[str, Any]) -> Dict[s
             break
 
         except Exception as exc:  # noqa: BLE001
+            _breaker.record(ticket, False)
             logger.warning("AI insights generation failed: %s", exc)
             break
 
     # Fallback: still cache briefly to avoid repeated failing calls in dev
-    fallback = {
-        "summary": "AI insights are temporarily unavailable.",
-        "insights": [],
-        "recommendedActions": [],
-    }
-    _cache_set(cache_key, fallback, ttl_seconds=600)
-    return fallback
\ No newline at end of file
+    _cache_set(cache_key, _UNAVAILABLE, ttl_seconds=600)
+    return _UNAVAILABLE
+
+
+# -------------------------
+# Single-flight generation
+# -------------------------
+# cache key -> the one running _generate task for it
+_JOBS: Dict[str, asyncio.Task[Dict[str, Any]]] = {}
+
+
+def _job(cache_key: str, window_days: int, metrics: Dict[str, Any]) -> asyncio.Task[Dict[str, Any]]:
+    """The running task for cache_key, started if there is none."""
+    task = _JOBS.get(cache_key)
+    if task is not None:
+        _STATS["coalesced"] += 1
+        return task
+    task = asyncio.create_task(_generate(cache_key, window_days, metrics))
+    _JOBS[cache_key] = task
+    task.add_done_callback(lambda _t: _JOBS.pop(cache_key, None))
+    return task
+
+
+def insights_status(window_days: int, metrics: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Non-blocking: return (status, insights) for these metrics.
+
+    status is "ready" or "failed" when a result is cached, otherwise "pending";
+    a pending call starts a background generation unless one is already
+    running for the same cache key.
+    """
+    if not settings.OPENAI_API_KEY:
+        return "ready", _FALLBACK
+
+    cache_key = _metrics_cache_key(window_days, metrics)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        _STATS["cacheHits"] += 1
+        return ("failed" if cached is _UNAVAILABLE else "ready"), cached
+    if cache_key not in _JOBS and _breaker.short_circuit():
+        return "failed", _UNAVAILABLE
+
+    if cache_key not in _JOBS:
+        _job(cache_key, window_days, metrics)
+    return "pending", _PENDING
+
+
+async def wait_for_insights(
+    window_days: int, metrics: Dict[str, Any], timeout: float
+) -> Tuple[str, Dict[str, Any]]:
+    """insights_status(), first waiting up to `timeout` seconds for a running task."""
+    status, result = insights_status(window_days, metrics)
+    task: Optional[asyncio.Task[Dict[str, Any]]] = _JOBS.get(
+        _metrics_cache_key(window_days, metrics)
+    )
+    if status != "pending" or task is None or timeout <= 0:
+        return status, result
+    try:
+        # Shielded: a poller timing out or disconnecting must not cancel the job.
+        await asyncio.wait_for(asyncio.shield(task), timeout)
+    except asyncio.TimeoutError:
+        return status, result
+    return insights_status(window_days, metrics)
+
+
+async def stop() -> None:
+    """Cancel generations still running and close the pooled client (app shutdown)."""
+    global _client
+    tasks = list(_JOBS.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if _client is not None:
+        await _client.aclose()
+        _client = None
\ No newline at end of file
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+"""
+In-process cache for analytics_repo.compute_metrics.
+
+Entries are keyed by window_days and stamped with the data version they were
+computed at. Book and loan writes call bump_version() after commit, which makes
+every entry stale without touching the cache. A stale entry is still served
+(see below), so a read right after a write can return the pre-write metrics;
+the write shows up once the refresh that read started has finished.
+
+  - fresh (same version, younger than ANALYTICS_CACHE_TTL_SECONDS): served as is;
+  - stale but younger than ANALYTICS_CACHE_MAX_STALE_SECONDS: served as is while
+    one background task recomputes it;
+  - missing or older than that: the caller waits for the (single) recompute.
+
+The version and the cache are per process; with several workers a write is
+reflected elsewhere once the TTL expires.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.repos import analytics_repo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    version: int
+    computed_at: float
+    value: Dict[str, Any]
+
+
+_version = 0
+_entries: "OrderedDict[int, _Entry]" = OrderedDict()
+_inflight: Dict[int, asyncio.Task[Dict[str, Any]]] = {}
+_stats: Dict[str, int] = {"hits": 0, "staleHits": 0, "misses": 0, "refreshes": 0, "failures": 0}
+
+
+def bump_version() -> None:
+    """
+    Mark every cached metric stale (call after committing a book or loan write).
+
+    Does not evict: an entry younger than ANALYTICS_CACHE_MAX_STALE_SECONDS is
+    served once more while a background refresh picks up the write.
+    """
+    global _version
+    _version += 1
+
+
+async def _compute(window_days: int) -> Dict[str, Any]:
+    version = _version
+    _stats["refreshes"] += 1
+    try:
+        async with AsyncSessionLocal() as db:
+            value = await analytics_repo.compute_metrics(db, window_days)
+    except Exception:
+        _stats["failures"] += 1
+        raise
+    finally:
+        _inflight.pop(window_days, None)
+
+    # Stamped with the version read before the query: a write that lands while
+    # it runs leaves the entry stale, so the next read refreshes again.
+    _entries[window_days] = _Entry(version, time.monotonic(), value)
+    _entries.move_to_end(window_days)
+    while len(_entries) > settings.ANALYTICS_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+    return value
+
+
+def _log_failure(task: asyncio.Task[Dict[str, Any]]) -> None:
+    # Retrieves the exception even when no caller is left awaiting the task.
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("analytics refresh failed: %s", task.exception())
+
+
+def _refresh(window_days: int) -> asyncio.Task[Dict[str, Any]]:
+    task = _inflight.get(window_days)
+    if task is None:
+        task = asyncio.create_task(_compute(window_days))
+        task.add_done_callback(_log_failure)
+        _inflight[window_days] = task
+    return task
+
+
+async def get_metrics(window_days: int) -> Dict[str, Any]:
+    """compute_metrics(window_days), served from the cache where allowed."""
+    entry = _entries.get(window_days)
+    if entry is not None:
+        age = time.monotonic() - entry.computed_at
+        _entries.move_to_end(window_days)
+        if entry.version == _version and age < settings.ANALYTICS_CACHE_TTL_SECONDS:
+            _stats["hits"] += 1
+            return entry.value
+        if age < settings.ANALYTICS_CACHE_MAX_STALE_SECONDS:
+            _stats["staleHits"] += 1
+            _refresh(window_days)
+            return entry.value
+
+    _stats["misses"] += 1
+    # Shielded: a client disconnect must not cancel a refresh other callers await.
+    return await asyncio.shield(_refresh(window_days))
+
+
+def cache_stats() -> Dict[str, Any]:
+    served = _stats["hits"] + _stats["staleHits"] + _stats["misses"]
+    return {
+        **_stats,
+        "entries": len(_entries),
+        "version": _version,
+        "hitRatio": (_stats["hits"] + _stats["staleHits"]) / served if served else 0.0,
+    }
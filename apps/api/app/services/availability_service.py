@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+"""
+Background recount of books.available_copies for the "copies" circulation model.
+
+In that model checkout/return never lock the books row; they mark the book
+dirty here instead, and a single background task per process recounts the
+dirty books from book_copies every AVAILABILITY_REFRESH_INTERVAL seconds.
+Each recount statement starts after the commits that marked the books dirty,
+so readers see the correct count within one interval.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Iterable, Optional, Set
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.repos import books_repo
+from app.services import analytics_service
+
+logger = logging.getLogger(__name__)
+
+_dirty: Set[uuid.UUID] = set()
+_task: Optional[asyncio.Task[None]] = None
+
+
+def mark_dirty(book_ids: Iterable[uuid.UUID]) -> None:
+    """Schedule a recount of available_copies for these books (call after commit)."""
+    _dirty.update(book_ids)
+
+
+async def flush() -> None:
+    """Recount every dirty book now."""
+    if not _dirty:
+        return
+    book_ids = list(_dirty)
+    _dirty.clear()
+    try:
+        async with AsyncSessionLocal() as db:
+            await books_repo.refresh_available_copies(db, book_ids)
+            await db.commit()
+        analytics_service.bump_version()
+    except Exception:  # noqa: BLE001
+        # Put them back so the next tick retries.
+        _dirty.update(book_ids)
+        logger.exception("available_copies refresh failed for %d books", len(book_ids))
+
+
+async def _run() -> None:
+    while True:
+        await asyncio.sleep(settings.AVAILABILITY_REFRESH_INTERVAL)
+        await flush()
+
+
+def start() -> None:
+    """Start the refresher (copies model only)."""
+    global _task
+    if settings.CIRCULATION_MODEL == "copies" and _task is None:
+        _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """Stop the refresher and flush whatever is still pending."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    await flush()
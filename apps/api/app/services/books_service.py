@@ -1,17 +1,42 @@
 from __future__ import annotations
 
 import uuid
-from typing import List, Optional, Tuple
+from typing import AbstractSet, Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.domain.models import Book
+from app.lib.errors import ApiException
 from app.lib.pagination import decode_cursor, encode_cursor
 from app.repos import books_repo
-from app.v1.schemas.books import BookCreate
+from app.services import analytics_service
+from app.v1.schemas.books import BOOK_FIELDS, BookCreate
 
+# Columns each sort's next cursor is built from (relevance uses rank + id).
+_CURSOR_COLUMNS = {
+    "createdAt:desc": ("created_at",),
+    "createdAt:asc": ("created_at",),
+    "title:asc": ("title",),
+}
+
+
+async def create_book(db: AsyncSession, data: BookCreate) -> Book:
+    """
+    Create a book. Unless data.allowDuplicate is set, refuses with 409 when an
+    existing book has a near-identical title and author.
+    """
+    if not data.allowDuplicate:
+        found = await books_repo.find_duplicate_candidates(
+            db, [(data.title.strip(), data.author.strip())]
+        )
+        if found:
+            raise ApiException(
+                code="DUPLICATE_BOOK",
+                message="A book with a similar title and author already exists.",
+                status_code=409,
+                details={"candidates": found[0]},
+            )
 
-def create_book(db: Session, data: BookCreate) -> Book:
     book_data = {
         "title": data.title.strip(),
         "author": data.author.strip(),
@@ -21,11 +46,24 @@ def create_book(db: Session, data: BookCreate) -> Book:
         "available_copies": data.availableCopies,
         "cover_image_url": data.coverImageUrl or None,
     }
-    return books_repo.create(db, book_data)
+    book = await books_repo.create(db, book_data)
+    analytics_service.bump_version()
+    return book
+
+
+def _columns(fields: Optional[AbstractSet[str]], sort: str = "") -> Optional[List[str]]:
+    """
+    Column list for a sparse fieldset: the requested BookOut fields plus id and
+    the cursor columns of `sort`. None (whole row) when no fieldset was asked for.
+    """
+    if fields is None:
+        return None
+    wanted = {"id", *fields, *_CURSOR_COLUMNS.get(sort, ())}
+    return [name for name in BOOK_FIELDS.values() if name in wanted]
 
 
-def list_books(
-    db: Session,
+async def list_books(
+    db: AsyncSession,
     *,
     query: Optional[str] = None,
     author: Optional[str] = None,
@@ -33,11 +71,30 @@ def list_books(
     sort: str = "createdAt:desc",
     limit: int = 20,
     cursor: Optional[str] = None,
-) -> Tuple[List[Book], Optional[str]]:
+    fields: Optional[AbstractSet[str]] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Book page and next cursor. With `fields` (BookOut attribute names) only
+    those columns, plus the ones the cursor needs, are read, and the items are
+    plain rows rather than Book objects.
+    """
     cursor_data = decode_cursor(cursor) if cursor else None
 
+    if sort == "relevance" and (query or author):
+        return await _search_books(
+            db,
+            query=query,
+            author=author,
+            available_only=available_only,
+            limit=limit,
+            cursor_data=cursor_data,
+            columns=_columns(fields),
+        )
+    if sort == "relevance":
+        sort = "createdAt:desc"  # nothing to rank without a query or author
+
     # Fetch one extra row to detect whether a next page exists.
-    rows = books_repo.list_paginated(
+    rows = await books_repo.list_paginated(
         db,
         query=query,
         author=author,
@@ -45,6 +102,7 @@ def list_books(
         sort=sort,
         limit=limit + 1,
         cursor_data=cursor_data,
+        columns=_columns(fields, sort),
     )
 
     has_more = len(rows) > limit
@@ -62,9 +120,73 @@ def list_books(
     return rows, next_cursor
 
 
-def get_book(db: Session, book_id: uuid.UUID) -> Optional[Book]:
-    return books_repo.get_by_id(db, book_id)
+async def _search_books(
+    db: AsyncSession,
+    *,
+    query: Optional[str],
+    author: Optional[str],
+    available_only: bool,
+    limit: int,
+    cursor_data: Optional[Dict[str, Any]],
+    columns: Optional[List[str]],
+) -> Tuple[List[Any], Optional[str]]:
+    """Relevance-ranked search, keyset-paginated on (rank, id)."""
+    ranked = await books_repo.search_ranked(
+        db,
+        query=query,
+        author=author,
+        available_only=available_only,
+        limit=limit + 1,
+        cursor_data=cursor_data,
+        columns=columns,
+    )
+
+    has_more = len(ranked) > limit
+    if has_more:
+        ranked = ranked[:limit]
+
+    next_cursor: Optional[str] = None
+    if has_more and ranked:
+        last, last_rank = ranked[-1]
+        next_cursor = encode_cursor({"rank": last_rank, "id": str(last.id)})
+
+    return [book for book, _ in ranked], next_cursor
+
+
+async def get_book(
+    db: AsyncSession, book_id: uuid.UUID, *, fields: Optional[AbstractSet[str]] = None
+) -> Optional[Any]:
+    """The Book, or with `fields` a row of just those columns (and id)."""
+    return await books_repo.get_by_id(db, book_id, columns=_columns(fields))
+
+
+async def batch_get(
+    db: AsyncSession, *, ids: Sequence[uuid.UUID], isbns: Sequence[str]
+) -> List[Dict[str, Any]]:
+    """
+    Resolve every id and ISBN with one query. Returns one {"id"|"isbn", "book"}
+    dict per input, ids first, in request order; "book" is None when not found.
+    ISBNs are compared normalised; if several books share one, the oldest wins.
+    """
+    keys = [books_repo.normalize_isbn(isbn) for isbn in isbns]
+    books = await books_repo.get_many(
+        db, ids=list(dict.fromkeys(ids)), isbns=list(dict.fromkeys(k for k in keys if k))
+    )
+
+    by_id = {book.id: book for book in books}
+    by_isbn: Dict[str, Book] = {}
+    for book in books:  # oldest first
+        if book.isbn:
+            by_isbn.setdefault(books_repo.normalize_isbn(book.isbn), book)
+
+    return [{"id": book_id, "book": by_id.get(book_id)} for book_id in ids] + [
+        {"isbn": isbn, "book": by_isbn.get(key) if key else None}
+        for isbn, key in zip(isbns, keys)
+    ]
 
 
-def delete_book(db: Session, book_id: uuid.UUID) -> bool:
-    return books_repo.delete(db, book_id)
+async def delete_book(db: AsyncSession, book_id: uuid.UUID) -> bool:
+    deleted = await books_repo.delete(db, book_id)
+    if deleted:
+        analytics_service.bump_version()
+    return deleted
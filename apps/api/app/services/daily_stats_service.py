@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+"""
+Background upkeep of the loan_daily_book_stats rollup.
+
+Checkout and return only write loans; they never touch the rollup, so
+concurrent checkouts of one title do not queue on a shared (book, day) row.
+Instead one task per process (when ANALYTICS_USE_ROLLUP is set) derives each
+finished UTC day from loans every ANALYTICS_ROLLUP_INTERVAL_SECONDS and moves
+the watermark past it. Analytics reads days from the watermark on straight
+from loans, so a lagging rollup is slower to read but never wrong.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.repos import analytics_repo
+
+logger = logging.getLogger(__name__)
+
+# A return's returned_at is its transaction's start time, so a transaction
+# that began just before midnight can commit just after it. Days are rolled
+# up only once they have been over for this long.
+_SETTLE = timedelta(minutes=5)
+# Days rebuilt per transaction while catching up on history.
+_CHUNK_DAYS = 30
+
+_task: Optional[asyncio.Task[None]] = None
+
+
+def complete_before() -> date:
+    """First UTC day that is not yet safe to roll up."""
+    return (datetime.now(timezone.utc) - _SETTLE).date()
+
+
+async def catch_up() -> None:
+    """Roll up every finished day past the watermark, one chunk per transaction."""
+    try:
+        async with AsyncSessionLocal() as db:
+            while True:
+                done = await analytics_repo.advance_daily_stats(db, complete_before(), _CHUNK_DAYS)
+                await db.commit()
+                if done is None:
+                    break
+                logger.info("loan_daily_book_stats rolled up %s .. %s", done[0], done[1])
+    except Exception:  # noqa: BLE001
+        # The watermark only moves with a committed chunk; the next tick resumes there.
+        logger.exception("loan_daily_book_stats rollup failed")
+
+
+async def _run() -> None:
+    while True:
+        await catch_up()
+        await asyncio.sleep(settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+
+
+def start() -> None:
+    """Start the rollup task (ANALYTICS_USE_ROLLUP only)."""
+    global _task
+    if settings.ANALYTICS_USE_ROLLUP and _task is None:
+        _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """Stop the rollup task."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
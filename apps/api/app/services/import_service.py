@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+"""
+Bulk catalogue import from streamed NDJSON or CSV (POST /v1/books:import and
+scripts/import_books.py).
+
+Records are parsed as the body arrives and validated with the BookCreate
+rules. Valid rows are COPYed straight into a per-transaction staging table;
+invalid ones are reported. books_repo.merge_import then inserts every
+non-duplicate row with two set-based statements and the whole import commits
+once. Field names are BookCreate's (title, author, publishedYear, …), so a
+file from GET /v1/books/export can be imported as is.
+"""
+
+import csv
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.models import Book
+from app.repos import books_repo
+from app.services import analytics_service
+from app.v1.schemas.books import BookCreate
+
+logger = logging.getLogger(__name__)
+
+# Problem rows listed in the import report; the counts cover all of them.
+MAX_REPORTED_REJECTS = 1000
+
+# BookCreate does not bound string lengths; the books columns do.
+_MAX_LENGTHS = {
+    "title": Book.__table__.c.title.type.length,
+    "author": Book.__table__.c.author.type.length,
+    "isbn": Book.__table__.c.isbn.type.length,
+}
+
+
+# A CSV record (a quoted field may span lines) is rejected once it grows past
+# either bound, and parsing resumes at the next line. A stray quote in an
+# unquoted field then costs at most this much instead of the rest of the file.
+MAX_RECORD_LINES = 1000
+MAX_RECORD_CHARS = 1 << 20
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines (newline kept), whatever the chunking."""
+    partial: List[bytes] = []
+    async for chunk in chunks:
+        *complete, rest = chunk.split(b"\n")
+        for raw in complete:
+            if partial:
+                raw, partial = b"".join(partial) + raw, []
+            yield raw.decode("utf-8", errors="replace") + "\n"
+        if rest:
+            partial.append(rest)
+    if partial:
+        yield b"".join(partial).decode("utf-8", errors="replace")
+
+
+async def _records(
+    chunks: AsyncIterator[bytes], fmt: str
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """(line number, record or None, parse error or None) per non-blank record."""
+    if fmt == "ndjson":
+        number = 0
+        async for line in _lines(chunks):
+            number += 1
+            if number == 1:
+                line = line.lstrip("\ufeff")
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield number, None, f"invalid JSON: {exc}"
+                continue
+            if isinstance(record, dict):
+                # Nulls are missing values, so BookCreate defaults apply.
+                yield number, {k: v for k, v in record.items() if v is not None}, None
+            else:
+                yield number, None, "each line must be a JSON object"
+        return
+
+    # CSV: a quoted field may span lines; a record is complete once its
+    # quotes balance ("" escapes a quote, so the count stays even). Parity is
+    # kept per line, so each line is scanned once.
+    header: Optional[List[str]] = None
+    number = start = size = 0
+    buffered: List[str] = []
+    in_quotes = False
+    async for line in _lines(chunks):
+        number += 1
+        if number == 1:
+            line = line.lstrip("\ufeff")
+        if not buffered:
+            start, size = number, 0
+        buffered.append(line)
+        size += len(line)
+        in_quotes ^= line.count('"') % 2 == 1
+        if in_quotes:
+            if len(buffered) >= MAX_RECORD_LINES or size > MAX_RECORD_CHARS:
+                yield start, None, (
+                    f"unterminated quoted field (record longer than {MAX_RECORD_LINES} "
+                    f"lines or {MAX_RECORD_CHARS} characters)"
+                )
+                buffered, in_quotes = [], False
+            continue
+        text, buffered = "".join(buffered), []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, None, f"expected {len(header)} fields, got {len(values)}"
+            continue
+        # Empty cells are missing values, so BookCreate defaults apply.
+        yield start, {k: v for k, v in zip(header, values) if v != ""}, None
+    if buffered:
+        yield start, None, "unterminated quoted field"
+
+
+def _validate(record: Dict[str, Any]) -> Tuple[Optional[BookCreate], Optional[str]]:
+    try:
+        book = BookCreate.model_validate(record)
+    except ValidationError as exc:
+        return None, "; ".join(
+            f"{'.'.join(str(p) for p in e['loc']) or 'record'}: {e['msg']}" for e in exc.errors()
+        )
+    except TypeError as exc:  # e.g. a list where BookCreate's validators expect a scalar
+        return None, str(exc)
+    problems = [
+        f"{name}: at most {limit} characters"
+        for name, limit in _MAX_LENGTHS.items()
+        if (value := getattr(book, name)) is not None and len(value) > limit
+    ] + [
+        f"{name}: out of range"
+        for name in ("publishedYear", "availableCopies")
+        if (value := getattr(book, name)) is not None and not -(2**31) <= value < 2**31
+    ]
+    if problems:
+        return None, "; ".join(problems)
+    return book, None
+
+
+async def import_books(
+    db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str
+) -> Dict[str, Any]:
+    """
+    Import a stream of NDJSON or CSV book records in one transaction. Returns
+    counts (received, inserted, duplicates, invalid) and the first
+    MAX_REPORTED_REJECTS problem rows as {"line", "code", "message"}.
+    """
+    rejects: List[Dict[str, Any]] = []
+    counts = {"received": 0, "invalid": 0}
+
+    async def valid_rows() -> AsyncIterator[Tuple[Any, ...]]:
+        async for line, record, error in _records(chunks, fmt):
+            counts["received"] += 1
+            book = None
+            if record is not None:
+                book, error = _validate(record)
+            if book is None:
+                counts["invalid"] += 1
+                if len(rejects) < MAX_REPORTED_REJECTS:
+                    rejects.append({"line": line, "code": "VALIDATION_ERROR", "message": error})
+                continue
+            yield (
+                line,
+                book.title,
+                book.author,
+                book.description,
+                book.isbn,
+                books_repo.normalize_isbn(book.isbn) or None if book.isbn else None,
+                book.publishedYear,
+                book.availableCopies,
+                book.coverImageUrl,
+            )
+
+    await books_repo.begin_import(db)
+    await books_repo.copy_import_rows(db, valid_rows())
+    inserted, duplicates, duplicate_lines = await books_repo.merge_import(
+        db, report_limit=MAX_REPORTED_REJECTS
+    )
+    await db.commit()
+    if inserted:
+        analytics_service.bump_version()
+
+    rejects.extend(
+        {
+            "line": line,
+            "code": "DUPLICATE_BOOK",
+            "message": (
+                "Same ISBN (or, without one, same title and author) as an existing "
+                "book or an earlier line."
+            ),
+        }
+        for line in duplicate_lines
+    )
+    rejects.sort(key=lambda r: r["line"])
+    logger.info(
+        "book import: %d received, %d inserted, %d duplicates, %d invalid",
+        counts["received"], inserted, duplicates, counts["invalid"],
+    )
+    return {
+        **counts,
+        "inserted": inserted,
+        "duplicates": duplicates,
+        "rejects": rejects[:MAX_REPORTED_REJECTS],
+    }
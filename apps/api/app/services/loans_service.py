@@ -1,113 +1,293 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime, timezone
-from typing import List, Optional, Tuple
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.domain.models import Loan
+from app.core.config import settings
 from app.lib.errors import ApiException
 from app.lib.pagination import decode_cursor, encode_cursor
 from app.repos import books_repo, loans_repo
+from app.services import analytics_service, availability_service, users_service
 from app.v1.schemas.loans import LoanCreate
 
 
-def _reload(db: Session, loan_id: uuid.UUID) -> Loan:
-    """Re-fetch a Loan with its Book eagerly loaded (used after commit)."""
-    return (
-        db.execute(
-            select(Loan).where(Loan.id == loan_id).options(joinedload(Loan.book))
-        )
-        .unique()
-        .scalar_one()
+def _is_duplicate_active_loan(exc: IntegrityError) -> bool:
+    diag = getattr(exc.orig, "diag", None)
+    return getattr(diag, "constraint_name", None) == loans_repo.ACTIVE_LOAN_UNIQUE_INDEX
+
+
+def _already_borrowed() -> ApiException:
+    return ApiException(
+        code="ALREADY_BORROWED",
+        message="This user already has an active loan for this book.",
+        status_code=409,
     )
 
 
-def checkout_book(db: Session, admin_id: str, data: LoanCreate) -> Loan:
+async def checkout_book(db: AsyncSession, admin_id: str, data: LoanCreate) -> Row:
     """
     Check out a book on behalf of a borrower. Only staff (admin/librarian) may call this.
     Validates:
       - Book exists
       - For registered users: no active loan for this book already
+        (enforced by the partial unique index ix_loans_active_user_unique)
       - At least one copy is available
+
+    The copy claim and loan insert run as one statement. Under the "counter"
+    circulation model the books row is locked for that statement and the
+    commit; under "copies" a free book_copies row is claimed with SKIP LOCKED
+    and available_copies is recounted in the background.
+    Returns a LoanOut-shaped row.
     """
-    book = books_repo.get_for_update(db, data.bookId)
-    if not book:
-        raise ApiException(
-            code="NOT_FOUND",
-            message=f"Book {data.bookId} not found.",
-            status_code=404,
+    copies_model = settings.CIRCULATION_MODEL == "copies"
+    checkout = loans_repo.checkout_copy if copies_model else loans_repo.checkout
+    borrower_user_id = data.borrowerUserId.strip() if data.borrowerUserId else None
+    try:
+        loan = await checkout(
+            db,
+            book_id=data.bookId,
+            borrower_user_id=borrower_user_id,
+            borrower_name=data.borrowerName.strip() if data.borrowerName else None,
+            processed_by_admin_id=admin_id,
         )
+    except IntegrityError as exc:
+        await db.rollback()
+        if _is_duplicate_active_loan(exc):
+            raise _already_borrowed() from exc
+        raise
 
-    # Duplicate-loan guard applies only to registered users.
-    if data.borrowerUserId:
-        borrower_uid = data.borrowerUserId.strip()
-        if loans_repo.find_active_loan_for_user(db, borrower_uid, data.bookId):
+    if loan is None:
+        # Nothing was written; find out why (off the hot path), in the same
+        # order as checkout_batch: NOT_FOUND, ALREADY_BORROWED, BOOK_UNAVAILABLE.
+        await db.rollback()
+        if not await books_repo.exists_by_id(db, data.bookId):
             raise ApiException(
-                code="ALREADY_BORROWED",
-                message="This user already has an active loan for this book.",
-                status_code=409,
+                code="NOT_FOUND",
+                message=f"Book {data.bookId} not found.",
+                status_code=404,
             )
-
-    if book.available_copies <= 0:
+        if borrower_user_id and await loans_repo.find_active_pairs(
+            db, [(borrower_user_id, data.bookId)]
+        ):
+            raise _already_borrowed()
         raise ApiException(
             code="BOOK_UNAVAILABLE",
             message="No copies of this book are currently available.",
             status_code=409,
         )
 
-    book.available_copies -= 1
-    loan = Loan(
-        book_id=data.bookId,
-        borrower_user_id=data.borrowerUserId.strip() if data.borrowerUserId else None,
-        borrower_name=data.borrowerName.strip() if data.borrowerName else None,
-        processed_by_admin_id=admin_id,
-        status="borrowed",
-    )
-    db.add(loan)
-    db.flush()
-    loan_id = loan.id
-    db.commit()
-    return _reload(db, loan_id)
+    await db.commit()
+    analytics_service.bump_version()
+    if copies_model:
+        availability_service.mark_dirty([loan.book_id])
+    return loan
 
 
-def return_loan(db: Session, admin_id: str, loan_id: uuid.UUID) -> Loan:
+async def return_loan(db: AsyncSession, admin_id: str, loan_id: uuid.UUID) -> Row:
     """
     Check in (return) a loan. Only staff (admin/librarian) may call this.
     admin_id is kept for audit purposes.
+
+    The status change and copy increment run as one statement.
+    Returns a LoanOut-shaped row.
     """
-    loan = db.execute(
-        select(Loan).where(Loan.id == loan_id).with_for_update()
-    ).scalar_one_or_none()
+    copies_model = settings.CIRCULATION_MODEL == "copies"
+    mark_returned = loans_repo.mark_returned_copy if copies_model else loans_repo.mark_returned
+    loan = await mark_returned(db, loan_id)
 
-    if not loan:
-        raise ApiException(
-            code="NOT_FOUND",
-            message=f"Loan {loan_id} not found.",
-            status_code=404,
-        )
-    if loan.status == "returned":
+    if loan is None:
+        # Nothing was written; find out why (off the hot path).
+        await db.rollback()
+        status = await loans_repo.get_status(db, loan_id)
+        if status is None:
+            raise ApiException(
+                code="NOT_FOUND",
+                message=f"Loan {loan_id} not found.",
+                status_code=404,
+            )
         raise ApiException(
             code="LOAN_ALREADY_RETURNED",
             message="This loan has already been returned.",
             status_code=409,
         )
 
-    loan.status = "returned"
-    loan.returned_at = datetime.now(timezone.utc)
+    await db.commit()
+    analytics_service.bump_version()
+    if copies_model:
+        availability_service.mark_dirty([loan.book_id])
+    return loan
+
 
-    book = books_repo.get_for_update(db, loan.book_id)
-    if book:
-        book.available_copies += 1
+def _item_ok(index: int, loan: Any) -> Dict[str, Any]:
+    return {"index": index, "ok": True, "loan": loan, "error": None}
 
-    db.commit()
-    return _reload(db, loan_id)
 
+def _item_error(index: int, code: str, message: str) -> Dict[str, Any]:
+    return {"index": index, "ok": False, "loan": None, "error": {"code": code, "message": message}}
 
-def list_loans(
-    db: Session,
+
+async def checkout_batch(
+    db: AsyncSession, admin_id: str, items: List[LoanCreate]
+) -> List[Dict[str, Any]]:
+    """
+    Check out many books in one transaction with set-based SQL:
+      1. one query for the books (locked FOR UPDATE in id order under "counter"),
+      2. one query for existing active loans of the registered borrowers,
+      3. one LATERAL query claiming free copies (FOR UPDATE SKIP LOCKED),
+      4. one multi-row INSERT INTO loans ... ON CONFLICT DO NOTHING,
+      5. one UPDATE books ... FROM (VALUES ...) for the copy counts ("counter"),
+      6. one UPDATE book_copies ... FROM (VALUES ...) for the claimed copies.
+
+    Items are allocated in request order. Each result is
+    {index, ok, loan, error}; failures (NOT_FOUND, ALREADY_BORROWED,
+    BOOK_UNAVAILABLE) do not affect the other items.
+    """
+    copies_model = settings.CIRCULATION_MODEL == "copies"
+
+    books = await books_repo.get_many_for_checkout(
+        db, sorted({item.bookId for item in items}), lock=not copies_model
+    )
+    borrowers = [
+        item.borrowerUserId.strip() if item.borrowerUserId else None for item in items
+    ]
+    active = await loans_repo.find_active_pairs(
+        db, [(uid, item.bookId) for uid, item in zip(borrowers, items) if uid]
+    )
+    free_copies = await books_repo.claim_free_copies(
+        db, Counter(item.bookId for item in items if item.bookId in books)
+    )
+
+    if copies_model:
+        remaining = {book_id: len(free_copies.get(book_id, [])) for book_id in books}
+    else:
+        remaining = {book_id: book.available_copies for book_id, book in books.items()}
+
+    # index -> result; every index is filled by the end.
+    results: Dict[int, Dict[str, Any]] = {}
+    planned: List[Tuple[int, Dict[str, Any], Optional[uuid.UUID]]] = []
+    for index, (item, uid) in enumerate(zip(items, borrowers)):
+        if item.bookId not in books:
+            results[index] = _item_error(index, "NOT_FOUND", f"Book {item.bookId} not found.")
+            continue
+        if uid and (uid, item.bookId) in active:
+            results[index] = _item_error(
+                index, "ALREADY_BORROWED", "This user already has an active loan for this book."
+            )
+            continue
+        if remaining[item.bookId] <= 0:
+            results[index] = _item_error(
+                index, "BOOK_UNAVAILABLE", "No copies of this book are currently available."
+            )
+            continue
+
+        remaining[item.bookId] -= 1
+        if uid:
+            active.add((uid, item.bookId))
+        copies = free_copies.get(item.bookId)
+        planned.append(
+            (
+                index,
+                {
+                    "id": uuid.uuid4(),
+                    "book_id": item.bookId,
+                    "borrower_user_id": uid,
+                    "borrower_name": item.borrowerName.strip() if item.borrowerName else None,
+                    "processed_by_admin_id": admin_id,
+                    "status": "borrowed",
+                },
+                copies.pop() if copies else None,
+            )
+        )
+
+    inserted = await loans_repo.insert_many(db, [row for _, row, _ in planned])
+
+    deltas: Counter[uuid.UUID] = Counter()
+    assignments: List[Tuple[uuid.UUID, uuid.UUID]] = []
+    for index, row, copy_id in planned:
+        loan = inserted.get(row["id"])
+        if loan is None:
+            # Lost a race with a concurrent checkout for the same borrower + book.
+            results[index] = _item_error(
+                index, "ALREADY_BORROWED", "This user already has an active loan for this book."
+            )
+            continue
+        book = books[loan.book_id]
+        deltas[loan.book_id] -= 1
+        if copy_id is not None:
+            assignments.append((copy_id, loan.id))
+        results[index] = _item_ok(
+            index,
+            {
+                **loan._mapping,
+                "book_title": book.title,
+                "book_author": book.author,
+                "book_cover_image_url": book.cover_image_url,
+            },
+        )
+
+    if not copies_model:
+        await books_repo.adjust_available_copies(db, dict(deltas))
+    await books_repo.assign_copies(db, assignments)
+    await db.commit()
+    analytics_service.bump_version()
+    if copies_model:
+        availability_service.mark_dirty(deltas.keys())
+
+    return [results[index] for index in range(len(items))]
+
+
+async def return_batch(
+    db: AsyncSession, admin_id: str, loan_ids: List[uuid.UUID]
+) -> List[Dict[str, Any]]:
+    """
+    Return many loans in one transaction: a single CTE statement updates the
+    loans, releases their copies and applies one UPDATE books ... per book
+    ("counter", after locking those books in id order like checkout_batch).
+    Ids that were not returned are classified with one extra query.
+
+    Each result is {index, ok, loan, error}; failures are NOT_FOUND or
+    LOAN_ALREADY_RETURNED (including an id repeated within the batch).
+    admin_id is kept for audit purposes.
+    """
+    copies_model = settings.CIRCULATION_MODEL == "copies"
+    unique_ids = list(dict.fromkeys(loan_ids))
+
+    returned = {
+        row.id: row
+        for row in await loans_repo.mark_returned_many(
+            db, unique_ids, update_counter=not copies_model
+        )
+    }
+    statuses = await loans_repo.get_statuses(
+        db, [loan_id for loan_id in unique_ids if loan_id not in returned]
+    )
+    await db.commit()
+    analytics_service.bump_version()
+    if copies_model:
+        availability_service.mark_dirty({row.book_id for row in returned.values()})
+
+    results: List[Dict[str, Any]] = []
+    seen: Set[uuid.UUID] = set()
+    for index, loan_id in enumerate(loan_ids):
+        if loan_id in returned and loan_id not in seen:
+            seen.add(loan_id)
+            results.append(_item_ok(index, returned[loan_id]))
+        elif loan_id in returned or statuses.get(loan_id) == "returned":
+            results.append(
+                _item_error(index, "LOAN_ALREADY_RETURNED", "This loan has already been returned.")
+            )
+        else:
+            results.append(_item_error(index, "NOT_FOUND", f"Loan {loan_id} not found."))
+    return results
+
+
+async def list_loans(
+    db: AsyncSession,
     viewer_id: str,
     *,
     can_see_all: bool = False,
@@ -115,15 +295,17 @@ def list_loans(
     status: Optional[str] = None,
     limit: int = 20,
     cursor: Optional[str] = None,
-) -> Tuple[List[Loan], Optional[str]]:
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    List loans.
+    List loans as LoanOut-shaped dicts.
     - Staff (can_see_all=True): returns all loans unfiltered by borrower.
     - Regular users: returns only loans where borrower_user_id == viewer_id.
+    Registered borrowers' display names are attached from the users mirror,
+    through a cache, with at most one batched query for the whole page.
     """
     cursor_data = decode_cursor(cursor) if cursor else None
 
-    rows = loans_repo.list_paginated(
+    rows = await loans_repo.list_paginated(
         db,
         borrower_user_id=None if can_see_all else viewer_id,
         book_id=book_id,
@@ -136,9 +318,17 @@ def list_loans(
     if has_more:
         rows = rows[:limit]
 
+    names = await users_service.resolve_display_names(
+        db, [row.borrower_user_id for row in rows if row.borrower_user_id]
+    )
+    loans = [
+        {**row._mapping, "borrower_display_name": names.get(row.borrower_user_id)}
+        for row in rows
+    ]
+
     next_cursor: Optional[str] = None
     if has_more and rows:
         last = rows[-1]
         next_cursor = encode_cursor({"ts": last.borrowed_at.isoformat(), "id": str(last.id)})
 
-    return rows, next_cursor
+    return loans, next_cursor
@@ -0,0 +1,469 @@
+from __future__ import annotations
+
+"""
+Local mirror of the Clerk user directory.
+
+The users table is filled from two sources:
+  - a background sync per process: a full paginated pass at startup and every
+    _FULL_SYNC_EVERY seconds (also drops users Clerk no longer lists), and an
+    incremental pass every USERS_SYNC_INTERVAL seconds that stops paging at the
+    newest clerk_updated_at already stored;
+  - Clerk webhooks (user.created / user.updated / user.deleted), verified with
+    the Svix signature scheme, for near-real-time changes.
+
+A session-level advisory lock, held on an otherwise idle connection, keeps
+concurrent workers from running the same sync twice. Clerk is paged with no
+transaction open; the writes follow in short transactions. Borrower search
+only reads the table; display names for loan listings go through a small
+TTL + LRU cache in front of it and never call Clerk. Ids the mirror does not
+have yet are queued, and the background task fetches them by id right away.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, async_engine
+from app.domain.models import User
+from app.lib.errors import ApiException
+from app.lib.pagination import decode_cursor, encode_cursor
+from app.repos import users_repo
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = 500  # Clerk's maximum page size for GET /users
+_FULL_SYNC_EVERY = 24 * 3600  # seconds
+_WEBHOOK_TOLERANCE = 300  # seconds — max clock skew accepted on svix-timestamp
+
+_client: Optional[httpx.AsyncClient] = None
+_task: Optional[asyncio.Task[None]] = None
+# Ids a loan listing found no mirrored user for; fetched by the background task.
+_pending: Set[str] = set()
+_wake = asyncio.Event()
+
+
+def display_name(u: Dict[str, Any]) -> str:
+    first = (u.get("first_name") or "").strip()
+    last = (u.get("last_name") or "").strip()
+    full = f"{first} {last}".strip()
+    if full:
+        return full
+    username = (u.get("username") or "").strip()
+    if username:
+        return username
+    emails = u.get("email_addresses") or []
+    if emails:
+        return emails[0].get("email_address", u["id"])
+    return u["id"]
+
+
+def _primary_email(u: Dict[str, Any]) -> Optional[str]:
+    emails = u.get("email_addresses") or []
+    primary_id = u.get("primary_email_address_id")
+    for e in emails:
+        if e.get("id") == primary_id:
+            return e.get("email_address")
+    return emails[0].get("email_address") if emails else None
+
+
+def _clerk_updated_at(u: Dict[str, Any]) -> datetime:
+    return datetime.fromtimestamp(
+        (u.get("updated_at") or u.get("created_at") or 0) / 1000, tz=timezone.utc
+    )
+
+
+def _user_row(u: Dict[str, Any], synced_at: datetime) -> Dict[str, Any]:
+    """Clerk user object -> users row."""
+    return {
+        "id": u["id"],
+        "display_name": display_name(u)[:255],
+        "email": _primary_email(u),
+        "clerk_updated_at": _clerk_updated_at(u),
+        "synced_at": synced_at,
+    }
+
+
+# ── Search ────────────────────────────────────────────────────────────────────
+
+
+async def search_users(
+    db: AsyncSession,
+    *,
+    query: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[User], Optional[str]]:
+    cursor_data = decode_cursor(cursor) if cursor else None
+
+    rows = await users_repo.search(db, query=query, limit=limit + 1, cursor_data=cursor_data)
+
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+
+    next_cursor: Optional[str] = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor({"name": last.display_name.lower(), "id": last.id})
+
+    return rows, next_cursor
+
+
+# ── Display-name directory ────────────────────────────────────────────────────
+
+
+class _NameCache:
+    """
+    Bounded LRU of Clerk user id -> display name (None = unknown user), each
+    entry kept for `ttl` seconds. Sync and webhooks invalidate what they change.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # user id -> (expires_at_monotonic_seconds, display name or None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, ids: Iterable[str]) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        """(cached names, ids that need a lookup)."""
+        now = time.monotonic()
+        found: Dict[str, Optional[str]] = {}
+        missing: List[str] = []
+        for user_id in ids:
+            entry = self._entries.get(user_id)
+            if entry is None or now >= entry[0]:
+                missing.append(user_id)
+                continue
+            self._entries.move_to_end(user_id)
+            found[user_id] = entry[1]
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, names: Mapping[str, Optional[str]]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        for user_id, name in names.items():
+            self._entries[user_id] = (expires_at, name)
+            self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, ids: Iterable[str]) -> None:
+        for user_id in ids:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_names = _NameCache(settings.USER_NAME_CACHE_MAX_ENTRIES, settings.USER_NAME_CACHE_TTL_SECONDS)
+
+
+def name_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters and size of the display-name cache, and ids queued for lookup."""
+    return {**_names.stats(), "pending": len(_pending)}
+
+
+async def resolve_display_names(db: AsyncSession, ids: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    {user id: display name or None} for a page of ids, from the cache or at
+    most one mirror query. Never calls Clerk: ids the mirror does not have
+    yet come back as None and are queued for the background sync to fetch.
+    """
+    found, missing = _names.get_many(dict.fromkeys(ids))
+    if not missing:
+        return found
+
+    looked_up: Dict[str, Optional[str]] = dict.fromkeys(missing)
+    looked_up.update(await users_repo.get_display_names(db, missing))
+    unknown = [user_id for user_id, name in looked_up.items() if name is None]
+    if unknown and settings.CLERK_SECRET_KEY:
+        _queue_lookup(unknown)
+    _names.set_many(looked_up)
+    return {**found, **looked_up}
+
+
+# ── Clerk sync ────────────────────────────────────────────────────────────────
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=settings.CLERK_API_URL,
+            headers={"Authorization": f"Bearer {settings.CLERK_SECRET_KEY}"},
+            timeout=10.0,
+        )
+    return _client
+
+
+async def _fetch_page(offset: int, order_by: str) -> List[Dict[str, Any]]:
+    resp = await _get_client().get(
+        "/users", params={"limit": _PAGE_SIZE, "offset": offset, "order_by": order_by}
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _fetch_users(*, full: bool, watermark: Optional[datetime]) -> List[Dict[str, Any]]:
+    """
+    Page through Clerk's users. A full pass pages by created_at, which an update
+    made mid-sync does not move; an incremental pass pages newest updated first
+    and stops at the first page reaching the watermark.
+    """
+    users: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        page = await _fetch_page(offset, "created_at" if full else "-updated_at")
+        users.extend(page)
+        if len(page) < _PAGE_SIZE:
+            return users
+        if watermark is not None and any(_clerk_updated_at(u) < watermark for u in page):
+            return users
+        offset += _PAGE_SIZE
+
+
+async def _fetch_users_by_id(ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """The users among `ids` that Clerk still has: one call per 100 ids."""
+    users: List[Dict[str, Any]] = []
+    for i in range(0, len(ids), 100):
+        chunk = ids[i : i + 100]
+        resp = await _get_client().get(
+            "/users", params={"user_id": list(chunk), "limit": len(chunk)}
+        )
+        resp.raise_for_status()
+        users.extend(resp.json())
+    return users
+
+
+async def _upsert(db: AsyncSession, users: Sequence[Dict[str, Any]], synced_at: datetime) -> int:
+    upserted = 0
+    for i in range(0, len(users), _PAGE_SIZE):
+        rows = [_user_row(u, synced_at) for u in users[i : i + _PAGE_SIZE]]
+        upserted += await users_repo.upsert_many(db, rows)
+    return upserted
+
+
+def _queue_lookup(ids: Iterable[str]) -> None:
+    """Have the background task fetch these users from Clerk soon."""
+    room = settings.USER_NAME_CACHE_MAX_ENTRIES - len(_pending)
+    if room > 0:
+        _pending.update(list(ids)[:room])
+        _wake.set()
+
+
+async def fetch_pending() -> int:
+    """Fetch the queued ids from Clerk into the mirror; returns the users stored."""
+    if not _pending:
+        return 0
+    ids = list(_pending)
+    _pending.clear()
+    try:
+        users = await _fetch_users_by_id(ids)
+        async with AsyncSessionLocal() as db:
+            stored = await _upsert(db, users, datetime.now(timezone.utc))
+            await db.commit()
+    except Exception:  # noqa: BLE001
+        logger.exception("Clerk lookup of %d unmirrored users failed", len(ids))
+        _pending.update(ids)  # retried on the next sync tick, not right away
+        return 0
+    # Unknown users were cached as None; the next read picks up the mirror.
+    _names.discard(ids)
+    return stored
+
+
+@asynccontextmanager
+async def _sync_lock() -> AsyncIterator[bool]:
+    """The directory-sync lock (True if taken), held on a connection of its own."""
+    async with async_engine.connect() as conn:
+        locked = await users_repo.try_lock_sync(conn)
+        await conn.commit()  # the lock outlives it; nothing stays open meanwhile
+        try:
+            yield locked
+        finally:
+            if locked:
+                await users_repo.unlock_sync(conn)
+                await conn.commit()
+
+
+async def sync_users(db: AsyncSession, *, full: bool = False) -> Dict[str, int]:
+    """
+    Fetch Clerk's users (see _fetch_users) and upsert them.
+
+    Incremental (full=False) only fetches users updated since the stored
+    watermark. Full also deletes users it did not see, once Clerk confirms by
+    id that they are gone (offset paging can skip a user when another is
+    deleted mid-sync). All pages are fetched before anything is written, and
+    no transaction is open during Clerk calls. Returns {"fetched", "upserted",
+    "deleted"}, or {"skipped": 1} when another sync holds the lock.
+    """
+    if not settings.CLERK_SECRET_KEY:
+        raise ApiException(
+            code="NOT_CONFIGURED",
+            message="CLERK_SECRET_KEY is not configured on the server.",
+            status_code=503,
+        )
+    async with _sync_lock() as locked:
+        if not locked:
+            return {"skipped": 1}
+
+        started = datetime.now(timezone.utc)
+        watermark = None if full else await users_repo.latest_clerk_update(db)
+        await db.rollback()
+
+        users = await _fetch_users(full=full, watermark=watermark)
+        stats = {"fetched": len(users), "upserted": 0, "deleted": 0}
+        if watermark is not None:
+            users = [u for u in users if _clerk_updated_at(u) >= watermark]
+        stats["upserted"] = await _upsert(db, users, started)
+        await db.commit()
+
+        if full:
+            unseen = await users_repo.ids_not_synced_since(db, started)
+            await db.rollback()
+            if unseen:
+                still_there = await _fetch_users_by_id(unseen)
+                kept = {u["id"] for u in still_there}
+                stats["upserted"] += await _upsert(db, still_there, started)
+                stats["deleted"] = await users_repo.delete_not_synced_since(
+                    db, started, [user_id for user_id in unseen if user_id not in kept]
+                )
+                await db.commit()
+
+    if stats["upserted"] or stats["deleted"]:
+        _names.clear()
+    return stats
+
+
+async def _run() -> None:
+    last_full = float("-inf")
+    last_sync = float("-inf")
+    while True:
+        if time.monotonic() - last_sync >= settings.USERS_SYNC_INTERVAL:
+            full = time.monotonic() - last_full >= _FULL_SYNC_EVERY
+            try:
+                async with AsyncSessionLocal() as db:
+                    stats = await sync_users(db, full=full)
+                if full:
+                    last_full = time.monotonic()
+                logger.info("Clerk user sync (%s): %s", "full" if full else "incremental", stats)
+            except Exception:  # noqa: BLE001
+                logger.exception("Clerk user sync failed")
+            last_sync = time.monotonic()
+        # Sleep until the next sync, or until a listing queues unknown users.
+        _wake.clear()
+        await fetch_pending()
+        try:
+            await asyncio.wait_for(
+                _wake.wait(), settings.USERS_SYNC_INTERVAL - (time.monotonic() - last_sync)
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+def start() -> None:
+    """Start the background directory sync (only when Clerk is configured)."""
+    global _task
+    if settings.CLERK_SECRET_KEY and _task is None:
+        _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """Stop the sync and close the pooled Clerk client."""
+    global _task, _client
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# ── Clerk webhooks ────────────────────────────────────────────────────────────
+
+
+def verify_webhook(headers: Mapping[str, str], body: bytes) -> None:
+    """
+    Verify a Clerk (Svix) webhook signature: base64 HMAC-SHA256 over
+    "<svix-id>.<svix-timestamp>.<body>" with the whsec_ secret. Raises
+    ApiException on a missing secret, stale timestamp or bad signature.
+    """
+    if not settings.CLERK_WEBHOOK_SECRET:
+        raise ApiException(
+            code="NOT_CONFIGURED",
+            message="CLERK_WEBHOOK_SECRET is not configured on the server.",
+            status_code=503,
+        )
+    msg_id = headers.get("svix-id", "")
+    timestamp = headers.get("svix-timestamp", "")
+    signatures = headers.get("svix-signature", "")
+    if not (msg_id and timestamp.isdigit() and signatures):
+        raise ApiException(code="INVALID_SIGNATURE", message="Missing webhook signature.", status_code=401)
+    if abs(time.time() - int(timestamp)) > _WEBHOOK_TOLERANCE:
+        raise ApiException(code="INVALID_SIGNATURE", message="Webhook timestamp out of range.", status_code=401)
+
+    secret = base64.b64decode(settings.CLERK_WEBHOOK_SECRET.removeprefix("whsec_"))
+    expected = base64.b64encode(
+        hmac.new(secret, f"{msg_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    ).decode()
+    for candidate in signatures.split():
+        version, _, sig = candidate.partition(",")
+        if version == "v1" and hmac.compare_digest(sig, expected):
+            return
+    raise ApiException(code="INVALID_SIGNATURE", message="Invalid webhook signature.", status_code=401)
+
+
+async def apply_webhook_event(db: AsyncSession, event: Dict[str, Any]) -> None:
+    """
+    Apply a verified Clerk user.* event to the mirror. Other events are ignored;
+    a user.created / user.updated event without a user object is a 400.
+    """
+    kind = event.get("type")
+    data = event.get("data")
+    if not isinstance(data, dict):
+        data = {}
+    if kind in ("user.created", "user.updated"):
+        if not isinstance(data.get("id"), str) or not data["id"]:
+            raise ApiException(
+                code="VALIDATION_ERROR",
+                message=f"{kind} event has no data.id.",
+                status_code=400,
+            )
+        await users_repo.upsert_many(db, [_user_row(data, datetime.now(timezone.utc))])
+    elif kind == "user.deleted" and isinstance(data.get("id"), str) and data["id"]:
+        await users_repo.delete_many(db, [data["id"]])
+    else:
+        return
+    await db.commit()
+    _names.discard([data["id"]])
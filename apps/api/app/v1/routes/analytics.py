@@ -1,41 +1,37 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Mapping, Tuple
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
 
+from app.core.auth import token_cache_stats
 from app.core.authorization import Permissions, require_permission
-from app.core.db import get_db
 from app.core.config import settings
-from app.repos import analytics_repo
-from app.services.ai_insights_service import generate_insights
+from app.services import ai_insights_service, analytics_service, users_service
 from app.v1.schemas.analytics import (
+    AiBreakerStatsOut,
+    AiCacheStatsOut,
     AiInsightsOut,
+    AiMetricsOut,
+    AnalyticsInsightsOut,
     AnalyticsSummaryOut,
     DormantBookOut,
     LowStockAlertOut,
+    MetricsCacheStatsOut,
     MetricsOut,
+    TokenCacheStatsOut,
     TrendingBookOut,
+    UserNameCacheStatsOut,
 )
 
 router = APIRouter(tags=["analytics"])
 
 
-@router.get("/analytics/summary", response_model=AnalyticsSummaryOut)
-async def get_analytics_summary(
-    days: int = Query(
-        default=None,
-        ge=1,
-        le=365,
-        description="Window in days for loan metrics (default from env)",
-    ),
-    db: Session = Depends(get_db),
-    _claims: Dict[str, Any] = Depends(require_permission(Permissions.VIEW_ALL_LOANS)),
-) -> AnalyticsSummaryOut:
+async def _load_metrics(days: int | None) -> Tuple[int, MetricsOut]:
     window_days = days if days is not None else settings.ANALYTICS_DEFAULT_WINDOW_DAYS
 
-    raw_metrics = analytics_repo.compute_metrics(db, window_days)
+    # Cached per window; only a miss (or an over-age entry) touches the DB.
+    raw_metrics = await analytics_service.get_metrics(window_days)
 
     metrics = MetricsOut(
         totalBooks=raw_metrics["totalBooks"],
@@ -47,9 +43,12 @@ async def get_analytics_summary(
         lowStockAlerts=[LowStockAlertOut(**b) for b in raw_metrics["lowStockAlerts"]],
         dormantBooks=[DormantBookOut(**b) for b in raw_metrics["dormantBooks"]],
     )
+    return window_days, metrics
+
 
-    # Build a minimal, safe version of metrics for the AI prompt (no UUIDs in lists)
-    ai_prompt_metrics = {
+def _ai_prompt_metrics(window_days: int, metrics: MetricsOut) -> Dict[str, Any]:
+    """Minimal, safe version of metrics for the AI prompt (no UUIDs in lists)."""
+    return {
         "windowDays": window_days,
         "totalBooks": metrics.totalBooks,
         "totalLoans": metrics.totalLoans,
@@ -75,11 +74,84 @@ async def get_analytics_summary(
         ],
     }
 
-    ai_raw = await generate_insights(window_days, ai_prompt_metrics)
-    ai = AiInsightsOut(
+
+def _ai_out(status: str, ai_raw: Dict[str, Any]) -> AiInsightsOut:
+    return AiInsightsOut(
+        status=status,
         summary=ai_raw["summary"],
         insights=ai_raw["insights"],
         recommendedActions=ai_raw["recommendedActions"],
     )
 
-    return AnalyticsSummaryOut(windowDays=window_days, metrics=metrics, ai=ai)
+
+_DAYS_QUERY = Query(
+    default=None,
+    ge=1,
+    le=365,
+    description="Window in days for loan metrics (default from env)",
+)
+
+
+@router.get("/analytics/summary", response_model=AnalyticsSummaryOut)
+async def get_analytics_summary(
+    days: int = _DAYS_QUERY,
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.VIEW_ALL_LOANS)),
+) -> AnalyticsSummaryOut:
+    """
+    Metrics for the window, returned without waiting on OpenAI. `ai.status` is
+    "pending" while insights are generated in the background; fetch them from
+    GET /v1/analytics/insights with the same `days`.
+    """
+    window_days, metrics = await _load_metrics(days)
+    status, ai_raw = ai_insights_service.insights_status(
+        window_days, _ai_prompt_metrics(window_days, metrics)
+    )
+    return AnalyticsSummaryOut(windowDays=window_days, metrics=metrics, ai=_ai_out(status, ai_raw))
+
+
+@router.get("/analytics/insights", response_model=AnalyticsInsightsOut)
+async def get_analytics_insights(
+    days: int = _DAYS_QUERY,
+    wait: float = Query(
+        default=0,
+        ge=0,
+        le=25,
+        description="Seconds to wait for pending insights before answering (long poll)",
+    ),
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.VIEW_ALL_LOANS)),
+) -> AnalyticsInsightsOut:
+    """
+    AI insights for the window's current metrics. Starts generation if nothing
+    is cached or running for them; poll until `ai.status` is no longer "pending".
+    """
+    window_days, metrics = await _load_metrics(days)
+    status, ai_raw = await ai_insights_service.wait_for_insights(
+        window_days, _ai_prompt_metrics(window_days, metrics), timeout=wait
+    )
+    return AnalyticsInsightsOut(windowDays=window_days, ai=_ai_out(status, ai_raw))
+
+
+@router.get("/analytics/cache", response_model=MetricsCacheStatsOut)
+async def get_metrics_cache_stats(
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.VIEW_ALL_LOANS)),
+) -> MetricsCacheStatsOut:
+    """Hit / refresh counters of this worker's metrics, verified-token and user-name caches."""
+    return MetricsCacheStatsOut(
+        **analytics_service.cache_stats(),
+        tokenCache=TokenCacheStatsOut(**token_cache_stats()),
+        userNameCache=UserNameCacheStatsOut(**users_service.name_cache_stats()),
+    )
+
+
+@router.get("/analytics/ai/metrics", response_model=AiMetricsOut)
+async def get_ai_metrics(
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.VIEW_ALL_LOANS)),
+) -> AiMetricsOut:
+    """
+    This worker's OpenAI usage: calls made / saved by the insight cache, and
+    the circuit breaker's state.
+    """
+    return AiMetricsOut(
+        cache=AiCacheStatsOut(**ai_insights_service.cache_stats()),
+        breaker=AiBreakerStatsOut(**ai_insights_service.breaker_stats()),
+    )
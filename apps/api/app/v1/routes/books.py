@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import uuid
-from typing import Any, Dict, Literal, Optional
+from typing import AbstractSet, Any, Dict, FrozenSet, Literal, Mapping, Optional
 
-from fastapi import APIRouter, Depends, Query, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import require_auth
 from app.core.authorization import Permissions, require_permission
 from app.core.db import get_db
 from app.lib.errors import ApiException
-from app.services import books_service
-from app.v1.schemas.books import BookCreate, BookListOut, BookOut
+from app.lib.responses import page_response
+from app.services import books_service, export_service, import_service
+from app.v1.schemas.books import (
+    BOOK_FIELDS,
+    BookBatchGet,
+    BookBatchGetOut,
+    BookBatchGetResultOut,
+    BookCreate,
+    BookImportOut,
+    BookListOut,
+    BookOut,
+)
 
 router = APIRouter(tags=["books"])
 
@@ -24,20 +35,59 @@ def _book_not_found(book_id: uuid.UUID) -> ApiException:
     )
 
 
+_FIELDS_QUERY = Query(
+    default=None,
+    description=(
+        "Comma-separated fields to return, e.g. `id,title,author,coverImageUrl,"
+        "availableCopies` (default: all). Only those columns are read."
+    ),
+)
+
+
+def _parse_fields(raw: Optional[str]) -> Optional[FrozenSet[str]]:
+    """`fields` query value -> BookOut attribute names; None means every field."""
+    if raw is None:
+        return None
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(names) - BOOK_FIELDS.keys())
+    if not names or unknown:
+        raise ApiException(
+            code="VALIDATION_ERROR",
+            message="fields must be a comma-separated list of book fields.",
+            status_code=422,
+            details={"unknownFields": unknown, "allowedFields": list(BOOK_FIELDS)},
+        )
+    return frozenset(BOOK_FIELDS[name] for name in names)
+
+
+def _sparse_book(book: Any, fields: AbstractSet[str]) -> Dict[str, Any]:
+    """JSON-ready BookOut with only `fields` (the row may carry extra cursor columns)."""
+    return BookOut.model_construct(**{f: getattr(book, f) for f in fields}).model_dump(
+        mode="json", by_alias=True, include=set(fields)
+    )
+
+
 @router.get("/books", response_model=BookListOut)
 async def list_books(
-    query: Optional[str] = Query(default=None, description="Search title or author"),
-    author: Optional[str] = Query(default=None, description="Filter by author (contains)"),
+    query: Optional[str] = Query(
+        default=None, description="Full-text search over title, author and description"
+    ),
+    author: Optional[str] = Query(
+        default=None, description="Filter by author (contains, typo-tolerant)"
+    ),
     available_only: bool = Query(default=False, alias="availableOnly"),
-    sort: Literal["createdAt:desc", "createdAt:asc", "title:asc"] = Query(
-        default="createdAt:desc"
+    sort: Literal["createdAt:desc", "createdAt:asc", "title:asc", "relevance"] = Query(
+        default="createdAt:desc",
+        description="`relevance` ranks matches for `query` and/or `author`",
     ),
     limit: int = Query(default=20, ge=1, le=50),
     cursor: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db),
-    _claims: Dict[str, Any] = Depends(require_auth),
-) -> BookListOut:
-    books, next_cursor = books_service.list_books(
+    fields: Optional[str] = _FIELDS_QUERY,
+    db: AsyncSession = Depends(get_db),
+    _claims: Mapping[str, Any] = Depends(require_auth),
+) -> JSONResponse:
+    selected = _parse_fields(fields)
+    books, next_cursor = await books_service.list_books(
         db,
         query=query,
         author=author,
@@ -45,42 +95,103 @@ async def list_books(
         sort=sort,
         limit=limit,
         cursor=cursor,
+        fields=selected,
     )
-    return BookListOut(
-        items=[BookOut.model_validate(b) for b in books],
-        next_cursor=next_cursor,
+    if selected is not None:
+        # Partial items do not validate as BookOut; serialise them directly.
+        return JSONResponse(
+            {"items": [_sparse_book(b, selected) for b in books], "nextCursor": next_cursor}
+        )
+    return page_response(BookOut, books, next_cursor)
+
+
+# Declared before /books/{book_id} so "export" is not parsed as a book id.
+@router.get("/books/export", response_class=StreamingResponse)
+async def export_books(
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS)),
+) -> StreamingResponse:
+    """Staff-only: stream the whole catalogue as NDJSON (one book per line) or CSV."""
+    return StreamingResponse(
+        export_service.export_books(fmt),
+        media_type=export_service.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="books.{fmt}"'},
     )
 
 
 @router.get("/books/{book_id}", response_model=BookOut)
 async def get_book(
     book_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    _claims: Dict[str, Any] = Depends(require_auth),
-) -> BookOut:
-    book = books_service.get_book(db, book_id)
+    fields: Optional[str] = _FIELDS_QUERY,
+    db: AsyncSession = Depends(get_db),
+    _claims: Mapping[str, Any] = Depends(require_auth),
+) -> BookOut | JSONResponse:
+    selected = _parse_fields(fields)
+    book = await books_service.get_book(db, book_id, fields=selected)
     if not book:
         raise _book_not_found(book_id)
+    if selected is not None:
+        return JSONResponse(_sparse_book(book, selected))
     return BookOut.model_validate(book)
 
 
+@router.post("/books:batchGet", response_model=BookBatchGetOut)
+async def batch_get_books(
+    data: BookBatchGet,
+    db: AsyncSession = Depends(get_db),
+    _claims: Mapping[str, Any] = Depends(require_auth),
+) -> BookBatchGetOut:
+    """
+    Look up to BOOK_BATCH_GET_MAX_ITEMS books by id and/or ISBN (hyphens and
+    case ignored) in one query; each input gets a result, found or not.
+    """
+    results = [
+        BookBatchGetResultOut(
+            id=r.get("id"),
+            isbn=r.get("isbn"),
+            found=r["book"] is not None,
+            book=BookOut.model_validate(r["book"]) if r["book"] is not None else None,
+        )
+        for r in await books_service.batch_get(db, ids=data.ids, isbns=data.isbns)
+    ]
+    found = sum(1 for r in results if r.found)
+    return BookBatchGetOut(results=results, found=found, missing=len(results) - found)
+
+
+@router.post("/books:import", response_model=BookImportOut)
+async def import_books(
+    request: Request,
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    db: AsyncSession = Depends(get_db),
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS)),
+) -> BookImportOut:
+    """
+    Staff-only: bulk-import books from the request body, streamed as NDJSON
+    (one BookCreate object per line) or CSV (header row of BookCreate field
+    names). Invalid rows and duplicates are skipped and reported; the rest are
+    inserted in one transaction.
+    """
+    report = await import_service.import_books(db, request.stream(), fmt)
+    return BookImportOut(**report)
+
+
 @router.post("/books", response_model=BookOut, status_code=201)
 async def create_book(
     data: BookCreate,
-    db: Session = Depends(get_db),
-    _claims: Dict[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS)),
+    db: AsyncSession = Depends(get_db),
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS)),
 ) -> BookOut:
-    book = books_service.create_book(db, data)
+    book = await books_service.create_book(db, data)
     return BookOut.model_validate(book)
 
 
 @router.delete("/books/{book_id}", status_code=204)
 async def delete_book(
     book_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    _claims: Dict[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS)),
+    db: AsyncSession = Depends(get_db),
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_BOOKS)),
 ) -> Response:
-    deleted = books_service.delete_book(db, book_id)
+    deleted = await books_service.delete_book(db, book_id)
     if not deleted:
         raise _book_not_found(book_id)
     return Response(status_code=204)
@@ -1,45 +1,91 @@
 from __future__ import annotations
 
 import uuid
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Mapping, Optional
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import require_auth
 from app.core.authorization import Permissions, has_permission, require_permission
 from app.core.db import get_db
-from app.services import loans_service
-from app.v1.schemas.loans import LoanCreate, LoanListOut, LoanOut
+from app.lib.responses import PageResponse, page_response
+from app.services import export_service, loans_service
+from app.v1.schemas.loans import (
+    LoanBatchCreate,
+    LoanBatchOut,
+    LoanBatchResultOut,
+    LoanBatchReturn,
+    LoanCreate,
+    LoanListOut,
+    LoanOut,
+)
 
 router = APIRouter(tags=["loans"])
 
 
+def _batch_out(results: List[Dict[str, Any]]) -> LoanBatchOut:
+    items = [
+        LoanBatchResultOut(
+            index=r["index"],
+            ok=r["ok"],
+            loan=LoanOut.model_validate(r["loan"]) if r["loan"] is not None else None,
+            error=r["error"],
+        )
+        for r in results
+    ]
+    succeeded = sum(1 for r in items if r.ok)
+    return LoanBatchOut(results=items, succeeded=succeeded, failed=len(items) - succeeded)
+
+
 @router.post("/loans", response_model=LoanOut, status_code=201)
 async def checkout_book(
     data: LoanCreate,
-    db: Session = Depends(get_db),
-    claims: Dict[str, Any] = Depends(require_permission(Permissions.MANAGE_LOANS)),
+    db: AsyncSession = Depends(get_db),
+    claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_LOANS)),
 ) -> LoanOut:
     """Staff-only: check out a book on behalf of a borrower."""
-    loan = loans_service.checkout_book(db, admin_id=claims["sub"], data=data)
+    loan = await loans_service.checkout_book(db, admin_id=claims["sub"], data=data)
     return LoanOut.model_validate(loan)
 
 
+@router.post("/loans:batch", response_model=LoanBatchOut)
+async def checkout_batch(
+    data: LoanBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_LOANS)),
+) -> LoanBatchOut:
+    """Staff-only: check out up to LOAN_BATCH_MAX_ITEMS books in one transaction."""
+    results = await loans_service.checkout_batch(db, admin_id=claims["sub"], items=data.items)
+    return _batch_out(results)
+
+
+@router.post("/loans:batchReturn", response_model=LoanBatchOut)
+async def return_batch(
+    data: LoanBatchReturn,
+    db: AsyncSession = Depends(get_db),
+    claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_LOANS)),
+) -> LoanBatchOut:
+    """Staff-only: return up to LOAN_BATCH_MAX_ITEMS loans in one transaction."""
+    results = await loans_service.return_batch(db, admin_id=claims["sub"], loan_ids=data.loanIds)
+    return _batch_out(results)
+
+
 @router.get("/loans", response_model=LoanListOut)
 async def list_loans(
     book_id: Optional[uuid.UUID] = Query(default=None, alias="bookId"),
     status: Optional[Literal["borrowed", "returned"]] = Query(default=None),
     limit: int = Query(default=20, ge=1, le=50),
     cursor: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db),
-    claims: Dict[str, Any] = Depends(require_auth),
-) -> LoanListOut:
+    db: AsyncSession = Depends(get_db),
+    claims: Mapping[str, Any] = Depends(require_auth),
+) -> PageResponse:
     """
     List loans.
     Staff see all loans; regular users see only loans where they are the borrower.
     """
-    loans, next_cursor = loans_service.list_loans(
+    loans, next_cursor = await loans_service.list_loans(
         db,
         viewer_id=claims["sub"],
         can_see_all=has_permission(claims, Permissions.VIEW_ALL_LOANS),
@@ -48,18 +94,28 @@ async def list_loans(
         limit=limit,
         cursor=cursor,
     )
-    return LoanListOut(
-        items=[LoanOut.model_validate(loan) for loan in loans],
-        next_cursor=next_cursor,
+    return page_response(LoanOut, loans, next_cursor)
+
+
+@router.get("/loans/export", response_class=StreamingResponse)
+async def export_loans(
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    _claims: Mapping[str, Any] = Depends(require_permission(Permissions.VIEW_ALL_LOANS)),
+) -> StreamingResponse:
+    """Staff-only: stream the whole loan history as NDJSON (one loan per line) or CSV."""
+    return StreamingResponse(
+        export_service.export_loans(fmt),
+        media_type=export_service.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="loans.{fmt}"'},
     )
 
 
 @router.post("/loans/{loan_id}/return", response_model=LoanOut)
 async def return_loan(
     loan_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    claims: Dict[str, Any] = Depends(require_permission(Permissions.MANAGE_LOANS)),
+    db: AsyncSession = Depends(get_db),
+    claims: Mapping[str, Any] = Depends(require_permission(Permissions.MANAGE_LOANS)),
 ) -> LoanOut:
     """Staff-only: check in (return) a loan."""
-    loan = loans_service.return_loan(db, admin_id=claims["sub"], loan_id=loan_id)
+    loan = await loans_service.return_loan(db, admin_id=claims["sub"], loan_id=loan_id)
     return LoanOut.model_validate(loan)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import json
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_db
+from app.lib.errors import ApiException
+from app.services import users_service
+
+router = APIRouter(tags=["webhooks"])
+
+
+@router.post("/webhooks/clerk", status_code=204)
+async def clerk_webhook(request: Request, db: AsyncSession = Depends(get_db)) -> Response:
+    """
+    Clerk user.created / user.updated / user.deleted events, applied to the
+    local users mirror. Authenticated by the Svix signature, not a JWT.
+    """
+    body = await request.body()
+    users_service.verify_webhook(request.headers, body)
+    try:
+        event = json.loads(body)
+    except ValueError as exc:
+        raise ApiException(
+            code="VALIDATION_ERROR", message="Webhook body is not JSON.", status_code=400
+        ) from exc
+    if not isinstance(event, dict):
+        raise ApiException(
+            code="VALIDATION_ERROR", message="Webhook body is not a JSON object.", status_code=400
+        )
+    await users_service.apply_webhook_event(db, event)
+    return Response(status_code=204)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, List
+from typing import Any, List, Mapping
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
@@ -17,7 +17,7 @@ class WhoamiResponse(BaseModel):
 
 
 @router.get("/whoami", response_model=WhoamiResponse)
-async def whoami(claims: dict[str, Any] = Depends(require_auth)) -> WhoamiResponse:
+async def whoami(claims: Mapping[str, Any] = Depends(require_auth)) -> WhoamiResponse:
     """
     Return the verified identity and permissions of the caller.
     Requires a valid Clerk JWT. Permissions are derived from the role in claims
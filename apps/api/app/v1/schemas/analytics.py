@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -40,6 +40,8 @@ class MetricsOut(BaseModel):
 
 
 class AiInsightsOut(BaseModel):
+    # pending: generation is running; poll GET /v1/analytics/insights.
+    status: Literal["pending", "ready", "failed"]
     summary: str
     insights: List[str]
     recommendedActions: List[str]
@@ -49,3 +51,60 @@ class AnalyticsSummaryOut(BaseModel):
     windowDays: int
     metrics: MetricsOut
     ai: AiInsightsOut
+
+
+class AnalyticsInsightsOut(BaseModel):
+    windowDays: int
+    ai: AiInsightsOut
+
+
+class TokenCacheStatsOut(BaseModel):
+    size: int
+    hits: int
+    misses: int
+
+
+class UserNameCacheStatsOut(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    pending: int
+
+
+class MetricsCacheStatsOut(BaseModel):
+    hits: int
+    staleHits: int
+    misses: int
+    refreshes: int
+    failures: int
+    entries: int
+    version: int
+    hitRatio: float
+    # The worker's verified-token cache (app.core.auth), reported alongside.
+    tokenCache: TokenCacheStatsOut
+    # Borrower display names for loan listings (users_service); `pending` are
+    # ids not mirrored yet, waiting for the background Clerk lookup.
+    userNameCache: UserNameCacheStatsOut
+
+
+class AiCacheStatsOut(BaseModel):
+    upstreamCalls: int
+    cacheHits: int
+    coalesced: int
+    savedCalls: int
+    entries: int
+    inflight: int
+
+
+class AiBreakerStatsOut(BaseModel):
+    state: Literal["closed", "open", "half_open"]
+    recentCalls: int
+    failureRatio: float
+    opens: int
+    rejected: int
+    openForSeconds: float
+
+
+class AiMetricsOut(BaseModel):
+    cache: AiCacheStatsOut
+    breaker: AiBreakerStatsOut
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, field_validator, HttpUrl, model_validator
 from pydantic.alias_generators import to_camel
 
 
@@ -21,6 +21,8 @@ class BookCreate(BaseModel):
     publishedYear: Optional[int] = Field(default=None)
     availableCopies: int = Field(default=1)
     coverImageUrl: Optional[str] = Field(default=None)
+    # Skip the near-duplicate title/author check (e.g. a distinct edition).
+    allowDuplicate: bool = Field(default=False)
 
     @field_validator("title", "author", mode="before")
     @classmethod
@@ -78,3 +80,63 @@ class BookListOut(BaseModel):
 
     items: List[BookOut]
     next_cursor: Optional[str] = None
+
+
+# Fields selectable with ?fields= on the books endpoints: camelCase name as
+# serialised -> BookOut attribute (= books column).
+BOOK_FIELDS: Dict[str, str] = {to_camel(name): name for name in BookOut.model_fields}
+
+
+# Upper bound on ids + ISBNs per POST /v1/books:batchGet request.
+BOOK_BATCH_GET_MAX_ITEMS = 500
+
+
+class BookBatchGet(BaseModel):
+    """Request body for POST /v1/books:batchGet: ids and/or ISBNs, at least one."""
+
+    ids: List[uuid.UUID] = Field(default_factory=list)
+    isbns: List[str] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def bounded(self) -> "BookBatchGet":
+        total = len(self.ids) + len(self.isbns)
+        if total == 0:
+            raise ValueError("Provide at least one id or isbn.")
+        if total > BOOK_BATCH_GET_MAX_ITEMS:
+            raise ValueError(f"At most {BOOK_BATCH_GET_MAX_ITEMS} ids and isbns in total.")
+        return self
+
+
+class BookBatchGetResultOut(BaseModel):
+    """Lookup result for one requested id or ISBN (exactly one of the two is set)."""
+
+    id: Optional[uuid.UUID] = None
+    isbn: Optional[str] = None
+    found: bool
+    book: Optional[BookOut] = None
+
+
+class BookBatchGetOut(BaseModel):
+    """POST /v1/books:batchGet: one result per input, ids first, in request order."""
+
+    results: List[BookBatchGetResultOut]
+    found: int
+    missing: int
+
+
+class BookImportRejectOut(BaseModel):
+    """A row that was not imported; `line` is its 1-based line in the upload."""
+
+    line: int
+    code: str
+    message: str
+
+
+class BookImportOut(BaseModel):
+    """Summary of POST /v1/books:import (rejects are capped; the counts are not)."""
+
+    received: int
+    inserted: int
+    duplicates: int
+    invalid: int
+    rejects: List[BookImportRejectOut]
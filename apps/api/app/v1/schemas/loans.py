@@ -4,7 +4,7 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from pydantic.alias_generators import to_camel
 
 
@@ -27,6 +27,22 @@ class LoanCreate(BaseModel):
         return self
 
 
+# Upper bound on items per batch request (POST /v1/loans:batch, :batchReturn).
+LOAN_BATCH_MAX_ITEMS = 500
+
+
+class LoanBatchCreate(BaseModel):
+    """Request body for POST /v1/loans:batch."""
+
+    items: List[LoanCreate] = Field(min_length=1, max_length=LOAN_BATCH_MAX_ITEMS)
+
+
+class LoanBatchReturn(BaseModel):
+    """Request body for POST /v1/loans:batchReturn."""
+
+    loanIds: List[uuid.UUID] = Field(min_length=1, max_length=LOAN_BATCH_MAX_ITEMS)
+
+
 class LoanOut(BaseModel):
     """API response for a single loan (camelCase JSON)."""
 
@@ -40,6 +56,8 @@ class LoanOut(BaseModel):
     book_id: uuid.UUID
     borrower_user_id: Optional[str]
     borrower_name: Optional[str]
+    # Registered borrower's name from the user directory (listings only).
+    borrower_display_name: Optional[str] = None
     processed_by_admin_id: str
     status: str
     borrowed_at: datetime
@@ -59,3 +77,25 @@ class LoanListOut(BaseModel):
 
     items: List[LoanOut]
     next_cursor: Optional[str] = None
+
+
+class BatchItemErrorOut(BaseModel):
+    code: str
+    message: str
+
+
+class LoanBatchResultOut(BaseModel):
+    """Outcome for one batch item; `index` is its position in the request."""
+
+    index: int
+    ok: bool
+    loan: Optional[LoanOut] = None
+    error: Optional[BatchItemErrorOut] = None
+
+
+class LoanBatchOut(BaseModel):
+    """Per-item results for POST /v1/loans:batch and :batchReturn."""
+
+    results: List[LoanBatchResultOut]
+    succeeded: int
+    failed: int
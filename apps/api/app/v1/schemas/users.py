@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
+
+
+class ClerkUserOut(BaseModel):
+    """A registered (Clerk) user, read from the local users mirror."""
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: str
+    displayName: str = Field(validation_alias="display_name")
+    email: Optional[str] = None
+
+
+class UserListOut(BaseModel):
+    """Paginated list response for GET /v1/users."""
+
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+    )
+
+    items: List[ClerkUserOut]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,6 @@
+"""
+End-to-end benchmark suite: a deterministic large-dataset generator
+(generate_data), a local JWKS stand-in and token minter (jwks), a load driver
+for every /v1 endpoint (load) and a report comparison (compare). Run the
+modules from apps/api with python -m bench.<module>.
+"""
@@ -0,0 +1,63 @@
+"""
+Compare two bench/load.py reports endpoint by endpoint.
+
+Prints p50/p95/p99 and throughput for both runs with the relative change.
+With --threshold, exits 1 if any endpoint's p95 grew by more than that
+percentage (or its error count grew), so a CI job can gate on it.
+
+    python -m bench.compare bench/results/base.json bench/results/head.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main(args: argparse.Namespace) -> int:
+    base, head = _load(args.base), _load(args.head)
+    print(f"base {base['meta'].get('commit') or args.base}")
+    print(f"head {head['meta'].get('commit') or args.head}\n")
+    print(
+        f"{'endpoint':<36}{'p50':>17}{'p95':>17}{'p99':>17}{'rps':>17}"
+    )
+    regressions = []
+    for name, after in head["endpoints"].items():
+        before = base["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<36}  (new)")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            cells.append(f"{after[key]:>9.1f} {_change(before[key], after[key]):>+6.1f}%")
+        print(f"{name:<36}" + "".join(cells))
+        if args.threshold is not None:
+            if _change(before["p95_ms"], after["p95_ms"]) > args.threshold:
+                regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {after['p95_ms']:.1f} ms")
+            if after["errors"] > before["errors"]:
+                regressions.append(f"{name}: errors {before['errors']} -> {after['errors']}")
+    for name in base["endpoints"].keys() - head["endpoints"].keys():
+        print(f"{name:<36}  (missing from head)")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {args.threshold}%:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base", help="baseline report")
+    parser.add_argument("head", help="report to check")
+    parser.add_argument("--threshold", type=float, help="max allowed p95 increase, in percent")
+    sys.exit(main(parser.parse_args()))
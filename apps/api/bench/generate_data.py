@@ -0,0 +1,268 @@
+"""
+Deterministic synthetic dataset for benchmarks, loaded with COPY.
+
+The same --seed and --anchor always produce the same rows:
+  - books with generated titles, authors, ISBN-13s (80%), covers (70%) and
+    descriptions from a few words to a few KiB, created over five years;
+  - 1-6 copies per book, with more copies for more popular titles;
+  - loans over the two years before --anchor. Book popularity and borrower
+    activity follow Zipf distributions, so a few titles and readers account
+    for most loans, as in a real library. About 10% of loans are anonymous.
+    Loans from the last 30 days stay active with probability --active-ratio
+    while a copy is free;
+  - the borrower directory (users) that the bench tokens' subjects refer to.
+
+Loaded tables: books, book_copies, loans, users. books.available_copies and
+loan_daily_book_stats are then derived from the loans, as the API keeps them.
+
+    python -m bench.generate_data --reset [--books 1000000] [--loans 5000000]
+        [--users 50000] [--seed 42] [--anchor 2026-10-17]
+
+--reset truncates those tables first. Without it the generator refuses to
+load into a non-empty catalogue.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import psycopg
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, async_engine
+from app.repos import analytics_repo
+from app.services import daily_stats_service
+
+ADMIN_ID = "user_bench_admin"
+ANONYMOUS_RATIO = 0.10
+
+_ADJECTIVES = (
+    "silent lost hidden golden broken distant burning quiet last secret frozen "
+    "crimson hollow endless wild bright forgotten bitter gentle iron"
+).split()
+_NOUNS = (
+    "river garden empire shadow kingdom winter ocean forest city harbor mirror "
+    "crown storm island letter bridge orchard lantern voyage archive"
+).split()
+_FIRST = (
+    "Ada Ben Clara Daniel Elena Farid Grace Hiro Ines Jonas Kira Liam Maya Noah "
+    "Olga Pavel Quinn Rosa Samir Tara Uma Victor Wen Yara Zoe"
+).split()
+_LAST = (
+    "Abbott Brennan Costa Dubois Eriksen Fischer Garcia Haddad Ivanova Jensen "
+    "Kowalski Larsen Moreau Nakamura Okafor Petrov Quispe Rossi Silva Tanaka"
+).split()
+_WORDS = (
+    "the a of and to in story novel life world young old journey family war love "
+    "history secret years city night death new time man woman house first last "
+    "through between after before against across under over beyond"
+).split()
+
+
+def _zipf_cum_weights(n: int, s: float) -> List[float]:
+    return list(itertools.accumulate(1.0 / (rank**s) for rank in range(1, n + 1)))
+
+
+def _zipf_sampler(rng: random.Random, n: int, s: float):
+    """Draw indexes 0..n-1 with P(rank r) ∝ 1/r^s; ranks are shuffled over indexes."""
+    cum = _zipf_cum_weights(n, s)
+    total = cum[-1]
+    by_rank = list(range(n))
+    rng.shuffle(by_rank)
+    return lambda: by_rank[bisect.bisect(cum, rng.random() * total)], by_rank
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _isbn13(rng: random.Random) -> str:
+    digits = [9, 7, 8] + [rng.randrange(10) for _ in range(9)]
+    check = (10 - sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    d = "".join(map(str, digits + [check]))
+    return f"{d[:3]}-{d[3]}-{d[4:7]}-{d[7:12]}-{d[12]}"
+
+
+def _copies(rng: random.Random, rank_fraction: float) -> int:
+    """Top 1% of titles: 4-6 copies, top 10%: 2-3, the rest: 1-2."""
+    if rank_fraction < 0.01:
+        return rng.randint(4, 6)
+    if rank_fraction < 0.10:
+        return rng.randint(2, 3)
+    return rng.randint(1, 2)
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+
+
+def _books(
+    rng: random.Random, n: int, copies: Sequence[int], anchor: datetime
+) -> Iterator[Tuple]:
+    span = timedelta(days=5 * 365).total_seconds()
+    for i in range(n):
+        title = f"The {rng.choice(_ADJECTIVES).title()} {rng.choice(_NOUNS).title()}"
+        if rng.random() < 0.5:
+            title += f" of {rng.choice(_NOUNS).title()}"
+        title += f" {i + 1}" if rng.random() < 0.3 else ""
+        words = int(rng.paretovariate(1.2) * 20) if rng.random() < 0.9 else 0
+        yield (
+            title,
+            _person(rng),
+            " ".join(rng.choices(_WORDS, k=min(words, 800))).capitalize() or None,
+            _isbn13(rng) if rng.random() < 0.8 else None,
+            rng.randint(1900, anchor.year) if rng.random() < 0.85 else None,
+            copies[i],
+            f"https://covers.example.com/{i + 1}.jpg" if rng.random() < 0.7 else None,
+            anchor - timedelta(seconds=span * (n - i) / n),
+        )
+
+
+def main(args: argparse.Namespace) -> int:
+    anchor = datetime.combine(args.anchor, datetime.min.time(), tzinfo=timezone.utc)
+    rng = random.Random(args.seed)
+    url = settings.DATABASE_URL.replace("postgresql+psycopg://", "postgresql://")
+    started = time.perf_counter()
+
+    def step(label: str) -> None:
+        print(f"[{time.perf_counter() - started:7.1f}s] {label}", flush=True)
+
+    with psycopg.connect(url) as conn, conn.cursor() as cur:
+        if args.reset:
+            cur.execute(
+                "TRUNCATE loan_daily_stats_watermark, loan_daily_book_stats,"
+                " book_copies, loans, books, users CASCADE"
+            )
+        elif cur.execute("SELECT EXISTS (SELECT 1 FROM books)").fetchone()[0]:
+            print("books is not empty; pass --reset to replace the data.", file=sys.stderr)
+            return 1
+
+        pick_book, books_by_rank = _zipf_sampler(rng, args.books, args.book_zipf)
+        pick_user, _ = _zipf_sampler(rng, args.users, args.user_zipf)
+        popularity = {book: rank for rank, book in enumerate(books_by_rank)}
+        copies = [_copies(rng, popularity[i] / args.books) for i in range(args.books)]
+        book_ids = [_uuid(rng) for _ in range(args.books)]
+
+        step(f"COPY {args.books} books")
+        with cur.copy(
+            "COPY books (id, title, author, description, isbn, published_year,"
+            " available_copies, cover_image_url, created_at, updated_at) FROM STDIN"
+        ) as copy:
+            for book_id, row in zip(book_ids, _books(rng, args.books, copies, anchor)):
+                copy.write_row((book_id, *row, row[-1]))
+
+        step(f"COPY {args.users} users")
+        with cur.copy(
+            "COPY users (id, display_name, email, clerk_updated_at) FROM STDIN"
+        ) as copy:
+            for u in range(args.users):
+                name = _person(rng)
+                copy.write_row(
+                    (f"user_bench_{u}", name, f"reader{u}@bench.invalid", anchor)
+                )
+
+        step(f"COPY {args.loans} loans")
+        active: Dict[int, List[uuid.UUID]] = {}
+        active_pairs = set()
+        history = timedelta(days=730).total_seconds()
+        recent = anchor - timedelta(days=30)
+        with cur.copy(
+            "COPY loans (id, book_id, borrower_user_id, borrower_name,"
+            " processed_by_admin_id, status, borrowed_at, returned_at) FROM STDIN"
+        ) as copy:
+            for _ in range(args.loans):
+                loan_id = _uuid(rng)
+                book = pick_book()
+                anonymous = rng.random() < ANONYMOUS_RATIO
+                user = None if anonymous else f"user_bench_{pick_user()}"
+                borrowed_at = anchor - timedelta(seconds=rng.random() * history)
+                held = active.setdefault(book, [])
+                if (
+                    borrowed_at >= recent
+                    and rng.random() < args.active_ratio
+                    and len(held) < copies[book]
+                    and (user is None or (user, book) not in active_pairs)
+                ):
+                    held.append(loan_id)
+                    if user is not None:
+                        active_pairs.add((user, book))
+                    status, returned_at = "borrowed", None
+                else:
+                    status = "returned"
+                    returned_at = min(
+                        anchor, borrowed_at + timedelta(days=rng.expovariate(1 / 14))
+                    )
+                copy.write_row(
+                    (
+                        loan_id,
+                        book_ids[book],
+                        user,
+                        _person(rng) if anonymous else None,
+                        ADMIN_ID,
+                        status,
+                        borrowed_at,
+                        returned_at,
+                    )
+                )
+
+        step("COPY book_copies")
+        with cur.copy("COPY book_copies (id, book_id, loan_id) FROM STDIN") as copy:
+            for i, book_id in enumerate(book_ids):
+                held = active.get(i, [])
+                for c in range(copies[i]):
+                    copy.write_row((_uuid(rng), book_id, held[c] if c < len(held) else None))
+
+        step("derive available_copies")
+        cur.execute(
+            "UPDATE books b SET available_copies = b.available_copies - a.n"
+            " FROM (SELECT book_id, count(*) AS n FROM loans"
+            "       WHERE status = 'borrowed' GROUP BY book_id) a"
+            " WHERE a.book_id = b.id"
+        )
+        conn.commit()
+
+    step("rebuild loan_daily_book_stats")
+    asyncio.run(_rebuild_daily_stats(anchor))
+
+    step("ANALYZE")
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute("ANALYZE books, book_copies, loans, loan_daily_book_stats, users")
+    step("done")
+    return 0
+
+
+async def _rebuild_daily_stats(anchor: datetime) -> None:
+    async with AsyncSessionLocal() as db:
+        # Never past the days the API itself would roll up: a day still in
+        # progress must keep being read from loans.
+        complete_before = min(anchor.date(), daily_stats_service.complete_before())
+        while await analytics_repo.advance_daily_stats(db, complete_before, max_days=90):
+            await db.commit()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--loans", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--anchor",
+        type=date.fromisoformat,
+        default=datetime.now(timezone.utc).date(),
+        help="UTC day the history ends at (default: today, so analytics windows see it)",
+    )
+    parser.add_argument("--book-zipf", type=float, default=1.1, help="Zipf exponent of titles")
+    parser.add_argument("--user-zipf", type=float, default=0.9, help="Zipf exponent of readers")
+    parser.add_argument(
+        "--active-ratio", type=float, default=0.3, help="share of last-30-day loans still out"
+    )
+    parser.add_argument("--reset", action="store_true", help="truncate the tables first")
+    sys.exit(main(parser.parse_args()))
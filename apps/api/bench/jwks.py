@@ -0,0 +1,86 @@
+"""
+Local stand-in for Clerk's JWKS endpoint, plus a token minter that signs with
+the same key. With it, the API's real require_auth path runs during load
+tests: JWKS fetch, RS256 verification and the verified-token cache.
+
+The RSA key is created on first use and kept in bench/.jwks-key.pem, which is
+git-ignored, so the server and the load driver agree across processes.
+
+    python -m bench.jwks --port 8799
+
+Then start the API with
+    CLERK_JWKS_URL=http://127.0.0.1:8799/.well-known/jwks.json
+    CLERK_ISSUER=https://bench.invalid
+"""
+import argparse
+import json
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+KEY_PATH = Path(__file__).with_name(".jwks-key.pem")
+KID = "bench-key-1"
+ISSUER = "https://bench.invalid"
+
+
+@lru_cache(maxsize=1)
+def private_key() -> rsa.RSAPrivateKey:
+    if not KEY_PATH.exists():
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        KEY_PATH.write_bytes(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    return serialization.load_pem_private_key(KEY_PATH.read_bytes(), password=None)
+
+
+def jwks() -> Dict[str, Any]:
+    public = RSAAlgorithm.to_jwk(private_key().public_key(), as_dict=True)
+    return {"keys": [{**public, "kid": KID, "use": "sig", "alg": "RS256"}]}
+
+
+def mint_token(
+    sub: str, role: Optional[str] = None, *, role_claim: str = "role", ttl: int = 3600
+) -> str:
+    """An RS256 JWT the API accepts when pointed at this JWKS and ISSUER."""
+    now = int(time.time())
+    claims: Dict[str, Any] = {"sub": sub, "iss": ISSUER, "iat": now, "exp": now + ttl}
+    if role is not None:
+        claims[role_claim] = role
+    return jwt.encode(claims, private_key(), algorithm="RS256", headers={"kid": KID})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 — http.server naming
+        if not self.path.endswith("jwks.json"):
+            self.send_error(404)
+            return
+        body = json.dumps(jwks()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # the API fetches rarely; keep the console quiet
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+    private_key()
+    print(f"JWKS at http://{args.host}:{args.port}/.well-known/jwks.json (issuer {ISSUER})")
+    ThreadingHTTPServer((args.host, args.port), _Handler).serve_forever()
@@ -0,0 +1,397 @@
+"""
+End-to-end load driver for every /v1 endpoint of a running API.
+
+It runs each scenario for --duration seconds with --concurrency workers. Each
+scenario then gets p50/p95/p99 latency, throughput and a count of errors by
+status. Results go to the console and, with --output, to a JSON file:
+
+    {"meta": {...}, "endpoints": {"GET /v1/books": {"p50_ms": ..., ...}, ...}}
+
+Compare two such files with bench/compare.py.
+
+Requests carry tokens minted by bench/jwks.py, so require_auth runs for real.
+The subjects are the users that bench/generate_data.py loads. Write scenarios
+(checkouts and returns, book create/delete, import) change the data and run
+after the reads; skip them with --no-writes.
+
+    python -m bench.jwks &                  # JWKS stand-in
+    CLERK_JWKS_URL=http://127.0.0.1:8799/.well-known/jwks.json \\
+    CLERK_ISSUER=https://bench.invalid uvicorn app.main:app --workers 4 &
+    python -m bench.load --output bench/results/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from bench.generate_data import ADMIN_ID
+from bench.jwks import mint_token
+
+# Exports stream the whole table; a handful of requests is enough.
+_HEAVY_MAX_REQUESTS = 3
+
+
+@dataclass
+class Ctx:
+    """Tokens and sample ids shared by the scenarios."""
+
+    rng: random.Random
+    admin: Dict[str, str]
+    readers: List[Dict[str, str]]
+    book_ids: List[str] = field(default_factory=list)
+    isbns: List[str] = field(default_factory=list)
+    title_cursor: Optional[str] = None
+    created_books: List[str] = field(default_factory=list)
+    open_loans: List[str] = field(default_factory=list)
+    webhook_secret: Optional[str] = None
+
+    def reader(self) -> Dict[str, str]:
+        return self.rng.choice(self.readers)
+
+    def book(self) -> str:
+        return self.rng.choice(self.book_ids)
+
+
+Call = Callable[[httpx.AsyncClient, Ctx], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    call: Call
+    write: bool = False
+    heavy: bool = False
+    # Statuses that count as success besides 2xx (e.g. 409 when a copy is out).
+    expected: tuple = ()
+
+
+def _auth(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _checkout(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    resp = await client.post(
+        "/v1/loans",
+        json={"bookId": ctx.book(), "borrowerName": "Bench Walk-in"},
+        headers=ctx.admin,
+    )
+    if resp.status_code == 201:
+        ctx.open_loans.append(resp.json()["id"])
+    return resp
+
+
+async def _return(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    if not ctx.open_loans:
+        await _checkout(client, ctx)
+    loan_id = ctx.open_loans.pop() if ctx.open_loans else str(uuid.uuid4())
+    return await client.post(f"/v1/loans/{loan_id}/return", headers=ctx.admin)
+
+
+async def _checkout_batch(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    items = [{"bookId": ctx.book(), "borrowerName": "Bench Walk-in"} for _ in range(10)]
+    resp = await client.post("/v1/loans:batch", json={"items": items}, headers=ctx.admin)
+    if resp.status_code == 200:
+        ctx.open_loans.extend(r["loan"]["id"] for r in resp.json()["results"] if r["ok"])
+    return resp
+
+
+async def _return_batch(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    if len(ctx.open_loans) < 10:
+        await _checkout_batch(client, ctx)
+    loan_ids = [ctx.open_loans.pop() for _ in range(min(10, len(ctx.open_loans)))]
+    return await client.post(
+        "/v1/loans:batchReturn",
+        json={"loanIds": loan_ids or [str(uuid.uuid4())]},
+        headers=ctx.admin,
+    )
+
+
+async def _create_book(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    resp = await client.post(
+        "/v1/books",
+        json={
+            "title": f"Bench Title {uuid.uuid4().hex[:12]}",
+            "author": "Bench Author",
+            "availableCopies": 2,
+            "allowDuplicate": True,
+        },
+        headers=ctx.admin,
+    )
+    if resp.status_code == 201:
+        ctx.created_books.append(resp.json()["id"])
+    return resp
+
+
+async def _delete_book(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    if not ctx.created_books:
+        await _create_book(client, ctx)
+    book_id = ctx.created_books.pop() if ctx.created_books else str(uuid.uuid4())
+    return await client.delete(f"/v1/books/{book_id}", headers=ctx.admin)
+
+
+async def _import(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    batch = uuid.uuid4().hex[:8]
+    body = "".join(
+        json.dumps({"title": f"Bench Import {batch}-{i}", "author": "Bench Author"}) + "\n"
+        for i in range(100)
+    )
+    return await client.post(
+        "/v1/books:import?format=ndjson",
+        content=body.encode(),
+        headers={**ctx.admin, "Content-Type": "application/x-ndjson"},
+    )
+
+
+async def _webhook(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    user = ctx.rng.randrange(len(ctx.readers))
+    body = json.dumps(
+        {
+            "type": "user.updated",
+            "data": {
+                "id": f"user_bench_{user}",
+                "first_name": "Bench",
+                "last_name": f"Reader {user}",
+                "updated_at": int(time.time() * 1000),
+            },
+        }
+    ).encode()
+    msg_id, ts = f"msg_{uuid.uuid4().hex}", str(int(time.time()))
+    secret = base64.b64decode((ctx.webhook_secret or "").removeprefix("whsec_"))
+    sig = base64.b64encode(
+        hmac.new(secret, f"{msg_id}.{ts}.".encode() + body, hashlib.sha256).digest()
+    ).decode()
+    return await client.post(
+        "/v1/webhooks/clerk",
+        content=body,
+        headers={"svix-id": msg_id, "svix-timestamp": ts, "svix-signature": f"v1,{sig}"},
+    )
+
+
+def _get(path: str, who: str = "reader", **params: Any) -> Call:
+    async def call(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+        headers = ctx.admin if who == "admin" else ctx.reader() if who == "reader" else {}
+        resolved = {k: v(ctx) if callable(v) else v for k, v in params.items()}
+        url = path.format(book=ctx.book()) if "{book}" in path else path
+        return await client.get(url, params=resolved, headers=headers)
+
+    return call
+
+
+def _read_export(path: str) -> Call:
+    async def call(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+        async with client.stream("GET", path, headers=ctx.admin) as resp:
+            async for _ in resp.aiter_raw():
+                pass
+        return resp
+
+    return call
+
+
+async def _batch_get(client: httpx.AsyncClient, ctx: Ctx) -> httpx.Response:
+    return await client.post(
+        "/v1/books:batchGet",
+        json={
+            "ids": ctx.rng.sample(ctx.book_ids, min(50, len(ctx.book_ids))),
+            "isbns": ctx.rng.sample(ctx.isbns, min(50, len(ctx.isbns))),
+        },
+        headers=ctx.reader(),
+    )
+
+
+_GRID_FIELDS = "id,title,author,coverImageUrl,availableCopies"
+_QUERIES = ["river", "winter shadow", "golden", "the last", "kingdom of"]
+
+SCENARIOS: List[Scenario] = [
+    Scenario("GET /v1/ping", _get("/v1/ping", who="anonymous")),
+    Scenario("GET /v1/whoami", _get("/v1/whoami")),
+    Scenario("GET /v1/books", _get("/v1/books")),
+    Scenario("GET /v1/books fields", _get("/v1/books", fields=_GRID_FIELDS)),
+    Scenario("GET /v1/books title cursor", _get("/v1/books", sort="title:asc", cursor=lambda c: c.title_cursor)),
+    Scenario("GET /v1/books query", _get("/v1/books", query=lambda c: c.rng.choice(_QUERIES))),
+    Scenario("GET /v1/books relevance", _get("/v1/books", query=lambda c: c.rng.choice(_QUERIES), sort="relevance")),
+    Scenario("GET /v1/books author", _get("/v1/books", author="Tanaka", availableOnly="true")),
+    Scenario("GET /v1/books/{id}", _get("/v1/books/{book}")),
+    Scenario("POST /v1/books:batchGet", _batch_get),
+    Scenario("GET /v1/books/export", _read_export("/v1/books/export"), heavy=True),
+    Scenario("GET /v1/loans (own)", _get("/v1/loans")),
+    Scenario("GET /v1/loans (all)", _get("/v1/loans", who="admin")),
+    Scenario("GET /v1/loans active", _get("/v1/loans", who="admin", status="borrowed")),
+    Scenario("GET /v1/loans by book", _get("/v1/loans", who="admin", bookId=lambda c: c.book())),
+    Scenario("GET /v1/loans/export", _read_export("/v1/loans/export"), heavy=True),
+    Scenario("GET /v1/users", _get("/v1/users", who="admin", query=lambda c: c.rng.choice(["ada", "ros", "kowal", "reader1"]))),
+    Scenario("GET /v1/analytics/summary", _get("/v1/analytics/summary", who="admin", days=30)),
+    Scenario("GET /v1/analytics/insights", _get("/v1/analytics/insights", who="admin", days=30)),
+    Scenario("GET /v1/analytics/cache", _get("/v1/analytics/cache", who="admin")),
+    Scenario("GET /v1/analytics/ai/metrics", _get("/v1/analytics/ai/metrics", who="admin")),
+    Scenario("POST /v1/loans", _checkout, write=True, expected=(409,)),
+    Scenario("POST /v1/loans/{id}/return", _return, write=True, expected=(404, 409)),
+    Scenario("POST /v1/loans:batch", _checkout_batch, write=True),
+    Scenario("POST /v1/loans:batchReturn", _return_batch, write=True),
+    Scenario("POST /v1/books", _create_book, write=True),
+    Scenario("DELETE /v1/books/{id}", _delete_book, write=True),
+    Scenario("POST /v1/books:import", _import, write=True),
+    Scenario("POST /v1/webhooks/clerk", _webhook, write=True),
+]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def _run(
+    scenario: Scenario, client: httpx.AsyncClient, ctx: Ctx, args: argparse.Namespace
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    concurrency = 1 if scenario.heavy else args.concurrency
+    budget = _HEAVY_MAX_REQUESTS if scenario.heavy else args.max_requests
+
+    async def worker(deadline: float, record: bool) -> None:
+        while time.perf_counter() < deadline and (not record or len(latencies) < budget):
+            started = time.perf_counter()
+            try:
+                resp = await scenario.call(client, ctx)
+                status = resp.status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            if record:
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] += 1
+
+    if not scenario.heavy and args.warmup > 0:
+        warmup_until = time.perf_counter() + args.warmup
+        await asyncio.gather(*(worker(warmup_until, False) for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    deadline = started + (3600 if scenario.heavy else args.duration)
+    await asyncio.gather(*(worker(deadline, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = sum(
+        n for s, n in statuses.items()
+        if isinstance(s, int) and (200 <= s < 300 or s in scenario.expected)
+    )
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": len(values) - ok,
+        "statuses": {str(s): n for s, n in sorted(statuses.items(), key=str)},
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50_ms": round(_percentile(values, 0.50), 3),
+        "p95_ms": round(_percentile(values, 0.95), 3),
+        "p99_ms": round(_percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+        "concurrency": concurrency,
+    }
+
+
+async def _prepare(client: httpx.AsyncClient, args: argparse.Namespace) -> Ctx:
+    rng = random.Random(args.seed)
+    admin = _auth(mint_token(ADMIN_ID, "admin", role_claim=args.role_claim))
+    readers = [
+        _auth(mint_token(f"user_bench_{u}", role_claim=args.role_claim))
+        for u in range(args.readers)
+    ]
+    ctx = Ctx(rng=rng, admin=admin, readers=readers, webhook_secret=args.webhook_secret)
+
+    cursor = None
+    for _ in range(args.sample_pages):
+        params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        resp = await client.get("/v1/books", params=params, headers=admin)
+        resp.raise_for_status()
+        page = resp.json()
+        ctx.book_ids += [b["id"] for b in page["items"]]
+        ctx.isbns += [b["isbn"] for b in page["items"] if b["isbn"]]
+        cursor = page["nextCursor"]
+        if not cursor:
+            break
+    resp = await client.get("/v1/books", params={"sort": "title:asc", "limit": 50}, headers=admin)
+    ctx.title_cursor = resp.json().get("nextCursor")
+    if not ctx.book_ids:
+        raise SystemExit("No books found; load data with python -m bench.generate_data first.")
+    return ctx
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> int:
+    scenarios = [
+        s for s in SCENARIOS
+        if (args.writes or not s.write)
+        and (args.webhook_secret or not s.name.startswith("POST /v1/webhooks"))
+        and (not args.only or any(o in s.name for o in args.only))
+    ]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as client:
+        ctx = await _prepare(client, args)
+        print(f"{'endpoint':<36}{'req':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}")
+        for scenario in scenarios:
+            r = await _run(scenario, client, ctx, args)
+            results[scenario.name] = r
+            print(
+                f"{scenario.name:<36}{r['requests']:>7}{r['throughput_rps']:>9.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>6}"
+            )
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "commit": _git_commit(),
+                "base_url": args.base_url,
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "seed": args.seed,
+                "python": platform.python_version(),
+            },
+            "endpoints": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds per endpoint")
+    parser.add_argument("--max-requests", type=int, default=1_000_000)
+    parser.add_argument("--readers", type=int, default=200, help="distinct reader tokens")
+    parser.add_argument("--sample-pages", type=int, default=20, help="book pages to sample ids from")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--role-claim", default="role", help="the API's ADMIN_ROLE_CLAIM_KEY")
+    parser.add_argument("--webhook-secret", help="the API's CLERK_WEBHOOK_SECRET (enables the webhook scenario)")
+    parser.add_argument("--no-writes", dest="writes", action="store_false")
+    parser.add_argument("--only", nargs="*", help="run scenarios whose name contains any of these")
+    parser.add_argument("--output", help="write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
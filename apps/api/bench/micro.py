@@ -0,0 +1,312 @@
+"""
+Microbenchmarks for the pure-Python work done on every request.
+
+Each case runs in-process, with no database, network or server:
+  - verify_token, both on a verified-token cache hit and a cache miss (a real
+    RS256 verification against a key preloaded from bench/jwks.py);
+  - get_permissions;
+  - encode_cursor / decode_cursor;
+  - BookOut.model_validate over Book ORM instances and LoanOut.model_validate
+    over the row mappings loans_service.list_loans returns, one 50-item page
+    per call;
+  - ai_insights_service._metrics_cache_key over a full metrics payload;
+  - main.validation_exception_handler rendering a 422;
+  - rendering a 50-item GET /v1/books and /v1/loans page, both the way a
+    returned response model is (validate, response_model check, json) and
+    with app.lib.responses.page_response. Both must produce the same bytes.
+
+A case's time is the best per-call mean over --repeat timing rounds, which
+is the least noisy figure on a shared machine. Baselines are per machine, so
+they live in the git-ignored bench/results/ unless --baseline says otherwise:
+
+    python -m bench.micro --save              # record the baseline
+    python -m bench.micro --check [--threshold 15]
+
+--check exits 1 when any case is slower than its baseline by more than
+--threshold percent.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import timeit
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import ValidationError
+
+from app.core import auth
+from app.core.authorization import Roles, get_permissions
+from app.core.config import settings
+from app.domain.models import Book
+from app.lib.pagination import decode_cursor, encode_cursor
+from app.lib.responses import page_response
+from app.main import app, validation_exception_handler
+from app.services.ai_insights_service import _metrics_cache_key
+from app.v1.schemas.books import BookCreate, BookListOut, BookOut
+from app.v1.schemas.loans import LoanListOut, LoanOut
+from bench import jwks
+
+DEFAULT_BASELINE = Path(__file__).with_name("results") / "micro-baseline.json"
+PAGE_SIZE = 50
+
+_NOW = datetime(2026, 1, 15, 12, 30, tzinfo=timezone.utc)
+
+
+@dataclass
+class Case:
+    name: str
+    # Runs the measured operation `n` times.
+    run: Callable[[int], None]
+
+
+def _loop_case(name: str, op: Callable[[], Any]) -> Case:
+    def run(n: int) -> None:
+        for _ in range(n):
+            op()
+
+    return Case(name, run)
+
+
+def _async_case(name: str, loop: asyncio.AbstractEventLoop, op: Callable[[], Any]) -> Case:
+    async def many(n: int) -> None:
+        for _ in range(n):
+            await op()
+
+    return Case(name, lambda n: loop.run_until_complete(many(n)))
+
+
+def _books() -> List[Book]:
+    return [
+        Book(
+            id=uuid.UUID(int=i + 1),
+            title=f"The Silent River {i}",
+            author="Elena Rossi",
+            description="A story of the river and the city through the years. " * 4,
+            isbn="978-0-306-40615-7",
+            published_year=1990 + i % 30,
+            available_copies=i % 4,
+            cover_image_url=f"https://covers.example.com/{i}.jpg",
+            created_at=_NOW - timedelta(minutes=i),
+            updated_at=_NOW,
+        )
+        for i in range(PAGE_SIZE)
+    ]
+
+
+def _loans() -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": uuid.UUID(int=1000 + i),
+            "book_id": uuid.UUID(int=i + 1),
+            "borrower_user_id": f"user_{i}" if i % 10 else None,
+            "borrower_name": None if i % 10 else "Walk-in Reader",
+            "processed_by_admin_id": "user_admin",
+            "status": "borrowed" if i % 3 else "returned",
+            "borrowed_at": _NOW - timedelta(days=i),
+            "returned_at": None if i % 3 else _NOW,
+            "book_title": f"The Silent River {i}",
+            "book_author": "Elena Rossi",
+            "book_cover_image_url": f"https://covers.example.com/{i}.jpg",
+            "borrower_display_name": f"Reader {i}" if i % 10 else None,
+        }
+        for i in range(PAGE_SIZE)
+    ]
+
+
+def _metrics() -> Dict[str, Any]:
+    def book(i: int) -> Dict[str, Any]:
+        return {"title": f"The Silent River {i}", "author": "Elena Rossi"}
+
+    return {
+        "windowDays": 30,
+        "totalBooks": 1_000_000,
+        "totalLoans": 5_000_000,
+        "activeLoans": 41_233,
+        "returnedLoans": 4_958_767,
+        "totalAvailableCopies": 1_480_112,
+        "trendingBooks": [{**book(i), "borrowCount": 900 - i} for i in range(10)],
+        "lowStockAlerts": [
+            {**book(i), "availableCopies": 0, "borrowCount": 40 + i} for i in range(10)
+        ],
+        "dormantBooks": [
+            {**book(i), "lastBorrowedAt": (_NOW - timedelta(days=400 + i)).isoformat()}
+            for i in range(10)
+        ],
+    }
+
+
+def _validation_error() -> RequestValidationError:
+    body = {"title": "", "author": None, "publishedYear": "soon", "availableCopies": -1}
+    try:
+        BookCreate.model_validate(body)
+    except ValidationError as exc:
+        errors = [{**e, "loc": ("body", *e["loc"])} for e in exc.errors()]
+    return RequestValidationError(errors, body=body)
+
+
+def _page_cases(
+    loop: asyncio.AbstractEventLoop,
+    path: str,
+    list_model: Any,
+    item_model: Any,
+    rows: List[Any],
+) -> List[Case]:
+    route = next(
+        r for r in app.routes
+        if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods
+    )
+    cursor = encode_cursor({"ts": _NOW.isoformat(), "id": str(uuid.UUID(int=42))})
+
+    async def model_path() -> bytes:
+        # What FastAPI does with a returned response model.
+        page = list_model(items=[item_model.model_validate(r) for r in rows], next_cursor=cursor)
+        content = await serialize_response(
+            field=route.response_field, response_content=page, is_coroutine=True
+        )
+        return JSONResponse(content).body
+
+    async def fast_path() -> bytes:
+        return page_response(item_model, rows, cursor).body
+
+    if loop.run_until_complete(model_path()) != loop.run_until_complete(fast_path()):
+        raise SystemExit(f"{path}: page_response bytes differ from the response_model path")
+    return [
+        _async_case(f"GET {path} x{PAGE_SIZE} (response_model)", loop, model_path),
+        _async_case(f"GET {path} x{PAGE_SIZE} (page_response)", loop, fast_path),
+    ]
+
+
+def build_cases(loop: asyncio.AbstractEventLoop) -> List[Case]:
+    # verify_token against the bench key, without a JWKS fetch.
+    settings.CLERK_ISSUER = jwks.ISSUER
+    settings.CLERK_AUDIENCE = None
+    auth._jwks_store._keys = {jwks.KID: jwks.private_key().public_key()}
+    auth._jwks_store._fetched_at = time.monotonic()
+    auth._jwks_store.ttl = float("inf")
+    token = jwks.mint_token("user_bench_1", Roles.ADMIN, role_claim=settings.ADMIN_ROLE_CLAIM_KEY)
+
+    async def verify_miss() -> None:
+        auth._token_cache._entries.clear()
+        await auth.verify_token(token)
+
+    claims = {"sub": "user_bench_1", settings.ADMIN_ROLE_CLAIM_KEY: Roles.LIBRARIAN}
+    cursor_data = {"ts": _NOW.isoformat(), "id": str(uuid.UUID(int=42))}
+    title_cursor_data = {"title": "the silent river 42", **cursor_data}
+    cursor = encode_cursor(title_cursor_data)
+    books, loans, metrics = _books(), _loans(), _metrics()
+    validation_error = _validation_error()
+
+    return [
+        _async_case("verify_token (cache hit)", loop, lambda: auth.verify_token(token)),
+        _async_case("verify_token (cache miss)", loop, verify_miss),
+        _loop_case("get_permissions", lambda: get_permissions(claims)),
+        _loop_case("encode_cursor", lambda: encode_cursor(cursor_data)),
+        _loop_case("decode_cursor", lambda: decode_cursor(cursor)),
+        _loop_case(
+            f"BookOut.model_validate x{PAGE_SIZE}",
+            lambda: [BookOut.model_validate(b) for b in books],
+        ),
+        _loop_case(
+            f"LoanOut.model_validate x{PAGE_SIZE}",
+            lambda: [LoanOut.model_validate(r) for r in loans],
+        ),
+        _loop_case("_metrics_cache_key", lambda: _metrics_cache_key(30, metrics)),
+        _async_case(
+            "validation_exception_handler",
+            loop,
+            lambda: validation_exception_handler(None, validation_error),
+        ),
+        *_page_cases(loop, "/v1/books", BookListOut, BookOut, books),
+        *_page_cases(loop, "/v1/loans", LoanListOut, LoanOut, loans),
+    ]
+
+
+def measure(case: Case, repeat: int, min_time: float) -> float:
+    """Best mean seconds per call over `repeat` rounds of about `min_time` each."""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: case.run(number), number=1)
+        if elapsed >= min_time / 10:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / elapsed))
+    return min(timeit.repeat(lambda: case.run(number), repeat=repeat, number=1)) / number
+
+
+def main(args: argparse.Namespace) -> int:
+    loop = asyncio.new_event_loop()
+    cases = [
+        c for c in build_cases(loop)
+        if not args.only or any(o in c.name for o in args.only)
+    ]
+    baseline: Optional[Dict[str, float]] = None
+    if args.check:
+        if not args.baseline.exists():
+            print(f"No baseline at {args.baseline}; record one with --save.", file=sys.stderr)
+            return 2
+        baseline = json.loads(args.baseline.read_text())["cases"]
+
+    results: Dict[str, float] = {}
+    regressions: List[str] = []
+    print(f"{'case':<36}{'per call':>14}{'baseline':>14}{'change':>9}")
+    for case in cases:
+        seconds = measure(case, args.repeat, args.min_time)
+        results[case.name] = seconds
+        line = f"{case.name:<36}{_fmt(seconds):>14}"
+        if baseline is not None and case.name in baseline:
+            change = (seconds - baseline[case.name]) / baseline[case.name] * 100
+            line += f"{_fmt(baseline[case.name]):>14}{change:>+8.1f}%"
+            if change > args.threshold:
+                regressions.append(f"{case.name}: {change:+.1f}%")
+        print(line)
+    loop.close()
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "meta": {
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                    },
+                    "cases": results,
+                },
+                indent=2,
+            )
+        )
+        print(f"\nbaseline written to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed past {args.threshold}%:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+def _fmt(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.2f} µs"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown, percent")
+    parser.add_argument("--repeat", type=int, default=7, help="timing rounds per case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--only", nargs="*", help="run cases whose name contains any of these")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+Rebuild the loan_daily_book_stats rollup from loan history.
+
+The API rolls up finished days in the background (daily_stats_service); run
+this to load history before setting ANALYTICS_USE_ROLLUP=true, or any time to
+repair a range. Days are rebuilt in chunks, one transaction each:
+
+    python scripts/backfill_loan_daily_stats.py [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--chunk-days N]
+
+With no --to, days already rolled up (from --from, default the day of the
+oldest loan, up to the watermark) are rebuilt and every finished day after
+the watermark is rolled up and the watermark moved past it. An explicit --to
+(exclusive) only rebuilds [--from, --to) below the watermark.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.db import AsyncSessionLocal, async_engine
+from app.repos import analytics_repo
+from app.services import daily_stats_service
+
+
+async def backfill(start: Optional[date], end: Optional[date], chunk_days: int) -> None:
+    async with AsyncSessionLocal() as db:
+        watermark = await analytics_repo.daily_stats_watermark(db)
+        if start is None:
+            start = await analytics_repo.first_loan_day(db)
+        await db.rollback()
+        if start is None:
+            print("No loans found — nothing to backfill.")
+            return
+        repair_end = min(end, watermark) if end and watermark else watermark
+
+        total = 0
+        day = start
+        while repair_end is not None and day < repair_end:
+            chunk_end = min(day + timedelta(days=chunk_days), repair_end)
+            written = await analytics_repo.rebuild_daily_stats(db, day, chunk_end)
+            await db.commit()
+            total += written
+            print(f"{day} .. {chunk_end - timedelta(days=1)}: {written} rows")
+            day = chunk_end
+
+        if end is None:
+            complete_before = daily_stats_service.complete_before()
+            while done := await analytics_repo.advance_daily_stats(db, complete_before, chunk_days):
+                await db.commit()
+                print(f"{done[0]} .. {done[1] - timedelta(days=1)}: rolled up")
+
+    await async_engine.dispose()
+    print(f"Backfill complete: {total} rows rebuilt.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat)
+    parser.add_argument("--chunk-days", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.start, args.end, args.chunk_days))
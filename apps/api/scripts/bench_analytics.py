@@ -0,0 +1,99 @@
+"""
+Latency benchmark for the analytics metrics over a large loan history: the
+single-pass and rollup paths of compute_metrics against the per-query version
+they replaced.
+
+  per-query    analytics_repo.compute_metrics_per_query: eight round trips,
+               three of them full books LEFT JOIN loans aggregations.
+  single-pass  compute_metrics(use_rollup=False): one statement, one scan of
+               the loans in the window.
+  rollup       compute_metrics(use_rollup=True): window counts from
+               loan_daily_book_stats. Skipped until the rollup has a
+               watermark (bench/generate_data.py and
+               scripts/backfill_loan_daily_stats.py both set it).
+
+Each path runs --repeat times per window (after one warm-up run) and the
+script reports p50 / p95. This is what a miss in analytics_service costs.
+tests/test_analytics_repo.py checks that the paths agree.
+
+Only reads. Load the history first:
+
+    python -m bench.generate_data --reset --loans 10000000
+    python scripts/bench_analytics.py [--windows 7 30 365] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal, async_engine
+from app.domain.models import Book, Loan
+from app.repos import analytics_repo
+
+PATHS: Dict[str, Callable[[AsyncSession, int], Awaitable[Dict[str, Any]]]] = {
+    "per-query": analytics_repo.compute_metrics_per_query,
+    "single-pass": lambda db, days: analytics_repo.compute_metrics(db, days, use_rollup=False),
+    "rollup": lambda db, days: analytics_repo.compute_metrics(db, days, use_rollup=True),
+}
+
+
+async def _measure(db: AsyncSession, label: str, days: int, repeat: int) -> Dict[str, float]:
+    compute = PATHS[label]
+    await compute(db, days)  # warm up the buffer cache
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await compute(db, days)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        loans = await db.scalar(select(func.count()).select_from(Loan))
+        books = await db.scalar(select(func.count()).select_from(Book))
+        if loans < args.min_loans:
+            print(
+                f"Only {loans} loans; load at least {args.min_loans} with "
+                "bench/generate_data.py (or lower --min-loans).",
+                file=sys.stderr,
+            )
+            return 2
+        paths = list(args.paths)
+        if "rollup" in paths and await analytics_repo.daily_stats_watermark(db) is None:
+            print("loan_daily_book_stats has no watermark yet; skipping the rollup path.")
+            paths.remove("rollup")
+        await db.rollback()
+
+        print(f"{loans} loans over {books} books, {args.repeat} runs per path")
+        for days in args.windows:
+            print(f"  window {days} days")
+            for label in paths:
+                r = await _measure(db, label, days, args.repeat)
+                await db.rollback()
+                print(f"    {label:<12} p50 {r['p50_ms']:10.1f} ms  p95 {r['p95_ms']:10.1f} ms")
+
+    await async_engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30, 365])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-loans", type=int, default=10_000_000)
+    parser.add_argument("--paths", nargs="*", choices=list(PATHS), default=list(PATHS))
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,125 @@
+"""
+Latency benchmark for book search (GET /v1/books?query=...) at the repo layer,
+over a large synthetic catalogue: the full-text paths against the ILIKE scan
+they replaced.
+
+  ilike    the previous filter, title ILIKE '%q%' OR author ILIKE '%q%',
+           newest first. No btree index can serve it.
+  fts      books_repo.list_paginated(query=q): search_vector @@ prefix tsquery
+           through the GIN index (migration 006), newest first.
+  ranked   books_repo.search_ranked(query=q): the same match, ordered by
+           ts_rank_cd (sort=relevance).
+
+Each path fetches the first page (--page-size + 1 rows, as the service asks
+for) of each query --repeat times. The script reports p50 / p95 per query and
+how many books match. The queries use the words bench/generate_data.py builds
+titles and authors from, from very common to no match at all. Full-text
+search also looks at descriptions, so `fts` can match books `ilike` does not.
+
+Only reads. Load the catalogue first:
+
+    python -m bench.generate_data --reset --books 1000000
+    python scripts/bench_book_search.py [--repeat 20] [--page-size 20]
+        [--query river --query "silent harbor" ...]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal, async_engine
+from app.domain.models import Book
+from app.repos import books_repo
+
+# Common word, two words, a prefix, an author surname, a title number, no match.
+QUERIES = ["river", "silent harbor", "lant", "nakamura", "4242", "qqqq"]
+
+
+async def _ilike_page(db: AsyncSession, q: str, limit: int) -> List[Any]:
+    """The pre-full-text search: a sequential scan of books."""
+    stmt = (
+        select(Book)
+        .where(or_(Book.title.ilike(f"%{q}%"), Book.author.ilike(f"%{q}%")))
+        .order_by(Book.created_at.desc(), Book.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+PATHS: Dict[str, Callable[[AsyncSession, str, int], Awaitable[List[Any]]]] = {
+    "ilike": _ilike_page,
+    "fts": lambda db, q, limit: books_repo.list_paginated(db, query=q, limit=limit),
+    "ranked": lambda db, q, limit: books_repo.search_ranked(db, query=q, limit=limit),
+}
+
+
+async def _matches(db: AsyncSession, q: str) -> int:
+    tsquery = books_repo._prefix_tsquery(q)
+    if tsquery is None:
+        return 0
+    return await db.scalar(
+        select(func.count()).where(
+            Book.search_vector.bool_op("@@")(func.to_tsquery(books_repo._TS_CONFIG, tsquery))
+        )
+    )
+
+
+async def _measure(
+    db: AsyncSession, label: str, q: str, args: argparse.Namespace
+) -> Dict[str, float]:
+    fetch = PATHS[label]
+    await fetch(db, q, args.page_size + 1)  # warm up statement caches
+    timings: List[float] = []
+    for _ in range(args.repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        await fetch(db, q, args.page_size + 1)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        books = await db.scalar(select(func.count()).select_from(Book))
+        if books < args.min_books:
+            print(
+                f"Only {books} books; load a catalogue of at least {args.min_books} with "
+                "bench/generate_data.py (or lower --min-books).",
+                file=sys.stderr,
+            )
+            return 2
+
+        print(f"{books} books, first page of {args.page_size} x {args.repeat} per query")
+        for q in args.query or QUERIES:
+            print(f"  {q!r} ({await _matches(db, q)} full-text matches)")
+            for label in args.paths:
+                r = await _measure(db, label, q, args)
+                print(f"    {label:<8} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms")
+        await db.rollback()
+
+    await async_engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--query", action="append", help="repeatable; default: a built-in mix")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--min-books", type=int, default=1_000_000)
+    parser.add_argument("--paths", nargs="*", choices=list(PATHS), default=list(PATHS))
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,195 @@
+"""
+Contention benchmark: concurrent checkouts of one popular title.
+
+Seeds one book with --copies copies, then runs --concurrency workers, each
+with its own connection, doing --checkouts checkout / return cycles on that
+book (walk-in borrowers, so the active-loan unique index never fires). Each
+checkout is one transaction, as in POST /v1/loans, and is held open for
+--hold-ms before the commit to stand in for the app <-> DB round trip.
+
+It compares the write paths that decide how checkouts queue:
+
+  counter         loans_repo.checkout: every checkout locks the books row.
+  copies          loans_repo.checkout_copy: a free book_copies row is claimed
+                  FOR UPDATE SKIP LOCKED; nothing shared is locked.
+  copies+rollup   checkout_copy plus an upsert of the book's
+                  loan_daily_book_stats row for today in the same transaction,
+                  the way checkout maintained the rollup before it moved to a
+                  background job. Shows what a shared per-book row costs.
+
+For each path it reports checkouts/s and the checkout p50 / p95 latency
+(statement to commit). Everything the script writes is deleted at the end.
+
+    python scripts/bench_checkout_contention.py [--concurrency 32]
+        [--checkouts 50] [--copies 64] [--hold-ms 2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.domain.models import Book, BookCopy, Loan, LoanDailyBookStat
+from app.repos import loans_repo
+
+Checkout = Callable[[AsyncSession, uuid.UUID, str], Awaitable[Any]]
+
+
+async def _counter(db: AsyncSession, book_id: uuid.UUID, reader: str) -> Any:
+    return await loans_repo.checkout(
+        db,
+        book_id=book_id,
+        borrower_user_id=None,
+        borrower_name=reader,
+        processed_by_admin_id="user_bench_admin",
+    )
+
+
+async def _copies(db: AsyncSession, book_id: uuid.UUID, reader: str) -> Any:
+    return await loans_repo.checkout_copy(
+        db,
+        book_id=book_id,
+        borrower_user_id=None,
+        borrower_name=reader,
+        processed_by_admin_id="user_bench_admin",
+    )
+
+
+async def _copies_with_rollup(db: AsyncSession, book_id: uuid.UUID, reader: str) -> Any:
+    loan = await _copies(db, book_id, reader)
+    if loan is not None:
+        stmt = pg_insert(LoanDailyBookStat).values(
+            book_id=book_id, day=datetime.now(timezone.utc).date(), borrows=1
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["book_id", "day"],
+                set_={"borrows": LoanDailyBookStat.borrows + 1},
+            )
+        )
+    return loan
+
+
+PATHS: Dict[str, Checkout] = {
+    "counter": _counter,
+    "copies": _copies,
+    "copies+rollup": _copies_with_rollup,
+}
+
+
+async def _seed(sessions: async_sessionmaker[AsyncSession], copies: int) -> uuid.UUID:
+    book_id = uuid.uuid4()
+    async with sessions() as db:
+        await db.execute(
+            insert(Book).values(
+                id=book_id,
+                title="Bench contention title",
+                author="Bench author",
+                available_copies=copies,
+            )
+        )
+        await db.execute(insert(BookCopy), [{"book_id": book_id} for _ in range(copies)])
+        await db.commit()
+    return book_id
+
+
+async def _cleanup(sessions: async_sessionmaker[AsyncSession], book_id: uuid.UUID) -> None:
+    async with sessions() as db:
+        await db.execute(delete(Loan).where(Loan.book_id == book_id))
+        await db.execute(delete(Book).where(Book.id == book_id))  # copies, rollup: CASCADE
+        await db.commit()
+
+
+async def _worker(
+    sessions: async_sessionmaker[AsyncSession],
+    checkout: Checkout,
+    book_id: uuid.UUID,
+    worker: int,
+    args: argparse.Namespace,
+    timings: List[float],
+) -> int:
+    unavailable = 0
+    async with sessions() as db:
+        for i in range(args.checkouts):
+            started = time.perf_counter()
+            loan = await checkout(db, book_id, f"Bench reader {worker}-{i}")
+            await asyncio.sleep(args.hold_ms / 1000)
+            await db.commit()
+            if loan is None:
+                unavailable += 1
+                continue
+            timings.append(time.perf_counter() - started)
+            # Put the copy back (not timed) so the title never runs dry.
+            if checkout is _counter:
+                await loans_repo.mark_returned(db, loan.id)
+            else:
+                await loans_repo.mark_returned_copy(db, loan.id)
+            await db.commit()
+    return unavailable
+
+
+async def _run(
+    sessions: async_sessionmaker[AsyncSession], checkout: Checkout, args: argparse.Namespace
+) -> Dict[str, float]:
+    book_id = await _seed(sessions, args.copies)
+    timings: List[float] = []
+    try:
+        started = time.perf_counter()
+        unavailable = await asyncio.gather(
+            *(
+                _worker(sessions, checkout, book_id, w, args, timings)
+                for w in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        await _cleanup(sessions, book_id)
+    timings.sort()
+    return {
+        "per_s": len(timings) / elapsed,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "unavailable": sum(unavailable),
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    # One connection per worker, so the pool is never what they queue on.
+    engine = create_async_engine(
+        settings.DATABASE_URL, pool_size=args.concurrency, max_overflow=0
+    )
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    print(
+        f"{args.concurrency} workers x {args.checkouts} checkouts of one title with "
+        f"{args.copies} copies, {args.hold_ms} ms held before commit"
+    )
+    for label in args.paths:
+        r = await _run(sessions, PATHS[label], args)
+        print(
+            f"  {label:<14} {r['per_s']:8.1f} checkouts/s  p50 {r['p50_ms']:7.2f} ms  "
+            f"p95 {r['p95_ms']:7.2f} ms  unavailable {r['unavailable']:.0f}"
+        )
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--checkouts", type=int, default=50, help="per worker")
+    parser.add_argument("--copies", type=int, default=64)
+    parser.add_argument("--hold-ms", type=float, default=2.0)
+    parser.add_argument("--paths", nargs="*", choices=list(PATHS), default=list(PATHS))
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,197 @@
+"""
+Concurrency benchmark: one worker's event loop under concurrent reads, on the
+async DB layer against the blocking one it replaced.
+
+The app runs in-process (httpx.ASGITransport, one event loop, like a single
+uvicorn worker). --concurrency clients repeat GET /v1/books, /v1/books/{id},
+/v1/books?query=... and /v1/loans for --duration seconds, in two modes:
+
+  async     the app as it is: get_db yields an AsyncSession, so a request
+            waiting on Postgres lets the others run.
+  blocking  get_db hands the same repos a sync Session (app.core.db.engine)
+            behind awaitable methods, as the routes were before: each query
+            holds the loop until Postgres answers.
+
+With --analytics, one more task keeps running analytics_repo.compute_metrics
+on the same kind of session, the slow query that used to stall every other
+request. Reports requests/s and p50 / p95 / p99 latency per mode. Only reads,
+so run it against a database loaded with bench/generate_data.py:
+
+    python scripts/bench_event_loop.py [--concurrency 64] [--duration 20]
+        [--analytics] [--modes async blocking]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.auth import require_auth
+from app.core.authorization import Roles
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, SessionLocal, async_engine, engine, get_db
+from app.domain.models import Book
+from app.main import app
+from app.repos import analytics_repo
+
+_CLAIMS = {"sub": "user_bench_admin", settings.ADMIN_ROLE_CLAIM_KEY: Roles.ADMIN}
+_QUERIES = ("river", "garden empire", "shadow", "winter", "crown")
+
+
+class _BlockingSession:
+    """The AsyncSession methods the read paths await, run on a sync Session."""
+
+    def __init__(self, db: Session) -> None:
+        self._db = db
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return self._db.execute(*args, **kwargs)
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return self._db.scalar(*args, **kwargs)
+
+    async def scalars(self, *args: Any, **kwargs: Any) -> Any:
+        return self._db.scalars(*args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return self._db.get(*args, **kwargs)
+
+    async def commit(self) -> None:
+        self._db.commit()
+
+    async def rollback(self) -> None:
+        self._db.rollback()
+
+
+@asynccontextmanager
+async def _blocking_session() -> AsyncIterator[_BlockingSession]:
+    with SessionLocal() as db:
+        yield _BlockingSession(db)
+
+
+async def _blocking_get_db() -> AsyncIterator[_BlockingSession]:
+    async with _blocking_session() as db:
+        yield db
+
+
+SESSIONS: Dict[str, Callable[[], Any]] = {
+    "async": AsyncSessionLocal,
+    "blocking": _blocking_session,
+}
+
+
+async def _sample_book_ids(n: int) -> List[str]:
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(select(Book.id).limit(n))
+        return [str(book_id) for book_id in rows]
+
+
+def _requests(book_ids: List[str]) -> List[Callable[[httpx.AsyncClient, random.Random], Any]]:
+    return [
+        lambda c, rng: c.get("/v1/books", params={"limit": 20}),
+        lambda c, rng: c.get(f"/v1/books/{rng.choice(book_ids)}"),
+        lambda c, rng: c.get("/v1/books", params={"query": rng.choice(_QUERIES), "limit": 20}),
+        lambda c, rng: c.get("/v1/loans", params={"limit": 20}),
+    ]
+
+
+async def _client(
+    client: httpx.AsyncClient,
+    calls: List[Callable[[httpx.AsyncClient, random.Random], Any]],
+    seed: int,
+    deadline: float,
+    timings: List[float],
+) -> int:
+    rng = random.Random(seed)
+    errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        resp = await rng.choice(calls)(client, rng)
+        timings.append(time.perf_counter() - started)
+        if resp.status_code != 200:
+            errors += 1
+    return errors
+
+
+async def _analytics(sessions: Callable[[], Any], deadline: float) -> int:
+    runs = 0
+    while time.perf_counter() < deadline:
+        async with sessions() as db:
+            await analytics_repo.compute_metrics(db, 30)
+            await db.rollback()
+        runs += 1
+        await asyncio.sleep(0)  # let the loop run between passes in either mode
+    return runs
+
+
+async def _run(mode: str, book_ids: List[str], args: argparse.Namespace) -> Dict[str, float]:
+    app.dependency_overrides[require_auth] = lambda: _CLAIMS
+    if mode == "blocking":
+        app.dependency_overrides[get_db] = _blocking_get_db
+    transport = httpx.ASGITransport(app=app)
+    timings: List[float] = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            calls = _requests(book_ids)
+            deadline = time.perf_counter() + args.duration
+            started = time.perf_counter()
+            background = [_analytics(SESSIONS[mode], deadline)] if args.analytics else []
+            results = await asyncio.gather(
+                *(_client(client, calls, i, deadline, timings) for i in range(args.concurrency)),
+                *background,
+            )
+            elapsed = time.perf_counter() - started
+    finally:
+        app.dependency_overrides.clear()
+    timings.sort()
+    return {
+        "rps": len(timings) / elapsed,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000,
+        "errors": sum(results[: args.concurrency]),
+        "analytics": results[args.concurrency] if args.analytics else 0,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    book_ids = await _sample_book_ids(1000)
+    if not book_ids:
+        print("No books found: load data with bench/generate_data.py first.", file=sys.stderr)
+        return 2
+    print(
+        f"{args.concurrency} clients for {args.duration:.0f} s on one event loop"
+        + (", compute_metrics running alongside" if args.analytics else "")
+    )
+    for mode in args.modes:
+        r = await _run(mode, book_ids, args)
+        line = (
+            f"  {mode:<9} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:8.2f} ms  "
+            f"p95 {r['p95_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  errors {r['errors']:.0f}"
+        )
+        if args.analytics:
+            line += f"  metrics passes {r['analytics']:.0f}"
+        print(line)
+    await async_engine.dispose()
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per mode")
+    parser.add_argument("--analytics", action="store_true")
+    parser.add_argument("--modes", nargs="*", choices=list(SESSIONS), default=list(SESSIONS))
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,93 @@
+"""
+Throughput / memory benchmark for the streaming exports.
+
+Drains export_service.export_books or export_loans in-process, the same byte
+stream GET /v1/books/export and /v1/loans/export send. It reports rows/s,
+MB/s and the process's peak RSS. With --paged it instead walks the same table
+50 rows at a time through list_paginated + model_validate + JSON encoding, the
+only way to pull the data before the export endpoints existed.
+
+Peak RSS is a per-process high-water mark, so run one mode per invocation
+against a seeded database:
+
+    python scripts/bench_export.py books [--format ndjson|csv]
+    python scripts/bench_export.py loans --paged
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.db import AsyncSessionLocal, async_engine
+from app.repos import books_repo, loans_repo
+from app.services import export_service
+from app.v1.schemas.books import BookListOut, BookOut
+from app.v1.schemas.loans import LoanListOut, LoanOut
+
+
+def _rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+async def _export(table: str, fmt: str) -> tuple[int, int]:
+    stream = export_service.export_books if table == "books" else export_service.export_loans
+    lines = size = 0
+    async for chunk in stream(fmt):
+        lines += chunk.count(b"\n")
+        size += len(chunk)
+    return lines - (fmt == "csv"), size  # minus the CSV header
+
+
+async def _paged(table: str) -> tuple[int, int]:
+    rows = size = 0
+    cursor = None
+    async with AsyncSessionLocal() as db:
+        while True:
+            if table == "books":
+                page = await books_repo.list_paginated(db, limit=50, cursor_data=cursor)
+                out = BookListOut(items=[BookOut.model_validate(b) for b in page])
+                if page:
+                    cursor = {"ts": page[-1].created_at.isoformat(), "id": str(page[-1].id)}
+            else:
+                page = await loans_repo.list_paginated(db, limit=50, cursor_data=cursor)
+                out = LoanListOut(items=[LoanOut.model_validate(r) for r in page])
+                if page:
+                    cursor = {"ts": page[-1].borrowed_at.isoformat(), "id": str(page[-1].id)}
+            size += len(out.model_dump_json(by_alias=True))
+            rows += len(page)
+            db.expunge_all()
+            if len(page) < 50:
+                return rows, size
+
+
+async def main(args: argparse.Namespace) -> int:
+    baseline = _rss_mib()
+    started = time.perf_counter()
+    if args.paged:
+        rows, size = await _paged(args.table)
+        label = f"{args.table} paged (50/page, JSON)"
+    else:
+        rows, size = await _export(args.table, args.format)
+        label = f"{args.table} export ({args.format})"
+    elapsed = time.perf_counter() - started
+    await async_engine.dispose()
+
+    print(f"{label}: {rows} rows, {size / 1e6:.1f} MB in {elapsed:.2f} s")
+    print(f"  {rows / elapsed:,.0f} rows/s, {size / 1e6 / elapsed:.1f} MB/s")
+    print(f"  peak RSS {_rss_mib():.1f} MiB (baseline {baseline:.1f} MiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("table", choices=["books", "loans"])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument(
+        "--paged", action="store_true", help="page through list_paginated instead"
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,144 @@
+"""
+Memory / latency benchmark for one page of GET /v1/loans at the repo layer:
+loans_repo.list_paginated (explicit LoanOut columns, plain rows) against the
+previous read path (select(Loan) + joinedload(Loan.book), ORM objects).
+
+Inside a transaction that is rolled back at the end, it inserts --books books
+with --description-kb KiB descriptions and --loans loans spread over them,
+then pages through the newest loans --pages times per path. For each page the
+script converts the rows to LoanOut, as the route does. It reports the median
+and p95 latency and the peak Python allocation for a page (tracemalloc).
+
+    python scripts/bench_loan_listing.py [--books 2000] [--loans 20000]
+        [--description-kb 16] [--page-size 50] [--pages 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Ensure the apps/api root (parent of scripts/) is on the path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.core.db import AsyncSessionLocal, async_engine
+from app.domain.models import Book, Loan
+from app.repos import loans_repo
+from app.v1.schemas.loans import LoanOut
+
+
+async def _orm_page(db: AsyncSession, limit: int) -> List[Any]:
+    """The pre-projection read path: full Book rows through the identity map."""
+    stmt = (
+        select(Loan)
+        .options(joinedload(Loan.book))
+        .order_by(Loan.borrowed_at.desc(), Loan.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def _seed(db: AsyncSession, books: int, loans: int, description_kb: int) -> None:
+    description = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20)[:1024]
+    description *= description_kb
+    book_ids = [uuid.uuid4() for _ in range(books)]
+    await db.execute(
+        insert(Book),
+        [
+            {
+                "id": book_id,
+                "title": f"Bench book {i}",
+                "author": f"Bench author {i % 97}",
+                "description": description,
+                "cover_image_url": f"https://covers.example.com/{i}.jpg",
+                "available_copies": 1,
+            }
+            for i, book_id in enumerate(book_ids)
+        ],
+    )
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        insert(Loan),
+        [
+            {
+                "book_id": book_ids[i % books],
+                "borrower_user_id": f"user_bench_{i % 500}",
+                "processed_by_admin_id": "user_bench_admin",
+                "status": "returned",
+                "borrowed_at": now - timedelta(minutes=i),
+                "returned_at": now,
+            }
+            for i in range(loans)
+        ],
+    )
+    await db.flush()
+
+
+async def _measure(
+    db: AsyncSession,
+    fetch: Callable[[], Awaitable[List[Any]]],
+    pages: int,
+) -> Dict[str, float]:
+    timings: List[float] = []
+    peaks: List[int] = []
+    for _ in range(pages):
+        db.expunge_all()  # a fresh identity map per page, as in a request
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = await fetch()
+        [LoanOut.model_validate(row) for row in rows]
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "peak_kib": statistics.median(peaks) / 1024,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        await _seed(db, args.books, args.loans, args.description_kb)
+        paths = {
+            "joinedload(Loan.book)": lambda: _orm_page(db, args.page_size),
+            "LoanOut columns": lambda: loans_repo.list_paginated(db, limit=args.page_size),
+        }
+        for fetch in paths.values():  # warm up connection and statement caches
+            await fetch()
+
+        print(
+            f"{args.loans} loans over {args.books} books, {args.description_kb} KiB "
+            f"descriptions, {args.page_size}-row pages x {args.pages}"
+        )
+        for label, fetch in paths.items():
+            r = await _measure(db, fetch, args.pages)
+            print(
+                f"  {label:<24} p50 {r['p50_ms']:7.2f} ms  p95 {r['p95_ms']:7.2f} ms  "
+                f"peak {r['peak_kib']:9.1f} KiB"
+            )
+        await db.rollback()
+
+    await async_engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--loans", type=int, default=20000)
+    parser.add_argument("--description-kb", type=int, default=16)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=200)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -6,10 +6,10 @@ import uuid
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import requests
-from sqlalchemy.orm import Session
 
 from app.core.db import SessionLocal
 from app.domain.models import Book
+from app.repos.books_repo import duplicate_candidates_stmt
 
 GOOGLE_BOOKS_URL = "https://www.googleapis.com/books/v1/volumes"
 
@@ -31,31 +31,32 @@ def fetch_books():
 def seed():
     items = fetch_books()
 
+    volumes = []
+    for item in items:
+        volume = item.get("volumeInfo", {})
+        if volume.get("title") and volume.get("authors"):
+            volumes.append(volume)
+
+    pairs = [(v["title"], ", ".join(v["authors"])) for v in volumes]
+
     with SessionLocal() as db:
-        for item in items:
-            volume = item.get("volumeInfo", {})
+        # Avoid duplicates by title + author: one trigram-indexed query for the
+        # whole batch instead of one lookup per item.
+        duplicates = {row.idx for row in db.execute(duplicate_candidates_stmt(pairs))} if pairs else set()
+        seen = set()
 
-            title = volume.get("title")
-            authors = volume.get("authors", [])
+        for idx, volume in enumerate(volumes):
+            title, author = pairs[idx]
             description = volume.get("description")
             published_date = volume.get("publishedDate")
             image_links = volume.get("imageLinks", {})
 
-            if not title or not authors:
-                continue
-
-            author = ", ".join(authors)
-
             cover_image_url = image_links.get("thumbnail")
 
-            # Avoid duplicates by title + author
-            existing = db.query(Book).filter(
-                Book.title == title,
-                Book.author == author
-            ).first()
-
-            if existing:
+            key = (title.lower(), author.lower())
+            if idx in duplicates or key in seen:
                 continue
+            seen.add(key)
 
             book = Book(
                 id=uuid.uuid4(),
@@ -0,0 +1,136 @@
+"""
+Shared fixtures. Tests run offline: HTTP dependencies (JWKS, Clerk, OpenAI)
+are local stand-ins served from a thread. Tests that need PostgreSQL use the
+`db` fixture and are skipped unless TEST_DATABASE_URL points at a database
+migrated to head (alembic upgrade head).
+
+Async tests use the anyio pytest plugin (installed with FastAPI's anyio).
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+ISSUER = "https://clerk.test.invalid"
+KID = "test-key-1"
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+# ── Local HTTP stand-ins ──────────────────────────────────────────────────────
+
+
+class StandIn:
+    """
+    A local HTTP server whose responses come from `handler(method, path, headers,
+    body) -> (status, headers, body)`. Every request is recorded in `requests`.
+    """
+
+    def __init__(self, handler: Callable[..., Tuple[int, Dict[str, str], bytes]]) -> None:
+        self.handler = handler
+        self.requests: List[Dict[str, Any]] = []
+        stand_in = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stand_in.requests.append(
+                    {"method": self.command, "path": self.path, "headers": dict(self.headers), "body": body}
+                )
+                status, headers, payload = stand_in.handler(self.command, self.path, self.headers, body)
+                self.send_response(status)
+                for name, value in {"Content-Type": "application/json", **headers}.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _serve  # noqa: N815 — http.server naming
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def json_response(payload: Any, status: int = 200, **headers: str) -> Tuple[int, Dict[str, str], bytes]:
+    return status, headers, json.dumps(payload).encode()
+
+
+# ── Clerk JWTs ────────────────────────────────────────────────────────────────
+
+
+@pytest.fixture(scope="session")
+def signing_key() -> rsa.RSAPrivateKey:
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="session")
+def jwks_document(signing_key: rsa.RSAPrivateKey) -> Dict[str, Any]:
+    public = RSAAlgorithm.to_jwk(signing_key.public_key(), as_dict=True)
+    return {"keys": [{**public, "kid": KID, "use": "sig", "alg": "RS256"}]}
+
+
+@pytest.fixture(scope="session")
+def mint(signing_key: rsa.RSAPrivateKey) -> Callable[..., str]:
+    def mint(sub: str, role: Optional[str] = None, ttl: int = 3600) -> str:
+        now = int(time.time())
+        claims: Dict[str, Any] = {"sub": sub, "iss": ISSUER, "iat": now, "exp": now + ttl}
+        if role is not None:
+            claims["role"] = role
+        return jwt.encode(claims, signing_key, algorithm="RS256", headers={"kid": KID})
+
+    return mint
+
+
+# ── PostgreSQL ────────────────────────────────────────────────────────────────
+
+
+@pytest.fixture
+def database_url() -> str:
+    """URL (postgresql+psycopg://) of a database migrated to head, or skip."""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return url
+
+
+@pytest.fixture
+async def db(database_url: str):
+    """An AsyncSession inside a transaction that is rolled back afterwards."""
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    engine = create_async_engine(database_url)
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        session = AsyncSession(bind=conn, expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await trans.rollback()
+    await engine.dispose()
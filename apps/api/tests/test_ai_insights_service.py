@@ -0,0 +1,203 @@
+"""ai_insights_service: generation against a local OpenAI stand-in, and the circuit breaker."""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import ai_insights_service
+from app.services.ai_insights_service import _UNAVAILABLE, _CircuitBreaker
+from tests.conftest import StandIn, json_response
+
+METRICS = {"windowDays": 30, "totalLoans": 12, "trendingBooks": [{"title": "Dune", "borrowCount": 5}]}
+INSIGHTS = {
+    "summary": " Loans are steady. ",
+    "insights": ["Dune leads with 5 loans.", " "],
+    "recommendedActions": ["Order more copies of Dune."],
+}
+
+
+def _completion(content: Dict[str, Any]) -> Any:
+    return json_response({"choices": [{"message": {"content": json.dumps(content)}}]})
+
+
+def _rate_limited(retry_after: str = "0") -> Any:
+    return json_response({"error": {"message": "Rate limit reached"}}, 429, **{"Retry-After": retry_after})
+
+
+@pytest.fixture
+async def openai(monkeypatch: pytest.MonkeyPatch):
+    """
+    Point the service at a stand-in that answers with the queued responses
+    (one per request; the last one repeats), with fresh cache, breaker and client.
+    """
+    replies: List[Callable[[], Any]] = []
+
+    def handler(*_: Any) -> Any:
+        return (replies.pop(0) if len(replies) > 1 else replies[0])()
+
+    with StandIn(handler) as server:
+        server.replies = replies
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+        monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"{server.url}/v1")
+        monkeypatch.setattr(ai_insights_service, "_CACHE", OrderedDict())
+        monkeypatch.setattr(ai_insights_service, "_JOBS", {})
+        monkeypatch.setattr(
+            ai_insights_service, "_STATS", dict.fromkeys(ai_insights_service._STATS, 0)
+        )
+        monkeypatch.setattr(
+            ai_insights_service,
+            "_breaker",
+            _CircuitBreaker(failure_ratio=0.5, min_calls=5, window=60.0, open_seconds=30.0),
+        )
+        client = httpx.AsyncClient(timeout=0.5)
+        monkeypatch.setattr(ai_insights_service, "_client", client)
+        yield server
+        await client.aclose()
+
+
+@pytest.mark.anyio
+async def test_result_is_normalised_and_cached(openai):
+    openai.replies.append(lambda: _completion(INSIGHTS))
+
+    first = await ai_insights_service.generate_insights(30, METRICS)
+    second = await ai_insights_service.generate_insights(30, METRICS)
+
+    assert first == second == {
+        "summary": "Loans are steady.",
+        "insights": ["Dune leads with 5 loans."],
+        "recommendedActions": ["Order more copies of Dune."],
+    }
+    assert len(openai.requests) == 1
+    assert ai_insights_service.cache_stats()["cacheHits"] == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_callers_share_one_upstream_call(openai):
+    openai.replies.append(lambda: _completion(INSIGHTS))
+
+    results = await asyncio.gather(
+        *(ai_insights_service.generate_insights(30, METRICS) for _ in range(20))
+    )
+
+    assert len({json.dumps(r, sort_keys=True) for r in results}) == 1
+    assert len(openai.requests) == 1
+
+
+@pytest.mark.anyio
+async def test_429_is_retried_after_retry_after(openai):
+    openai.replies.extend([_rate_limited, _rate_limited, lambda: _completion(INSIGHTS)])
+
+    result = await ai_insights_service.generate_insights(30, METRICS)
+
+    assert result["summary"] == "Loans are steady."
+    assert len(openai.requests) == 3
+
+
+@pytest.mark.anyio
+async def test_persistent_429_falls_back_and_caches_the_fallback(openai):
+    openai.replies.append(_rate_limited)
+
+    result = await ai_insights_service.generate_insights(30, METRICS)
+    assert result is _UNAVAILABLE
+    assert len(openai.requests) == 4  # max_attempts
+
+    assert await ai_insights_service.generate_insights(30, METRICS) is _UNAVAILABLE
+    assert ai_insights_service.insights_status(30, METRICS) == ("failed", _UNAVAILABLE)
+    assert len(openai.requests) == 4
+
+
+@pytest.mark.anyio
+async def test_timeout_falls_back_without_retrying(openai):
+    def slow() -> Any:
+        time.sleep(1.0)
+        return _completion(INSIGHTS)
+
+    openai.replies.append(slow)
+
+    result = await ai_insights_service.generate_insights(30, METRICS)
+    assert result is _UNAVAILABLE
+    assert len(openai.requests) == 1
+
+    assert ai_insights_service.insights_status(30, METRICS) == ("failed", _UNAVAILABLE)
+    assert len(openai.requests) == 1
+
+
+@pytest.mark.anyio
+async def test_open_breaker_falls_back_without_calling_or_caching(openai):
+    openai.replies.append(lambda: json_response({"error": "down"}, 500))
+    for window_days in range(5):  # distinct keys: five failed calls open the breaker
+        assert await ai_insights_service.generate_insights(window_days, METRICS) is _UNAVAILABLE
+    assert ai_insights_service.breaker_stats()["state"] == "open"
+
+    openai.replies[:] = [lambda: _completion(INSIGHTS)]
+    assert await ai_insights_service.generate_insights(30, METRICS) is _UNAVAILABLE
+
+    assert len(openai.requests) == 5
+    assert ai_insights_service._cache_get(
+        ai_insights_service._metrics_cache_key(30, METRICS)
+    ) is None
+
+
+def _breaker() -> _CircuitBreaker:
+    return _CircuitBreaker(failure_ratio=0.5, min_calls=2, window=60.0, open_seconds=0.0)
+
+
+def _open(breaker: _CircuitBreaker) -> None:
+    for _ in range(2):
+        breaker.record(breaker.allow(), False)
+    assert breaker.state == "open"
+
+
+def test_late_result_from_before_the_open_is_not_taken_as_the_probe():
+    breaker = _breaker()
+    slow_call = breaker.allow()
+    _open(breaker)
+
+    probe = breaker.allow()
+    assert breaker.state == "half_open"
+    breaker.record(slow_call, True)
+    assert breaker.state == "half_open"
+
+    breaker.record(probe, False)
+    assert breaker.state == "open"
+
+
+def test_probe_result_closes_the_breaker():
+    breaker = _breaker()
+    _open(breaker)
+
+    probe = breaker.allow()
+    breaker.record(probe, True)
+
+    assert breaker.state == "closed"
+    assert breaker.stats()["recentCalls"] == 0
+
+
+def test_replaced_probe_cannot_decide():
+    breaker = _breaker()
+    _open(breaker)
+    stuck_probe = breaker.allow()
+    probe = breaker.allow()  # open_seconds=0: the stuck probe is replaced at once
+
+    breaker.record(stuck_probe, True)
+    assert breaker.state == "half_open"
+    breaker.record(probe, True)
+    assert breaker.state == "closed"
+
+
+def test_results_from_before_a_close_do_not_count_afterwards():
+    breaker = _breaker()
+    slow_calls = [breaker.allow() for _ in range(2)]
+    _open(breaker)
+    breaker.record(breaker.allow(), True)
+
+    for ticket in slow_calls:
+        breaker.record(ticket, False)
+
+    assert breaker.state == "closed"
+    assert breaker.stats()["recentCalls"] == 0
@@ -0,0 +1,88 @@
+"""
+compute_metrics (single pass over loans, and from the loan_daily_book_stats
+rollup) against compute_metrics_per_query (needs TEST_DATABASE_URL).
+
+Totals must match exactly. Top-N lists must match on their ordering keys;
+books that tie on the key may legitimately come back in a different order,
+so the lists are compared key by key rather than by book id.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+import pytest
+
+from app.domain.models import Book, Loan
+from app.repos import analytics_repo
+from app.services import daily_stats_service
+
+pytestmark = pytest.mark.anyio
+
+TOTALS = ("totalBooks", "totalLoans", "activeLoans", "returnedLoans", "totalAvailableCopies")
+LIST_KEYS = {
+    "trendingBooks": ("borrowCount",),
+    "lowStockAlerts": ("availableCopies", "borrowCount"),
+    "dormantBooks": ("lastBorrowedAt",),
+}
+WINDOW_DAYS = 7
+
+
+def _keys(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **{k: metrics[k] for k in TOTALS},
+        **{
+            name: [tuple(item[k] for k in keys) for item in metrics[name]]
+            for name, keys in LIST_KEYS.items()
+        },
+    }
+
+
+@pytest.fixture
+async def history(db):
+    """Books that tie on borrow counts, a never-borrowed and a dormant one, and
+    loans either side of the window's cutoff (including earlier on the cutoff day)."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=WINDOW_DAYS)
+    books = [
+        Book(title=f"Analytics {n}", author="Tester", available_copies=copies)
+        for n, copies in enumerate([0, 1, 1, 2, 2, 3, 5])
+    ]
+    db.add_all(books)
+    await db.flush()
+
+    def loan(book: Book, borrowed_at: datetime, returned: bool) -> Loan:
+        return Loan(
+            book_id=book.id,
+            borrower_name="Reader",
+            processed_by_admin_id="user_test",
+            status="returned" if returned else "borrowed",
+            borrowed_at=borrowed_at,
+            returned_at=borrowed_at + timedelta(hours=1) if returned else None,
+        )
+
+    loans = []
+    # Books 0-3 tie on three loans in the window; book 4 has two.
+    for book in books[:4]:
+        loans += [loan(book, now - timedelta(days=d, hours=2), d % 2 == 0) for d in (1, 3, 5)]
+    loans += [loan(books[4], now - timedelta(days=d), True) for d in (2, 4)]
+    # Just inside and just outside the cutoff, on the cutoff day itself.
+    loans.append(loan(books[4], cutoff + timedelta(minutes=5), True))
+    loans.append(loan(books[5], cutoff - timedelta(minutes=5), True))
+    # Before the window only: book 5 is dormant; book 6 is never borrowed.
+    loans += [loan(books[5], now - timedelta(days=d), True) for d in (100, 200)]
+    db.add_all(loans)
+    await db.flush()
+
+
+@pytest.mark.parametrize("use_rollup", [False, True], ids=["loans", "rollup"])
+async def test_compute_metrics_matches_per_query(db, history, use_rollup):
+    if use_rollup:
+        while await analytics_repo.advance_daily_stats(
+            db, daily_stats_service.complete_before(), 30
+        ):
+            pass
+
+    single = await analytics_repo.compute_metrics(db, WINDOW_DAYS, use_rollup=use_rollup)
+    per_query = await analytics_repo.compute_metrics_per_query(db, WINDOW_DAYS)
+
+    assert _keys(single) == _keys(per_query)
+    assert set(single) == set(per_query)
@@ -0,0 +1,80 @@
+"""analytics_service metrics cache, with compute_metrics replaced by a stub."""
+import asyncio
+import gc
+import logging
+from typing import Any, Dict
+
+import pytest
+
+from app.repos import analytics_repo
+from app.services import analytics_service
+
+pytestmark = pytest.mark.anyio
+
+
+class _NoSession:
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(self, *exc: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def cache(monkeypatch: pytest.MonkeyPatch):
+    """A fresh, empty cache whose computations return {"run": n}, n = 1, 2, ..."""
+    runs = {"n": 0}
+
+    async def compute_metrics(db: Any, window_days: int) -> Dict[str, Any]:
+        runs["n"] += 1
+        return {"run": runs["n"]}
+
+    monkeypatch.setattr(analytics_service, "AsyncSessionLocal", _NoSession)
+    monkeypatch.setattr(analytics_service, "_entries", type(analytics_service._entries)())
+    monkeypatch.setattr(analytics_service, "_inflight", {})
+    monkeypatch.setattr(analytics_service, "_stats", dict.fromkeys(analytics_service._stats, 0))
+    monkeypatch.setattr(analytics_repo, "compute_metrics", compute_metrics)
+    return runs
+
+
+async def _settle() -> None:
+    while analytics_service._inflight:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)  # let done-callbacks run
+
+
+async def test_bumped_entry_is_served_once_more_while_it_refreshes(cache):
+    assert await analytics_service.get_metrics(30) == {"run": 1}
+
+    analytics_service.bump_version()
+    assert await analytics_service.get_metrics(30) == {"run": 1}
+    await _settle()
+
+    assert await analytics_service.get_metrics(30) == {"run": 2}
+    assert analytics_service.cache_stats()["staleHits"] == 1
+
+
+async def test_failed_refresh_is_logged_after_the_caller_disconnects(
+    cache, monkeypatch, caplog
+):
+    release = asyncio.Event()
+
+    async def failing(db: Any, window_days: int) -> Dict[str, Any]:
+        await release.wait()
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(analytics_repo, "compute_metrics", failing)
+
+    with caplog.at_level(logging.WARNING):
+        caller = asyncio.create_task(analytics_service.get_metrics(30))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        release.set()
+        await _settle()
+        gc.collect()
+
+    assert "analytics refresh failed: database went away" in caplog.text
+    assert "never retrieved" not in caplog.text
+    assert analytics_service.cache_stats()["failures"] == 1
@@ -0,0 +1,219 @@
+"""JWKS key store (single-flight fetches and refreshes) and the verified-token cache,
+against a local JWKS stand-in."""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+import jwt
+import pytest
+
+from app.core import auth
+from app.core.config import settings
+from app.lib.errors import ApiException
+from app.main import app
+from tests.conftest import ISSUER, KID, StandIn, json_response
+
+pytestmark = pytest.mark.anyio
+
+CONCURRENCY = 1000
+
+
+@pytest.fixture
+def jwks_server(jwks_document: Dict[str, Any]):
+    """Serves `server.document` (the test JWKS), or 503 while `server.down` is set."""
+
+    def serve(*_: Any) -> Any:
+        if server.down:
+            return json_response({"error": "unavailable"}, status=503)
+        return json_response(server.document)
+
+    with StandIn(serve) as server:
+        server.down = False
+        server.document = jwks_document
+        yield server
+
+
+@pytest.fixture
+async def key_store(monkeypatch: pytest.MonkeyPatch, jwks_server: StandIn):
+    monkeypatch.setattr(settings, "CLERK_JWKS_URL", f"{jwks_server.url}/.well-known/jwks.json")
+    monkeypatch.setattr(settings, "CLERK_ISSUER", ISSUER)
+    monkeypatch.setattr(settings, "CLERK_AUDIENCE", "")
+    store = auth._JwksKeyStore(
+        auth._JWKS_TTL, auth._JWKS_REFRESH_AHEAD, auth._JWKS_UNKNOWN_KID_COOLDOWN
+    )
+    monkeypatch.setattr(auth, "_jwks_store", store)
+    monkeypatch.setattr(
+        auth, "_token_cache", auth._VerifiedTokenCache(CONCURRENCY * 2, auth._TOKEN_CACHE_MAX_TTL)
+    )
+    yield store
+    await store.aclose()
+
+
+@pytest.fixture(scope="module")
+def tokens(mint: Callable[..., str]) -> List[str]:
+    # Distinct tokens, so the verified-token cache cannot answer for the key store.
+    return [mint(f"user_{i}") for i in range(CONCURRENCY)]
+
+
+async def _whoami_all(tokens: List[str]) -> List[int]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        responses = await asyncio.gather(
+            *(
+                client.get("/v1/whoami", headers={"Authorization": f"Bearer {t}"})
+                for t in tokens
+            )
+        )
+    return [r.status_code for r in responses]
+
+
+def _token(signing_key: Any, kid: str) -> str:
+    claims = {"sub": "user_kid", "iss": ISSUER, "exp": int(time.time()) + 600}
+    return jwt.encode(claims, signing_key, algorithm="RS256", headers={"kid": kid})
+
+
+async def _settle(store: auth._JwksKeyStore) -> None:
+    while store._inflight is not None:
+        await asyncio.sleep(0)
+
+
+async def test_cold_start_fetches_jwks_once(key_store, jwks_server, tokens):
+    statuses = await _whoami_all(tokens)
+
+    assert statuses == [200] * CONCURRENCY
+    assert len(jwks_server.requests) == 1
+    assert key_store.fetches == 1
+
+
+async def test_refresh_ahead_is_one_background_fetch(key_store, jwks_server, tokens):
+    await _whoami_all(tokens[:1])
+    key_store._fetched_at -= key_store.ttl - key_store.refresh_ahead + 1
+    auth._token_cache._entries.clear()
+
+    statuses = await _whoami_all(tokens)
+    await _settle(key_store)
+
+    assert statuses == [200] * CONCURRENCY
+    assert len(jwks_server.requests) == 2
+
+
+async def test_expired_keys_block_on_one_shared_fetch(key_store, jwks_server, tokens):
+    await _whoami_all(tokens[:1])
+    key_store._fetched_at -= key_store.ttl + 1
+    auth._token_cache._entries.clear()
+
+    statuses = await _whoami_all(tokens)
+
+    assert statuses == [200] * CONCURRENCY
+    assert len(jwks_server.requests) == 2
+
+
+async def test_failed_refresh_serves_old_keys_and_retries_in_background(
+    key_store, jwks_server, tokens
+):
+    await _whoami_all(tokens[:1])
+    key_store._fetched_at -= key_store.ttl + 1
+    auth._token_cache._entries.clear()
+    jwks_server.down = True
+
+    # Expired: the first callers wait for the one failed fetch, then use the old keys.
+    assert await _whoami_all(tokens[:100]) == [200] * 100
+    assert len(jwks_server.requests) == 2
+
+    # Within the backoff nothing is fetched, and nothing waits.
+    assert await _whoami_all(tokens[100:200]) == [200] * 100
+    assert len(jwks_server.requests) == 2
+
+    # Past it, one background retry; callers do not wait for it.
+    key_store._fetched_at -= key_store.retry_backoff + 1
+    jwks_server.down = False
+    assert await _whoami_all(tokens[200:300]) == [200] * 100
+    await _settle(key_store)
+    assert len(jwks_server.requests) == 3
+    assert time.monotonic() - key_store._fetched_at < 1
+
+
+async def test_unknown_kid_forces_at_most_one_refresh(key_store, jwks_server, signing_key):
+    await auth.verify_token(_token(signing_key, KID))
+    rotated = _token(signing_key, "rotated-away")
+
+    statuses = await _whoami_all([rotated] * CONCURRENCY)
+
+    assert statuses == [401] * CONCURRENCY
+    assert len(jwks_server.requests) == 2
+
+
+async def test_failed_background_refresh_is_logged(key_store, tokens, monkeypatch, caplog):
+    await _whoami_all(tokens[:1])
+    key_store._fetched_at -= key_store.ttl - key_store.refresh_ahead + 1
+    auth._token_cache._entries.clear()
+    monkeypatch.setattr(settings, "CLERK_JWKS_URL", "")
+
+    with caplog.at_level(logging.WARNING, logger="app"):
+        statuses = await _whoami_all(tokens[:10])
+        await _settle(key_store)
+        await asyncio.sleep(0)  # let the done-callback run
+
+    assert statuses == [200] * 10
+    assert "JWKS refresh failed: CLERK_JWKS_URL is not configured." in caplog.text
+
+
+# ── Verified-token cache ──────────────────────────────────────────────────────
+
+
+async def test_token_cache_counts_hits_and_misses(key_store, mint):
+    token = mint("user_cached")
+
+    first = await auth.verify_token(token)
+    second = await auth.verify_token(token)
+
+    assert second is first
+    assert auth.token_cache_stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+@pytest.mark.parametrize(
+    "ttl, cached_for",
+    [(60, 60), (3600, auth._TOKEN_CACHE_MAX_TTL)],
+    ids=["until-exp", "capped"],
+)
+async def test_token_cache_entry_expires(key_store, mint, monkeypatch, ttl, cached_for):
+    token = mint("user_expiring", ttl=ttl)
+    await auth.verify_token(token)
+    digest = auth._token_cache.digest(token)
+    expires_at = auth._token_cache._entries[digest][0]
+    assert expires_at == pytest.approx(time.time() + cached_for, abs=2)
+
+    monkeypatch.setattr(time, "time", lambda: expires_at - 0.001)
+    assert auth._token_cache.get(digest) is not None
+    monkeypatch.setattr(time, "time", lambda: expires_at)
+    assert auth._token_cache.get(digest) is None
+    assert digest not in auth._token_cache._entries
+
+
+async def test_token_cache_drops_entries_of_rotated_keys(
+    key_store, jwks_server, jwks_document, mint
+):
+    token = mint("user_rotated")
+    await auth.verify_token(token)
+    jwks_server.document = {"keys": [{**jwks_document["keys"][0], "kid": "next-key"}]}
+    key_store._fetched_at -= key_store.ttl + 1
+
+    assert await key_store.get_key("next-key") is not None
+
+    assert auth.token_cache_stats()["size"] == 0
+    with pytest.raises(ApiException):
+        await auth.verify_token(token)
+
+
+def test_token_cache_is_a_bounded_lru():
+    cache = auth._VerifiedTokenCache(max_entries=2, max_ttl=60)
+    for name in ("a", "b"):
+        cache.set(name, KID, {"sub": name})
+    assert cache.get("a") is not None  # "b" is now the least recently used
+
+    cache.set("c", KID, {"sub": "c"})
+
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.get("b") is None
@@ -0,0 +1,105 @@
+"""loan_daily_book_stats: derived from loans behind a watermark (needs TEST_DATABASE_URL)."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.domain.models import Book, Loan, LoanDailyBookStat
+from app.repos import analytics_repo, loans_repo
+from app.services import daily_stats_service
+
+pytestmark = pytest.mark.anyio
+
+TOTALS = ("totalBooks", "totalLoans", "activeLoans", "returnedLoans", "totalAvailableCopies")
+
+
+async def _book(db) -> Book:
+    book = Book(title="Rollup Test", author="Tester", available_copies=3)
+    db.add(book)
+    await db.flush()
+    return book
+
+
+async def _totals(db, use_rollup: bool):
+    metrics = await analytics_repo.compute_metrics(db, 30, use_rollup=use_rollup)
+    return {k: metrics[k] for k in TOTALS}
+
+
+async def test_rollup_matches_loans_while_behind_and_after_catching_up(db):
+    book = await _book(db)
+    now = datetime.now(timezone.utc)
+    for days_ago in range(0, 45, 2):
+        borrowed_at = now - timedelta(days=days_ago, hours=3)
+        returned = days_ago % 4 == 0
+        db.add(
+            Loan(
+                book_id=book.id,
+                borrower_name=f"Reader {days_ago}",
+                processed_by_admin_id="user_test",
+                status="returned" if returned else "borrowed",
+                borrowed_at=borrowed_at,
+                returned_at=borrowed_at + timedelta(days=1) if returned else None,
+            )
+        )
+    await db.flush()
+    expected = await _totals(db, use_rollup=False)
+
+    assert await _totals(db, use_rollup=True) == expected
+
+    today = now.date()
+    while await analytics_repo.advance_daily_stats(db, today, max_days=7):
+        pass
+
+    assert await analytics_repo.daily_stats_watermark(db) == today
+    assert await analytics_repo.advance_daily_stats(db, today, max_days=7) is None
+    assert await _totals(db, use_rollup=True) == expected
+
+
+async def test_checkout_and_return_do_not_write_the_rollup(db):
+    book = await _book(db)
+    rollup_rows = select(func.count()).select_from(LoanDailyBookStat)
+    before = await db.scalar(rollup_rows)
+
+    loan = await loans_repo.checkout(
+        db,
+        book_id=book.id,
+        borrower_user_id=None,
+        borrower_name="Walk-in",
+        processed_by_admin_id="user_test",
+    )
+    assert loan is not None
+    assert await loans_repo.mark_returned(db, loan.id) is not None
+
+    assert await db.scalar(rollup_rows) == before
+
+
+async def test_loans_written_after_advancing_still_count(db):
+    book = await _book(db)
+    now = datetime.now(timezone.utc)
+    db.add(
+        Loan(
+            book_id=book.id,
+            borrower_name="Yesterday",
+            processed_by_admin_id="user_test",
+            status="borrowed",
+            borrowed_at=now - timedelta(days=1),
+        )
+    )
+    await db.flush()
+    while await analytics_repo.advance_daily_stats(db, daily_stats_service.complete_before(), 7):
+        pass
+    before = await _totals(db, use_rollup=True)
+
+    loan = await loans_repo.checkout(
+        db,
+        book_id=book.id,
+        borrower_user_id=None,
+        borrower_name="Walk-in",
+        processed_by_admin_id="user_test",
+    )
+    assert loan is not None
+
+    after = await _totals(db, use_rollup=True)
+    assert after == await _totals(db, use_rollup=False)
+    assert after["totalLoans"] == before["totalLoans"] + 1
+    assert after["activeLoans"] == before["activeLoans"] + 1
@@ -0,0 +1,161 @@
+"""Catalogue import: record parsing and validation, and the merge (needs TEST_DATABASE_URL)."""
+import uuid
+from typing import Any, AsyncIterator, List, Sequence
+
+import pytest
+from sqlalchemy import func, select
+
+from app.domain.models import Book
+from app.services import import_service
+
+pytestmark = pytest.mark.anyio
+
+_LIMITS = import_service._MAX_LENGTHS
+
+
+async def _chunks(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+async def _parse(text: str, fmt: str = "csv", chunk_size: int = 7) -> List[Any]:
+    """_records over `text` split into small chunks, so lines straddle them."""
+    return [r async for r in import_service._records(_chunks(text.encode(), chunk_size), fmt)]
+
+
+async def test_csv_quoted_field_may_span_lines():
+    records = await _parse(
+        'title,author,description\n'
+        'Dune,Frank Herbert,"Spice,\nsand and ""worms"""\n'
+        'Emma,Jane Austen,\n'
+    )
+
+    assert records == [
+        (
+            2,
+            {"title": "Dune", "author": "Frank Herbert", "description": 'Spice,\nsand and "worms"'},
+            None,
+        ),
+        (4, {"title": "Emma", "author": "Jane Austen"}, None),
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+async def test_leading_bom_is_dropped(fmt):
+    if fmt == "csv":
+        text = "title,author\nDune,Herbert\n"
+    else:
+        text = '{"title": "Dune", "author": "Herbert"}\n'
+
+    records = await _parse("\ufeff" + text, fmt)
+
+    assert records[0][1] == {"title": "Dune", "author": "Herbert"}
+
+
+async def test_csv_field_count_mismatch_is_rejected():
+    records = await _parse("title,author\nDune\nEmma,Austen,extra\nKim,Kipling\n")
+
+    assert records == [
+        (2, None, "expected 2 fields, got 1"),
+        (3, None, "expected 2 fields, got 3"),
+        (4, {"title": "Kim", "author": "Kipling"}, None),
+    ]
+
+
+async def test_stray_quote_costs_one_bounded_record(monkeypatch):
+    monkeypatch.setattr(import_service, "MAX_RECORD_LINES", 3)
+    records = await _parse('title,author\n12" Singles,DJ\nA,B\nC,D\nE,F\nG,H\n')
+
+    assert records[0][0] == 2
+    assert records[0][1] is None and "unterminated quoted field" in records[0][2]
+    # Parsing resumes after the rejected span instead of swallowing the rest.
+    assert records[1:] == [
+        (5, {"title": "E", "author": "F"}, None),
+        (6, {"title": "G", "author": "H"}, None),
+    ]
+
+
+async def test_stray_quote_record_is_capped_by_size(monkeypatch):
+    monkeypatch.setattr(import_service, "MAX_RECORD_CHARS", 50)
+    body = "".join(f"Title {n},Author {n}\n" for n in range(20))
+    records = await _parse('title,author\n"Open,Quote\n' + body)
+
+    # Lines 2-5 reach 50 characters; parsing resumes at line 6 ("Title 3").
+    assert records[0][:2] == (2, None)
+    assert records[1] == (6, {"title": "Title 3", "author": "Author 3"}, None)
+    assert len(records) == 1 + 17
+
+
+async def test_unterminated_quote_at_end_of_file():
+    records = await _parse('title,author\n"Dune,Herbert\n')
+
+    assert records == [(2, None, "unterminated quoted field")]
+
+
+@pytest.mark.parametrize(
+    "record, problem",
+    [
+        ({"title": "T" * (_LIMITS["title"] + 1), "author": "A"}, "title: at most"),
+        ({"title": "T", "author": "A" * (_LIMITS["author"] + 1)}, "author: at most"),
+        ({"title": "T", "author": "A", "isbn": "9" * (_LIMITS["isbn"] + 1)}, "isbn: at most"),
+        ({"title": "T", "author": "A", "publishedYear": 2**31}, "publishedYear: out of range"),
+        ({"title": "T", "author": "A", "availableCopies": 2**31}, "availableCopies: out of range"),
+        ({"title": "T", "author": "A", "publishedYear": "soon"}, "publishedYear"),
+        ({"title": " ", "author": "A"}, "title"),
+    ],
+    ids=["title", "author", "isbn", "year", "copies", "year-type", "blank-title"],
+)
+def test_validate_rejects(record, problem):
+    book, error = import_service._validate(record)
+
+    assert book is None
+    assert problem in error
+
+
+def test_validate_accepts_column_limits():
+    book, error = import_service._validate(
+        {
+            "title": "T" * _LIMITS["title"],
+            "author": "A" * _LIMITS["author"],
+            "publishedYear": "-2147483648",
+            "availableCopies": 2**31 - 1,
+        }
+    )
+
+    assert error is None
+    assert book.availableCopies == 2**31 - 1
+
+
+# ── merge (PostgreSQL) ────────────────────────────────────────────────────────
+
+
+async def _import(db, lines: Sequence[str]) -> Any:
+    body = ("\n".join(["title,author,isbn", *lines]) + "\n").encode()
+    return await import_service.import_books(db, _chunks(body, 64), "csv")
+
+
+async def test_merge_skips_existing_books_and_earlier_lines(db):
+    tag = uuid.uuid4().hex[:8]
+    isbn = f"978{int(tag, 16) % 10**10:010d}"
+    db.add(Book(title=f"Existing {tag}", author="Someone", available_copies=1))
+    await db.flush()
+
+    report = await _import(
+        db,
+        [
+            f"existing {tag},SOMEONE,",  # same title/author as a book, no ISBN
+            f"New {tag},Author,{isbn}",
+            f"Reprint {tag},Author,{isbn[:3]}-{isbn[3:]}",  # same ISBN, formatted
+            f"Other {tag},Author,",
+            f"OTHER {tag},author,",  # same as the line before
+            f"Existing {tag},Someone,979{isbn[3:]}",  # an edition with its own ISBN
+        ],
+    )
+
+    assert report["received"] == 6
+    assert (report["inserted"], report["duplicates"], report["invalid"]) == (3, 3, 0)
+    assert [r["line"] for r in report["rejects"]] == [2, 4, 6]
+    assert {r["code"] for r in report["rejects"]} == {"DUPLICATE_BOOK"}
+    titles = await db.scalars(select(Book.title).where(Book.title.like(f"% {tag}")))
+    assert sorted(titles) == [f"Existing {tag}", f"Existing {tag}", f"New {tag}", f"Other {tag}"]
+    assert await db.scalar(select(func.count()).select_from(Book).where(Book.isbn == isbn)) == 1
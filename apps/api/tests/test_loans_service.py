@@ -0,0 +1,91 @@
+"""loans_service decisions, with the repos replaced by in-memory fakes."""
+import uuid
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from app.core.config import settings
+from app.lib.errors import ApiException
+from app.repos import books_repo, loans_repo
+from app.services import loans_service
+from app.v1.schemas.loans import LoanCreate
+
+pytestmark = pytest.mark.anyio
+
+BOOK_ID = uuid.UUID(int=1)
+
+
+class FakeSession:
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+
+@pytest.fixture
+def sold_out_book_with_active_loan(monkeypatch: pytest.MonkeyPatch) -> None:
+    """BOOK_ID exists with no copies left; user_a already borrows it."""
+    book = SimpleNamespace(
+        id=BOOK_ID, available_copies=0, title="T", author="A", cover_image_url=None
+    )
+    active = {("user_a", BOOK_ID)}
+
+    async def no_loan(db: Any, **kwargs: Any) -> None:
+        return None
+
+    async def exists_by_id(db: Any, book_id: uuid.UUID) -> bool:
+        return book_id == BOOK_ID
+
+    async def find_active_pairs(db: Any, pairs: Any) -> set:
+        return active & set(pairs)
+
+    async def get_many_for_checkout(db: Any, ids: Any, lock: bool) -> dict:
+        return {BOOK_ID: book} if BOOK_ID in ids else {}
+
+    async def claim_free_copies(db: Any, wanted: Any) -> dict:
+        return {}
+
+    async def insert_many(db: Any, rows: Any) -> dict:
+        return {}
+
+    async def noop(db: Any, *args: Any) -> None:
+        pass
+
+    monkeypatch.setattr(settings, "CIRCULATION_MODEL", "counter")
+    monkeypatch.setattr(loans_repo, "checkout", no_loan)
+    monkeypatch.setattr(loans_repo, "find_active_pairs", find_active_pairs)
+    monkeypatch.setattr(loans_repo, "insert_many", insert_many)
+    monkeypatch.setattr(books_repo, "exists_by_id", exists_by_id)
+    monkeypatch.setattr(books_repo, "get_many_for_checkout", get_many_for_checkout)
+    monkeypatch.setattr(books_repo, "claim_free_copies", claim_free_copies)
+    monkeypatch.setattr(books_repo, "adjust_available_copies", noop)
+    monkeypatch.setattr(books_repo, "assign_copies", noop)
+
+
+@pytest.mark.parametrize(
+    "borrower, code",
+    [("user_a", "ALREADY_BORROWED"), ("user_b", "BOOK_UNAVAILABLE")],
+)
+async def test_single_and_batch_checkout_agree_on_error_precedence(
+    sold_out_book_with_active_loan, borrower, code
+):
+    item = LoanCreate(bookId=BOOK_ID, borrowerUserId=borrower)
+
+    with pytest.raises(ApiException) as single:
+        await loans_service.checkout_book(FakeSession(), "admin", item)
+    [batch] = await loans_service.checkout_batch(FakeSession(), "admin", [item])
+
+    assert single.value.code == code
+    assert batch["error"]["code"] == code
+
+
+async def test_checkout_of_missing_book_is_not_found(sold_out_book_with_active_loan):
+    item = LoanCreate(bookId=uuid.UUID(int=2), borrowerUserId="user_a")
+
+    with pytest.raises(ApiException) as single:
+        await loans_service.checkout_book(FakeSession(), "admin", item)
+    [batch] = await loans_service.checkout_batch(FakeSession(), "admin", [item])
+
+    assert single.value.code == batch["error"]["code"] == "NOT_FOUND"
@@ -0,0 +1,216 @@
+"""
+Plan-regression check for the list and search endpoints (needs TEST_DATABASE_URL).
+
+Every query shape that books_repo.list_paginated, books_repo.search_ranked,
+loans_repo.list_paginated and users_repo.search generate (each sort and
+filter, first page and cursor page) is captured as sent and EXPLAINed.
+Keyset-ordered searches are checked on their first page only: on a cursor
+page the keyset bound is itself indexable, and a bitmap read of the btree
+there is a legitimate plan.
+
+  - Unfiltered listings must read the keyset index that matches their order
+    (migrations 008 and 011), with no Seq Scan and no Sort.
+  - Text searches (`query`, `author`, the users search term) must find their
+    rows with a Bitmap Index Scan of the GIN index behind the predicate
+    (migrations 006, 007 and 011) and no Seq Scan. The matches are then
+    sorted, so a Sort is expected there.
+
+enable_seqscan is off for the transaction, so the check is meaningful on a
+small CI database: the planner still falls back to a Seq Scan or a Sort when
+no index fits, but does not prefer one just because the tables are tiny. For
+searches plain index scans are off too, so a keyset index read with the text
+predicate as a filter cannot stand in for the GIN lookup.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AbstractSet, Awaitable, Callable, Dict, List, Tuple
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repos import books_repo, loans_repo, users_repo
+
+pytestmark = pytest.mark.anyio
+
+FORBIDDEN_NODES = {"Seq Scan", "Sort", "Incremental Sort"}
+
+_ID = str(uuid.UUID(int=1))
+_TS = datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat()
+
+BOOK_SORTS = {
+    "createdAt:desc": ({"ts": _TS, "id": _ID}, "ix_books_created_at_id"),
+    "createdAt:asc": ({"ts": _TS, "id": _ID}, "ix_books_created_at_id"),
+    "title:asc": ({"title": "m", "id": _ID}, "ix_books_title_lower_id"),
+}
+
+# Filters → indexes that serve (borrowed_at DESC, id DESC) for them.
+LOAN_SHAPES: List[Tuple[Dict[str, Any], AbstractSet[str]]] = [
+    ({}, {"ix_loans_borrowed_at_id"}),
+    ({"borrower_user_id": "user_plan"}, {"ix_loans_borrower_borrowed_at_id"}),
+    ({"book_id": uuid.UUID(int=2)}, {"ix_loans_book_borrowed_at_id"}),
+    (
+        {"status": "borrowed"},
+        {"ix_loans_active_borrowed_at_id", "ix_loans_status_borrowed_at_id"},
+    ),
+    ({"status": "returned"}, {"ix_loans_status_borrowed_at_id"}),
+    (
+        {"borrower_user_id": "user_plan", "status": "borrowed"},
+        {"ix_loans_borrower_borrowed_at_id", "ix_loans_active_borrowed_at_id"},
+    ),
+    (
+        {"book_id": uuid.UUID(int=2), "status": "borrowed"},
+        {"ix_loans_book_borrowed_at_id", "ix_loans_active_borrowed_at_id"},
+    ),
+]
+
+
+def _walk(plan: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(node type, index name or "") for every node of a JSON plan."""
+    nodes = [(plan["Node Type"], plan.get("Index Name", ""))]
+    for child in plan.get("Plans", []):
+        nodes.extend(_walk(child))
+    return nodes
+
+
+async def _plans(
+    db: AsyncSession, call: Callable[[], Awaitable[Any]], *, bitmap_only: bool = False
+) -> List[List[Tuple[str, str]]]:
+    """EXPLAIN every statement `call` sends; one node list per statement."""
+    conn = await db.connection()
+    await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    await conn.exec_driver_sql(f"SET LOCAL enable_indexscan = {'off' if bitmap_only else 'on'}")
+
+    statements: List[Tuple[str, Dict[str, Any]]] = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, dict(parameters or {})))
+
+    engine = conn.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        await call()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    plans = []
+    for statement, params in statements:
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", params)
+        plans.append(_walk(result.scalar_one()[0]["Plan"]))
+    return plans
+
+
+def _assert_index_ordered(plans: List[List[Tuple[str, str]]], expected: AbstractSet[str]) -> None:
+    assert plans, "no statement was captured"
+    for nodes in plans:
+        assert not FORBIDDEN_NODES & {node for node, _ in nodes}, nodes
+        assert expected & {index for _, index in nodes}, nodes
+
+
+def _assert_gin_lookup(plans: List[List[Tuple[str, str]]], expected: AbstractSet[str]) -> None:
+    """Each plan reads every `expected` GIN index with a Bitmap Index Scan, and no Seq Scan."""
+    assert plans, "no statement was captured"
+    for nodes in plans:
+        assert "Seq Scan" not in {node for node, _ in nodes}, nodes
+        assert expected <= {index for node, index in nodes if node == "Bitmap Index Scan"}, nodes
+
+
+@pytest.mark.parametrize("paged", [False, True], ids=["first", "cursor"])
+@pytest.mark.parametrize("available_only", [False, True], ids=["all", "available"])
+@pytest.mark.parametrize("sort", list(BOOK_SORTS))
+async def test_book_listing_uses_keyset_index(db, sort, available_only, paged):
+    cursor, index = BOOK_SORTS[sort]
+    plans = await _plans(
+        db,
+        lambda: books_repo.list_paginated(
+            db,
+            sort=sort,
+            available_only=available_only,
+            limit=21,
+            cursor_data=cursor if paged else None,
+        ),
+    )
+    _assert_index_ordered(plans, {index})
+
+
+@pytest.mark.parametrize("paged", [False, True], ids=["first", "cursor"])
+@pytest.mark.parametrize(
+    "filters, indexes",
+    LOAN_SHAPES,
+    ids=["-".join(f) or "unfiltered" for f, _ in LOAN_SHAPES],
+)
+async def test_loan_listing_uses_keyset_index(db, filters, indexes, paged):
+    plans = await _plans(
+        db,
+        lambda: loans_repo.list_paginated(
+            db, limit=21, cursor_data={"ts": _TS, "id": _ID} if paged else None, **filters
+        ),
+    )
+    _assert_index_ordered(plans, indexes)
+
+
+# Text filters → GIN indexes that must serve them. `author` is a substring OR a
+# word-similarity match, both on the author trigram index.
+BOOK_SEARCHES: List[Tuple[Dict[str, Any], AbstractSet[str]]] = [
+    ({"query": "silent riv"}, {"ix_books_search_vector"}),
+    ({"author": "tolkien"}, {"ix_books_author_trgm"}),
+]
+
+
+@pytest.mark.parametrize("sort", list(BOOK_SORTS))
+@pytest.mark.parametrize(
+    "filters, indexes", BOOK_SEARCHES, ids=[next(iter(f)) for f, _ in BOOK_SEARCHES]
+)
+async def test_book_search_uses_gin_index(db, filters, indexes, sort):
+    plans = await _plans(
+        db,
+        lambda: books_repo.list_paginated(db, sort=sort, limit=21, **filters),
+        bitmap_only=True,
+    )
+    _assert_gin_lookup(plans, indexes)
+
+
+@pytest.mark.parametrize("paged", [False, True], ids=["first", "cursor"])
+@pytest.mark.parametrize(
+    "filters, indexes",
+    [*BOOK_SEARCHES, ({"query": "silent riv", "author": "tolkien"}, set())],
+    ids=[*(next(iter(f)) for f, _ in BOOK_SEARCHES), "query-author"],
+)
+async def test_relevance_search_uses_gin_index(db, filters, indexes, paged):
+    plans = await _plans(
+        db,
+        lambda: books_repo.search_ranked(
+            db, limit=21, cursor_data={"rank": 0.5, "id": _ID} if paged else None, **filters
+        ),
+        bitmap_only=True,
+    )
+    if indexes:
+        _assert_gin_lookup(plans, indexes)
+    else:
+        # Both predicates: either GIN index may drive the lookup, the other filters.
+        for nodes in plans:
+            assert "Seq Scan" not in {node for node, _ in nodes}, nodes
+            assert {"ix_books_search_vector", "ix_books_author_trgm"} & {
+                index for node, index in nodes if node == "Bitmap Index Scan"
+            }, nodes
+
+
+@pytest.mark.parametrize("paged", [False, True], ids=["first", "cursor"])
+async def test_user_listing_uses_keyset_index(db, paged):
+    plans = await _plans(
+        db,
+        lambda: users_repo.search(
+            db, limit=21, cursor_data={"name": "m", "id": "user_plan"} if paged else None
+        ),
+    )
+    _assert_index_ordered(plans, {"ix_users_display_name_lower_id"})
+
+
+async def test_user_search_uses_gin_indexes(db):
+    plans = await _plans(
+        db,
+        lambda: users_repo.search(db, query="smith", limit=21),
+        bitmap_only=True,
+    )
+    # Name OR email: a BitmapOr of both trigram indexes.
+    _assert_gin_lookup(plans, {"ix_users_display_name_trgm", "ix_users_email_trgm"})
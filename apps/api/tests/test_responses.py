@@ -0,0 +1,146 @@
+"""page_response (orjson) against what FastAPI sends for the same response_model."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.core.auth import require_auth
+from app.core.db import get_db
+from app.lib.pagination import encode_cursor
+from app.lib.responses import page_response
+from app.main import app
+from app.services import books_service, loans_service
+from app.v1.schemas.books import BookListOut, BookOut
+from app.v1.schemas.loans import LoanListOut, LoanOut
+
+pytestmark = pytest.mark.anyio
+
+UTC = datetime(2026, 1, 15, 12, 30, tzinfo=timezone.utc)
+CURSOR = encode_cursor({"ts": UTC.isoformat(), "id": str(uuid.UUID(int=42))})
+
+DATETIMES = {
+    "utc": UTC,
+    "utc-micros": UTC.replace(microsecond=7),
+    "utc-half-second": UTC.replace(microsecond=500000),
+    "offset": UTC.astimezone(timezone(timedelta(hours=5, minutes=30))),
+    "negative-offset": UTC.astimezone(timezone(timedelta(hours=-3))),
+    "naive": UTC.replace(tzinfo=None),
+}
+TEXTS = ["plain", 'quote " backslash \\ slash /', "naïve café 書 😀", "tab\tnewline\n\x00\x1f "]
+
+
+def _book(n: int, at: datetime, text: str, *, nulls: bool) -> Dict[str, Any]:
+    return {
+        "id": uuid.UUID(int=n),
+        "title": text,
+        "author": f"Author {n}",
+        "description": None if nulls else text,
+        "isbn": None if nulls else "9780000000001",
+        "published_year": None if nulls else 1999,
+        "available_copies": n,
+        "cover_image_url": None if nulls else "https://example.com/c.png",
+        "created_at": at,
+        "updated_at": at + timedelta(seconds=n),
+    }
+
+
+def _loan(n: int, at: datetime, text: str, *, nulls: bool) -> Dict[str, Any]:
+    return {
+        "id": uuid.UUID(int=n),
+        "book_id": uuid.UUID(int=1000 + n),
+        "borrower_user_id": None if nulls else f"user_{n}",
+        "borrower_name": text if nulls else None,
+        "borrower_display_name": None if nulls else text,
+        "processed_by_admin_id": "user_admin",
+        "status": "borrowed" if nulls else "returned",
+        "borrowed_at": at,
+        "returned_at": None if nulls else at + timedelta(days=n),
+        "book_title": text,
+        "book_author": f"Author {n}",
+        "book_cover_image_url": None,
+    }
+
+
+def _rows(make: Any, at: datetime) -> List[Dict[str, Any]]:
+    return [make(n, at, text, nulls=n % 2 == 0) for n, text in enumerate(TEXTS, 1)]
+
+
+async def _model_bytes(
+    path: str, list_model: Any, item_model: Any, rows: List[Any], cursor: Optional[str]
+) -> bytes:
+    """The body FastAPI sends when the route returns the response model."""
+    route = next(
+        r for r in app.routes
+        if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods
+    )
+    page = list_model(items=[item_model.model_validate(r) for r in rows], next_cursor=cursor)
+    content = await serialize_response(
+        field=route.response_field, response_content=page, is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+LISTS = {
+    "books": ("/v1/books", BookListOut, BookOut, _book),
+    "loans": ("/v1/loans", LoanListOut, LoanOut, _loan),
+}
+
+
+@pytest.mark.parametrize("at", DATETIMES.values(), ids=DATETIMES.keys())
+@pytest.mark.parametrize("endpoint", LISTS)
+async def test_page_response_bytes_match_the_response_model(endpoint, at):
+    path, list_model, item_model, make = LISTS[endpoint]
+    rows = _rows(make, at)
+
+    expected = await _model_bytes(path, list_model, item_model, rows, CURSOR)
+
+    assert page_response(item_model, rows, CURSOR).body == expected
+    # ORM objects are read by attribute rather than by key.
+    objects = [SimpleNamespace(**r) for r in rows]
+    assert page_response(item_model, objects, CURSOR).body == expected
+
+
+@pytest.mark.parametrize("endpoint", LISTS)
+async def test_empty_last_page_matches_the_response_model(endpoint):
+    path, list_model, item_model, _ = LISTS[endpoint]
+
+    expected = await _model_bytes(path, list_model, item_model, [], None)
+
+    assert page_response(item_model, [], None).body == expected
+
+
+@pytest.fixture
+async def api():
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[require_auth] = lambda: {"sub": "user_1", "role": "admin"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        yield client
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(require_auth, None)
+
+
+async def test_list_routes_send_the_response_model_bytes(api, monkeypatch):
+    books, loans = _rows(_book, DATETIMES["utc-micros"]), _rows(_loan, DATETIMES["offset"])
+
+    async def list_books(db: Any, **kwargs: Any) -> Any:
+        return books, CURSOR
+
+    async def list_loans(db: Any, **kwargs: Any) -> Any:
+        return loans, None
+
+    monkeypatch.setattr(books_service, "list_books", list_books)
+    monkeypatch.setattr(loans_service, "list_loans", list_loans)
+
+    books_resp = await api.get("/v1/books")
+    loans_resp = await api.get("/v1/loans")
+
+    assert books_resp.status_code == loans_resp.status_code == 200
+    assert books_resp.headers["content-type"] == "application/json"
+    assert books_resp.content == await _model_bytes("/v1/books", BookListOut, BookOut, books, CURSOR)
+    assert loans_resp.content == await _model_bytes("/v1/loans", LoanListOut, LoanOut, loans, None)
@@ -0,0 +1,326 @@
+"""Clerk directory sync against a local Clerk stand-in, and webhook signatures."""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.db import get_db
+from app.main import app
+from app.repos import users_repo
+from app.services import users_service
+from tests.conftest import StandIn, json_response
+
+pytestmark = pytest.mark.anyio
+
+WEBHOOK_SECRET = "whsec_" + base64.b64encode(b"test-webhook-secret").decode()
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _ms(at: datetime) -> int:
+    return int(at.timestamp() * 1000)
+
+
+def _clerk_user(n: int) -> Dict[str, Any]:
+    created = T0 + timedelta(hours=n)
+    return {
+        "id": f"user_{n}",
+        "first_name": "Reader",
+        "last_name": str(n),
+        "email_addresses": [],
+        "created_at": _ms(created),
+        "updated_at": _ms(created),
+    }
+
+
+class FakeSession:
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        pass
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+
+class Clerk:
+    """GET /users over `users`: offset paging by order_by, or lookup by user_id."""
+
+    def __init__(self, users: List[Dict[str, Any]]) -> None:
+        self.users = users
+        self.hidden_from_listing: set = set()
+        self.after_request = lambda: None
+        self.down = False
+
+    def __call__(self, method: str, path: str, *_: Any) -> Any:
+        query = parse_qs(urlsplit(path).query)
+        try:
+            if self.down:
+                return json_response({"errors": []}, status=503)
+            if "user_id" in query:
+                return json_response([u for u in self.users if u["id"] in query["user_id"]])
+            order = query["order_by"][0]
+            listed = sorted(
+                (u for u in self.users if u["id"] not in self.hidden_from_listing),
+                key=lambda u: u[order.lstrip("-")],
+                reverse=order.startswith("-"),
+            )
+            offset, limit = int(query["offset"][0]), int(query["limit"][0])
+            return json_response(listed[offset : offset + limit])
+        finally:
+            self.after_request()
+
+
+@pytest.fixture
+def mirror(monkeypatch: pytest.MonkeyPatch) -> Dict[str, Dict[str, Any]]:
+    """users_repo over an in-memory {id: row} mirror; the sync lock always free."""
+    rows: Dict[str, Dict[str, Any]] = {}
+
+    async def latest_clerk_update(db: Any) -> Optional[datetime]:
+        return max((r["clerk_updated_at"] for r in rows.values()), default=None)
+
+    async def upsert_many(db: Any, new: Sequence[Dict[str, Any]]) -> int:
+        for row in new:
+            old = rows.get(row["id"])
+            if old is None or old["clerk_updated_at"] <= row["clerk_updated_at"]:
+                rows[row["id"]] = dict(row)
+            else:
+                old["synced_at"] = max(old["synced_at"], row["synced_at"])
+        return len(new)
+
+    async def ids_not_synced_since(db: Any, since: datetime) -> List[str]:
+        return [user_id for user_id, r in rows.items() if r["synced_at"] < since]
+
+    async def delete_not_synced_since(db: Any, since: datetime, ids: Sequence[str]) -> int:
+        gone = [i for i in ids if i in rows and rows[i]["synced_at"] < since]
+        for user_id in gone:
+            del rows[user_id]
+        return len(gone)
+
+    @asynccontextmanager
+    async def sync_lock():
+        yield True
+
+    async def get_display_names(db: Any, ids: Sequence[str]) -> Dict[str, str]:
+        return {i: rows[i]["display_name"] for i in ids if i in rows}
+
+    monkeypatch.setattr(users_repo, "latest_clerk_update", latest_clerk_update)
+    monkeypatch.setattr(users_repo, "get_display_names", get_display_names)
+    monkeypatch.setattr(users_repo, "upsert_many", upsert_many)
+    monkeypatch.setattr(users_repo, "ids_not_synced_since", ids_not_synced_since)
+    monkeypatch.setattr(users_repo, "delete_not_synced_since", delete_not_synced_since)
+    monkeypatch.setattr(users_service, "_sync_lock", sync_lock)
+    monkeypatch.setattr(users_service, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(users_service, "_names", users_service._NameCache(100, 300.0))
+    monkeypatch.setattr(users_service, "_pending", set())
+    return rows
+
+
+@pytest.fixture
+async def clerk(monkeypatch: pytest.MonkeyPatch):
+    stand_in = Clerk([_clerk_user(n) for n in range(5)])
+    with StandIn(stand_in) as server:
+        monkeypatch.setattr(settings, "CLERK_SECRET_KEY", "sk_test")
+        monkeypatch.setattr(settings, "CLERK_API_URL", server.url)
+        monkeypatch.setattr(users_service, "_client", None)
+        monkeypatch.setattr(users_service, "_PAGE_SIZE", 2)
+        stand_in.server = server
+        yield stand_in
+        if users_service._client is not None:
+            await users_service._client.aclose()
+
+
+def _listing_requests(clerk: Clerk) -> List[Dict[str, List[str]]]:
+    queries = [parse_qs(urlsplit(r["path"]).query) for r in clerk.server.requests]
+    return [q for q in queries if "offset" in q]
+
+
+async def test_full_sync_pages_through_everything_by_created_at(clerk, mirror):
+    stats = await users_service.sync_users(FakeSession(), full=True)
+
+    assert stats == {"fetched": 5, "upserted": 5, "deleted": 0}
+    assert sorted(mirror) == [f"user_{n}" for n in range(5)]
+    pages = _listing_requests(clerk)
+    assert [q["offset"] for q in pages] == [["0"], ["2"], ["4"]]
+    assert {q["order_by"][0] for q in pages} == {"created_at"}
+
+
+async def test_full_sync_keeps_a_user_updated_mid_sync(clerk, mirror):
+    await users_service.sync_users(FakeSession(), full=True)
+
+    def update_user_1() -> None:
+        clerk.users[1]["updated_at"] = _ms(datetime.now(timezone.utc))
+
+    clerk.server.requests.clear()
+    clerk.after_request = update_user_1
+    stats = await users_service.sync_users(FakeSession(), full=True)
+
+    assert stats == {"fetched": 5, "upserted": 5, "deleted": 0}
+    assert "user_1" in mirror
+    # Seen while paging, so nothing had to be looked up by id.
+    assert all("user_id=" not in r["path"] for r in clerk.server.requests)
+
+
+async def test_full_sync_deletes_only_users_clerk_confirms_gone(clerk, mirror):
+    await users_service.sync_users(FakeSession(), full=True)
+    del clerk.users[0]  # deleted in Clerk
+    clerk.hidden_from_listing = {"user_4"}  # skipped by offset paging, still exists
+
+    stats = await users_service.sync_users(FakeSession(), full=True)
+
+    assert stats["deleted"] == 1
+    assert sorted(mirror) == ["user_1", "user_2", "user_3", "user_4"]
+    lookups = [r for r in clerk.server.requests if "user_id=" in r["path"]]
+    assert len(lookups) == 1
+
+
+async def test_incremental_sync_stops_at_the_watermark(clerk, mirror):
+    await users_service.sync_users(FakeSession(), full=True)
+    clerk.server.requests.clear()
+    clerk.users[1]["updated_at"] = _ms(T0 + timedelta(days=2))
+    clerk.users[2]["first_name"] = "Renamed"
+    clerk.users[2]["updated_at"] = _ms(T0 + timedelta(days=3))
+
+    stats = await users_service.sync_users(FakeSession(), full=False)
+
+    # Newest first: [user_2, user_1], [user_4 (the watermark), user_3 (older)] -> stop.
+    pages = _listing_requests(clerk)
+    assert [q["order_by"] for q in pages] == [["-updated_at"], ["-updated_at"]]
+    assert stats == {"fetched": 4, "upserted": 3, "deleted": 0}
+    assert mirror["user_2"]["display_name"] == "Renamed 2"
+
+
+# ── Display names for loan listings ───────────────────────────────────────────
+
+
+async def test_display_names_never_call_clerk_and_queue_unknown_ids(clerk, mirror):
+    await users_service.sync_users(FakeSession(), full=True)
+    clerk.server.requests.clear()
+
+    names = await users_service.resolve_display_names(FakeSession(), ["user_1", "user_9"])
+
+    assert names == {"user_1": "Reader 1", "user_9": None}
+    assert clerk.server.requests == []
+    assert users_service.name_cache_stats()["pending"] == 1
+
+
+async def test_queued_ids_are_fetched_into_the_mirror(clerk, mirror):
+    clerk.users.append(_clerk_user(9))
+    assert await users_service.resolve_display_names(FakeSession(), ["user_9"]) == {"user_9": None}
+
+    assert await users_service.fetch_pending() == 1
+
+    assert [r["path"] for r in clerk.server.requests] == ["/users?user_id=user_9&limit=1"]
+    assert users_service.name_cache_stats()["pending"] == 0
+    names = await users_service.resolve_display_names(FakeSession(), ["user_9"])
+    assert names == {"user_9": "Reader 9"}
+
+
+async def test_failed_lookup_keeps_ids_queued(clerk, mirror):
+    await users_service.resolve_display_names(FakeSession(), ["user_9"])
+    clerk.down = True
+
+    assert await users_service.fetch_pending() == 0
+    assert users_service.name_cache_stats()["pending"] == 1
+
+
+# ── Webhook signatures ────────────────────────────────────────────────────────
+
+
+def _signed(body: bytes, *, secret: str = WEBHOOK_SECRET, at: Optional[int] = None) -> Dict[str, str]:
+    msg_id, timestamp = "msg_1", str(at if at is not None else int(time.time()))
+    key = base64.b64decode(secret.removeprefix("whsec_"))
+    digest = hmac.new(key, f"{msg_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    return {
+        "svix-id": msg_id,
+        "svix-timestamp": timestamp,
+        "svix-signature": f"v1,{base64.b64encode(digest).decode()}",
+    }
+
+
+@pytest.fixture
+async def webhook(monkeypatch: pytest.MonkeyPatch, mirror):
+    monkeypatch.setattr(settings, "CLERK_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    app.dependency_overrides[get_db] = FakeSession
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        yield client
+    app.dependency_overrides.pop(get_db, None)
+
+
+BODY = json.dumps({"type": "user.updated", "data": _clerk_user(7)}).encode()
+
+
+async def test_webhook_with_valid_signature_is_applied(webhook, mirror):
+    resp = await webhook.post("/v1/webhooks/clerk", content=BODY, headers=_signed(BODY))
+
+    assert resp.status_code == 204
+    assert "user_7" in mirror
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        _signed(BODY, secret="whsec_" + base64.b64encode(b"someone-else").decode()),
+        _signed(BODY, at=int(time.time()) - 3600),
+        _signed(b'{"type": "user.deleted"}'),
+    ],
+    ids=["unsigned", "wrong-secret", "stale-timestamp", "other-body"],
+)
+async def test_webhook_with_bad_signature_is_rejected(webhook, mirror, headers):
+    resp = await webhook.post("/v1/webhooks/clerk", content=BODY, headers=headers)
+
+    assert resp.status_code == 401
+    assert resp.json()["error"]["code"] == "INVALID_SIGNATURE"
+    assert mirror == {}
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        [{"type": "user.updated", "data": _clerk_user(7)}],
+        "user.updated",
+        {"type": "user.created", "data": {"first_name": "Reader"}},
+        {"type": "user.updated", "data": {**_clerk_user(7), "id": 7}},
+        {"type": "user.updated", "data": ["user_7"]},
+        {"type": "user.updated"},
+    ],
+    ids=["list-body", "string-body", "no-id", "non-string-id", "list-data", "no-data"],
+)
+async def test_malformed_webhook_event_is_rejected(webhook, mirror, event):
+    body = json.dumps(event).encode()
+    resp = await webhook.post("/v1/webhooks/clerk", content=body, headers=_signed(body))
+
+    assert resp.status_code == 400
+    assert resp.json()["error"]["code"] == "VALIDATION_ERROR"
+    assert mirror == {}
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"type": "session.created", "data": {"id": "sess_1"}},
+        {"type": "user.deleted", "data": {"deleted": True}},
+        {"type": "user.deleted", "data": None},
+    ],
+    ids=["other-type", "deleted-without-id", "deleted-null-data"],
+)
+async def test_webhook_event_without_a_user_is_ignored(webhook, mirror, event):
+    body = json.dumps(event).encode()
+    resp = await webhook.post("/v1/webhooks/clerk", content=body, headers=_signed(body))
+
+    assert resp.status_code == 204
+    assert mirror == {}
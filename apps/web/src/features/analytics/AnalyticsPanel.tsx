@@ -10,8 +10,13 @@ import {
   Sparkles,
   TrendingUp,
 } from "lucide-react";
-import { useAnalyticsSummary } from "./hooks";
-import type { DormantBook, LowStockAlert, TrendingBook } from "./types";
+import { useAnalyticsInsights, useAnalyticsSummary } from "./hooks";
+import type {
+  AiInsightsStatus,
+  DormantBook,
+  LowStockAlert,
+  TrendingBook,
+} from "./types";
 
 // ── Stat card ─────────────────────────────────────────────────────────────────
 
@@ -112,14 +117,34 @@ function DormantList({ items }: { items: DormantBook[] }) {
 // ── AI insights box ────────────────────────────────────────────────────────────
 
 interface AiBoxProps {
+  status: AiInsightsStatus;
   summary: string;
   insights: string[];
   recommendedActions: string[];
 }
 
-function AiBox({ summary, insights, recommendedActions }: AiBoxProps) {
+function AiBox({ status, summary, insights, recommendedActions }: AiBoxProps) {
   const isConfigured = summary !== "AI insights not configured.";
 
+  if (status === "pending") {
+    return (
+      <Card className="border-primary/30">
+        <CardHeader className="pb-2">
+          <CardTitle className="flex items-center gap-2 text-base">
+            <Sparkles className="h-4 w-4 text-primary" />
+            AI Insights
+          </CardTitle>
+        </CardHeader>
+        <CardContent>
+          <p className="flex items-center gap-2 text-sm text-muted-foreground">
+            <Loader2 className="h-4 w-4 animate-spin" />
+            Generating insights…
+          </p>
+        </CardContent>
+      </Card>
+    );
+  }
+
   if (!isConfigured) {
     return (
       <Card className="border-dashed">
@@ -195,6 +220,7 @@ interface AnalyticsPanelProps {
 
 export function AnalyticsPanel({ days = 30 }: AnalyticsPanelProps) {
   const { data, isLoading, isError, error } = useAnalyticsSummary(days);
+  const insightsQuery = useAnalyticsInsights(days, data?.ai.status === "pending");
 
   if (isLoading) {
     return (
@@ -219,7 +245,9 @@ export function AnalyticsPanel({ days = 30 }: AnalyticsPanelProps) {
 
   if (!data) return null;
 
-  const { metrics, ai } = data;
+  const { metrics } = data;
+  const ai =
+    data.ai.status === "pending" && insightsQuery.data ? insightsQuery.data.ai : data.ai;
 
   return (
     <div className="space-y-6">
@@ -299,6 +327,7 @@ export function AnalyticsPanel({ days = 30 }: AnalyticsPanelProps) {
 
       {/* AI insights */}
       <AiBox
+        status={ai.status}
         summary={ai.summary}
         insights={ai.insights}
         recommendedActions={ai.recommendedActions}
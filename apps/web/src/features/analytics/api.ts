@@ -1,5 +1,5 @@
 import { type AuthedFetch } from "@/api/client";
-import { type AnalyticsSummary } from "./types";
+import { type AnalyticsInsights, type AnalyticsSummary } from "./types";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL ?? "http://localhost:8000";
 
@@ -11,3 +11,14 @@ export function getAnalyticsSummary(
     `${API_BASE}/v1/analytics/summary?days=${days}`,
   );
 }
+
+/** Long-polls for up to `wait` seconds while insights are still pending. */
+export function getAnalyticsInsights(
+  fetch: AuthedFetch,
+  days: number,
+  wait = 20,
+): Promise<AnalyticsInsights> {
+  return fetch<AnalyticsInsights>(
+    `${API_BASE}/v1/analytics/insights?days=${days}&wait=${wait}`,
+  );
+}
@@ -1,10 +1,11 @@
 import { useQuery } from "@tanstack/react-query";
 import { useFetchRef } from "@/api/client";
-import { getAnalyticsSummary } from "./api";
+import { getAnalyticsInsights, getAnalyticsSummary } from "./api";
 
 export const analyticsKeys = {
   all: ["analytics"] as const,
   summary: (days: number) => [...analyticsKeys.all, "summary", days] as const,
+  insights: (days: number) => [...analyticsKeys.all, "insights", days] as const,
 };
 
 export function useAnalyticsSummary(days = 30) {
@@ -16,3 +17,17 @@ export function useAnalyticsSummary(days = 30) {
     staleTime: 60_000,
   });
 }
+
+/** AI insights for the summary's window; only fetched while they are pending. */
+export function useAnalyticsInsights(days: number, pending: boolean) {
+  const fetchRef = useFetchRef();
+
+  return useQuery({
+    queryKey: analyticsKeys.insights(days),
+    queryFn: () => getAnalyticsInsights(fetchRef.current, days),
+    enabled: pending,
+    staleTime: 60_000,
+    refetchInterval: (query) =>
+      query.state.data?.ai.status === "pending" ? 1_000 : false,
+  });
+}
@@ -32,7 +32,10 @@ export interface AnalyticsMetrics {
   dormantBooks: DormantBook[];
 }
 
+export type AiInsightsStatus = "pending" | "ready" | "failed";
+
 export interface AiInsights {
+  status: AiInsightsStatus;
   summary: string;
   insights: string[];
   recommendedActions: string[];
@@ -43,3 +46,8 @@ export interface AnalyticsSummary {
   metrics: AnalyticsMetrics;
   ai: AiInsights;
 }
+
+export interface AnalyticsInsights {
+  windowDays: number;
+  ai: AiInsights;
+}
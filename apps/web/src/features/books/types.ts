@@ -19,6 +19,7 @@ export interface BookCreate {
   publishedYear?: number;
   availableCopies?: number;
   coverImageUrl?: string;
+  allowDuplicate?: boolean;
 }
 
 export interface BookListResponse {
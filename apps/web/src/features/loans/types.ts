@@ -3,6 +3,7 @@ export interface LoanOut {
   bookId: string;
   borrowerUserId: string | null;
   borrowerName: string | null;
+  borrowerDisplayName?: string | null;
   processedByAdminId: string;
   status: "borrowed" | "returned";
   borrowedAt: string;
@@ -1,7 +1,20 @@
 import { type AuthedFetch } from "@/api/client";
-import { type ClerkUser } from "./types";
+import { type UserListOut } from "./types";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL ?? "http://localhost:8000";
 
-export const listUsers = (fetch: AuthedFetch, limit = 100): Promise<ClerkUser[]> =>
-  fetch<ClerkUser[]>(`${API_BASE}/v1/users?limit=${limit}`);
+export interface ListUsersParams {
+  query?: string;
+  limit?: number;
+  cursor?: string;
+}
+
+export const listUsers = (
+  fetch: AuthedFetch,
+  { query, limit = 50, cursor }: ListUsersParams = {},
+): Promise<UserListOut> => {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (query) params.set("query", query);
+  if (cursor) params.set("cursor", cursor);
+  return fetch<UserListOut>(`${API_BASE}/v1/users?${params}`);
+};
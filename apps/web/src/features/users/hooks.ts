@@ -1,13 +1,16 @@
-import { useQuery } from "@tanstack/react-query";
+import { keepPreviousData, useQuery } from "@tanstack/react-query";
 import { useFetchRef } from "@/api/client";
 import { listUsers } from "./api";
 
-export function useUsers(enabled = true) {
+/** Borrower search against the server's users mirror. */
+export function useUsers(query = "", enabled = true) {
   const fetchRef = useFetchRef();
+  const trimmed = query.trim();
 
   return useQuery({
-    queryKey: ["users"],
-    queryFn: () => listUsers(fetchRef.current),
+    queryKey: ["users", trimmed],
+    queryFn: () => listUsers(fetchRef.current, { query: trimmed || undefined }),
     enabled,
+    placeholderData: keepPreviousData,
   });
 }
@@ -3,3 +3,8 @@ export interface ClerkUser {
   displayName: string;
   email: string | null;
 }
+
+export interface UserListOut {
+  items: ClerkUser[];
+  nextCursor: string | null;
+}
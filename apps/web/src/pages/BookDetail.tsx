@@ -14,7 +14,7 @@ import { type LoanOut } from "@/features/loans/types";
 import { useUsers } from "@/features/users/hooks";
 import { cn } from "@/lib/cn";
 import { ChevronLeftIcon } from "lucide-react";
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Link, useParams } from "react-router-dom";
 
 export function BookDetail() {
@@ -103,8 +103,15 @@ function CheckoutSection({ book }: { book: BookOut }) {
   const [borrowerType, setBorrowerType] = useState<BorrowerType>("user");
   const [selectedUserId, setSelectedUserId] = useState("");
   const [borrowerName, setBorrowerName] = useState("");
+  const [userSearch, setUserSearch] = useState("");
+  const [debouncedUserSearch, setDebouncedUserSearch] = useState("");
 
-  const usersQuery = useUsers(borrowerType === "user");
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedUserSearch(userSearch.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [userSearch]);
+
+  const usersQuery = useUsers(debouncedUserSearch, borrowerType === "user");
   const checkoutMutation = useCheckoutBook();
 
   const unavailable = book.availableCopies <= 0;
@@ -115,6 +122,7 @@ function CheckoutSection({ book }: { book: BookOut }) {
     checkoutMutation.reset();
     setSelectedUserId("");
     setBorrowerName("");
+    setUserSearch("");
   }
 
   async function handleCheckout() {
@@ -162,6 +170,11 @@ function CheckoutSection({ book }: { book: BookOut }) {
 
         {borrowerType === "user" ? (
           <Field label="Borrower">
+            <Input
+              value={userSearch}
+              onChange={(e) => setUserSearch(e.target.value)}
+              placeholder="Search by name or email…"
+            />
             {usersQuery.isLoading ? (
               <p className="text-sm text-muted-foreground animate-pulse">Loading users…</p>
             ) : (
@@ -176,7 +189,7 @@ function CheckoutSection({ book }: { book: BookOut }) {
                 )}
               >
                 <option value="">Select a user…</option>
-                {(usersQuery.data ?? []).map((u) => (
+                {(usersQuery.data?.items ?? []).map((u) => (
                   <option key={u.id} value={u.id}>
                     {u.displayName}
                     {u.email ? ` — ${u.email}` : ""}
@@ -234,7 +247,7 @@ function ActiveLoansSection({ bookId }: { bookId: string }) {
   async function handleCheckIn(loan: LoanOut) {
     if (
       !window.confirm(
-        `Check in "${loan.bookTitle}" for ${loan.borrowerUserId ?? loan.borrowerName}?`,
+        `Check in "${loan.bookTitle}" for ${loan.borrowerDisplayName ?? loan.borrowerUserId ?? loan.borrowerName}?`,
       )
     )
       return;
@@ -267,7 +280,7 @@ function ActiveLoansSection({ bookId }: { bookId: string }) {
                 <div className="flex items-center justify-between gap-4">
                   <div className="min-w-0">
                     <p className="text-sm font-medium truncate">
-                      {loan.borrowerUserId ?? loan.borrowerName ?? "—"}
+                      {loan.borrowerDisplayName ?? loan.borrowerUserId ?? loan.borrowerName ?? "—"}
                     </p>
                     <p className="text-xs text-muted-foreground">
                       Since {new Date(loan.borrowedAt).toLocaleDateString()}
@@ -135,7 +135,7 @@ function LoanCard({
   const [imgBroken, setImgBroken] = useState(false);
 
   const borrowerLabel = loan.borrowerUserId
-    ? loan.borrowerUserId
+    ? (loan.borrowerDisplayName ?? loan.borrowerUserId)
     : (loan.borrowerName ?? "—");
 
   return (